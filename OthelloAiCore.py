@@ -1,11 +1,22 @@
 """This module is used to start an AI match of Othello."""
 
-from OthelloCore import GameBoard
+from OthelloCore import GameBoard, STEP_INDICES, getEdgeStableAxes
+from math import inf, isqrt, nextafter
+from time import perf_counter
+from OthelloBitboard import AiBitGameBoard, getAiBitGameBoardClass
+from OthelloSearchStats import SearchStats, getAttributeValues, measureTreeMemory
+from OthelloTranspositionTable import TranspositionTable, zobristHash, zobristHashAfterMove, ZOBRIST_PLAYER_KEY, ZOBRIST_SEARCHER_KEY
+from configs import ROW_COL, AI_BOARD_BACKEND, AI_STABILITY_EDGE_TABLE, AI_VERIFY_STABILITY
+from itertools import chain
+from functools import cache
 
 class AiGameBoard(GameBoard):
     
-    def __init__(self):
-        super(AiGameBoard, self).__init__()
+    verifyStability = AI_VERIFY_STABILITY
+    """If set, every incremental stability update is checked against a full recompute."""
+    
+    def __init__(self, size: int | None = None):
+        super(AiGameBoard, self).__init__(size)
         
         self.stableDisks = [[0] * self.col for _ in range(self.row)]
         """
@@ -31,9 +42,34 @@ class AiGameBoard(GameBoard):
         Counts the number of directions in which the white disks cannot be captured.
         Does not count the fully stable disks, so the maximum value for each disk is only 3.
         """
+        
+        self.zobristHash = zobristHash(self.disks, self.player)
+        """The Zobrist hash of the disks and the current player. Updated incrementally by `putDisk`."""
+        
+        self.stabilityDirections: bytearray | None = None
+        """
+        The number of stable directions of each non-stable disk found by the last `updateCount` call, plus one, at `row * col_count + col`
+        (`0` means no result), so the next call only checks the disks that may have changed. `None` until the first full update.
+        """
+        
+        self.lastNewlyStable: list[tuple[int, int]] = []
+        """The disks that were marked stable by the last `updateCount` call."""
+        
+        self.edgeStableAxes = getEdgeStableAxes(self.row, self.col) if AI_STABILITY_EDGE_TABLE else None
+        """An optional table of the axes that are always stable for each square. See `getEdgeStableAxes`."""
 
-    def updateCount(self):
-        """Updates the GameBoard counters."""
+    def updateCount(self, changedSquares: list[tuple[int, int]] | None = None) -> list[tuple[int, int]]:
+        """
+        Updates the GameBoard counters. Returns the positions of the disks that were newly marked as stable.
+        
+        If `changedSquares` (the placed and flipped disks since the last call) is given, only the stability axes
+        whose line goes through a changed square are checked again, and the others keep their last results.
+        The counters are the same as the ones of a full update.
+        """
+        
+        newlyStable: list[tuple[int, int]] = []
+        directions = bytearray(self.row * self.col)
+        edgeStableAxes = self.edgeStableAxes
         
         self.blackCount = self.whiteCount = 0
         self.blackStableDisksCount = self.whiteStableDisksCount = 0
@@ -42,16 +78,19 @@ class AiGameBoard(GameBoard):
         steps = ((-1, -1), (-1, 0), (-1, 1), (0, 1))
         self.blackSemiStableDirections = self.whiteSemiStableDirections = 0
         
-        # Resetting the list of possible moves.
-        self.possibleMoves = set()
-        
-        # Clearing any empty positions marked as possible moves (-1) that have been found in a previous call to this function.
-        for row_i in range(self.row):
-            for col_i in range(self.col):
-                if self.disks[row_i][col_i] == -1:
-                    self.disks[row_i][col_i] = 0
-        
-        opponent = 3 - self.player # (3 - 1 = 2), (3 - 2 = 1)
+        cached = self.stabilityDirections if changedSquares is not None else None
+        if cached is not None:
+            # The result of an axis only depends on the squares in the line of that axis. So, an axis is checked again only if
+            # its line goes through a placed or flipped disk, or through a disk that was marked stable by the last update
+            # (the disks that were checked before it did not see it as stable).
+            # The lines of the axes are identified by `row - col`, `col`, `row + col` and `row` respectively.
+            dirtyLines: tuple[set[int], ...] = (set(), set(), set(), set())
+            for row, col in chain(changedSquares, self.lastNewlyStable): # type: ignore
+                for axis, line in enumerate((row - col, col, row + col, row)):
+                    dirtyLines[axis].add(line)
+            
+            if self.verifyStability:
+                stableDisksBefore = [row[:] for row in self.stableDisks]
         
         for row_i in range(self.row):
             for col_i in range(self.col):
@@ -72,94 +111,116 @@ class AiGameBoard(GameBoard):
                 # If a piece is not stable and is either black or white, check if it is stable in all directions.
                 if self.disks[row_i][col_i] in (1, 2) and not self.stableDisks[row_i][col_i]:
                     # Counts the number of directions (e.g., (top, down), (left, right), and both diagonals) in which the disk is stable. Max is 4.
-                    stabilityCounter = 0
+                    stabilityCounter = axis = 0
+                    
+                    if cached is not None and cached[row_i * self.col + col_i]:
+                        # The axes before the last result were stable and the next one was not. The check resumes
+                        # from the first of these axes that has changed, or is skipped if none of them has changed.
+                        stabilityCounter = cached[row_i * self.col + col_i] - 1
+                        lines = (row_i - col_i, col_i, row_i + col_i, row_i)
+                        for axis in range(stabilityCounter + 1):
+                            if lines[axis] in dirtyLines[axis]:
+                                stabilityCounter = axis
+                                break
+                        else:
+                            axis = 4
                     
-                    for step in steps:
-                        if not self.isStable((row_i, col_i), step):
+                    while axis < 4:
+                        if not (edgeStableAxes and edgeStableAxes[row_i][col_i][axis]) and not self.isStable((row_i, col_i), steps[axis]):
                             break
                         
                         stabilityCounter += 1
+                        axis += 1
                     
                     # If the disk is stable in all directions, then it is considered stable.
                     if stabilityCounter == 4:
                         self.stableDisks[row_i][col_i] = self.disks[row_i][col_i]
+                        newlyStable.append((row_i, col_i))
+                        
+                        # The disks after this one see it as stable, so their lines have changed.
+                        if cached is not None:
+                            for axis, line in enumerate((row_i - col_i, col_i, row_i + col_i, row_i)):
+                                dirtyLines[axis].add(line)
                     
                     # Otherwise, update the heuristics of the current player.
                     else:
+                        directions[row_i * self.col + col_i] = stabilityCounter + 1
+                        
                         if self.disks[row_i][col_i] == 1:
                             self.blackSemiStableDirections += stabilityCounter
                         
                         elif self.disks[row_i][col_i] == 2:
                             self.whiteSemiStableDirections += stabilityCounter
-                
-                # Updating the list of possible moves:
-                # Checking for possible moves that the current player can make by iterating over each
-                # position on the board and checking if it contains a dicks belonging to the current player.
-                # If a dick is found, then we check in all eight directions to see if there are any opposing
-                # dicks that can be captured by moving in that direction. If a sequence of opposing dicks is
-                # found, and the next position in that direction is empty, then that empty position is considered
-                # a valid move and added to the list of available positions.
-                if self.disks[row_i][col_i] == self.player:
-                    for rowStep, colStep in self._legelSteps:
-                        row, col = row_i + rowStep, col_i + colStep
-                        if 0 <= row < self.row and 0 <= col < self.col and self.disks[row][col] == opponent:
-                            while 0 <= row < self.row and 0 <= col < self.col and self.disks[row][col] == opponent:
-                                row += rowStep
-                                col += colStep
-                            if 0 <= row < self.row and 0 <= col < self.col and self.disks[row][col] == 0:
-                                self.disks[row][col] = -1 # Marking the empty position as a possible move.
-                                self.possibleMoves.add((row, col))
+        
+        # Updating the list of possible moves from the frontier squares.
+        self.evaluatePossibleMoves()
+        
+        self.stabilityDirections = directions
+        self.lastNewlyStable = newlyStable
+        
+        if cached is not None and self.verifyStability:
+            self.checkStability(stableDisksBefore)
+        
+        return newlyStable
+
+    def checkStability(self, stableDisksBefore: list[list[int]]) -> None:
+        """Asserts that the stability counters match the ones of a full update of the board with the given stable disks."""
+        
+        fullBoard = self.shallowCopy()
+        fullBoard.stableDisks = [row[:] for row in stableDisksBefore]
+        fullBoard.updateCount()
+        
+        assert fullBoard.stableDisks == self.stableDisks, "The incremental update marked different stable disks."
+        assert (fullBoard.blackStableDisksCount, fullBoard.whiteStableDisksCount,
+                fullBoard.blackSemiStableDirections, fullBoard.whiteSemiStableDirections) == \
+               (self.blackStableDisksCount, self.whiteStableDisksCount,
+                self.blackSemiStableDirections, self.whiteSemiStableDirections), "The incremental stability counters do not match."
 
     def isStable(self, pos: tuple[int, int], step: tuple[int, int]):
         """Checks if the specified disk is stable/safe at the given position and its opposite."""
         
-        opponent = 3 - self.disks[pos[0]][pos[1]]
+        disks, stableDisks = self.disks, self.stableDisks
+        rays = self.rays[pos[0]][pos[1]]
+        stepIndex = STEP_INDICES[step]
+        
+        player = disks[pos[0]][pos[1]]
+        opponent = 3 - player
         stabilityCounter = 0
         
-        # Check if the specified disk is stable in the given and opposite directions.
-        for rowStep, colStep in (step, (-step[0], -step[1])):
-            row, col = pos[0] + rowStep, pos[1] + colStep
-            
-            # Set when we continue searching in the same direction.
-            keepSearching = False
+        # Check if the specified disk is stable in the given and opposite directions, by walking their rays up to the edge of the board.
+        for ray in (rays[stepIndex], rays[stepIndex ^ 1]):
+            # If the ray is empty (the disk is on the edge of the board), this means that the disk is stable in this direction.
+            if not ray:
+                return True
             
-            while True:
-                # If the position is out of bounds (reached the edge of the board), this means that the disk is stable in this direction.
-                if not (0 <= row < self.row and 0 <= col < self.col):
-                    # If we were still searching in the same direction, then break the loop.
-                    if keepSearching:
-                        stabilityCounter += 1
-                        break
-                    
-                    # Otherwise, the specified disk is stable in the specified direction.
-                    return True
+            for row, col in ray:
+                value = disks[row][col]
                 
                 # If the disk we are checking (i.e., the disk at (row, col)) belongs to the current player:
-                if self.disks[row][col] == self.disks[pos[0]][pos[1]]:
+                if value == player:
                     # If this disk is marked stable, then the specified disk is also stable and cannot be captured from the specified direction.
-                    if self.stableDisks[row][col]:
-                        return True
-                    
                     # Otherwise, the disk may be unstable so we need to keep checking the same direction to find if an opponent disk is present.
-                    row, col = row + rowStep, col + colStep
-                    keepSearching = True
+                    if stableDisks[row][col]:
+                        return True
                 
                 # If the disk we are checking belongs to the opponent:
-                elif self.disks[row][col] == opponent:
+                elif value == opponent:
                     # If this disk is marked stable, then the specified disk is also stable and cannot be captured from this direction.
                     # However, it may still be captured from the opposite direction.
                     # For example: [2, 2, 1, 0]. The black disk is stable from the left side but can be captured from the right side.
-                    if self.stableDisks[row][col]:
-                        stabilityCounter += 1
-                        break
-                    
-                    # The opponent disk may be unstable from this direction, for example: [0, 0, 2, 1, 2, 0]
+                    # Otherwise, the opponent disk may be unstable from this direction, for example: [0, 0, 2, 1, 2, 0]
                     # If a black disk is placed at position 1, another white disk can be placed at position 0,
                     # and the black disk we are interested in (at position 3) will be captured.
-                    row, col = row + rowStep, col + colStep
-                    keepSearching = True
+                    if stableDisks[row][col]:
+                        stabilityCounter += 1
+                        break
+                
                 else:
                     break
+            
+            # The ray reached the edge of the board through disks only, so they cannot be captured from this direction.
+            else:
+                stabilityCounter += 1
         
         if stabilityCounter == 2: # Stable in both directions.
             return True
@@ -169,76 +230,490 @@ class AiGameBoard(GameBoard):
     def shallowCopy(self):
         """Returns a shallow copy of the current game board."""
         
-        newBoard = AiGameBoard()
+        # Skipping `__init__` as it sets up a new game, and every attribute is overwritten below.
+        newBoard = AiGameBoard.__new__(AiGameBoard)
+        newBoard.__dict__.update(self.__dict__)
         newBoard.player = self.player
         newBoard.disks = [row[:] for row in self.disks]
         newBoard.blackCount = self.blackCount
         newBoard.whiteCount = self.whiteCount
         newBoard.possibleMoves = set(item[:] for item in self.possibleMoves)
+        newBoard.frontier = set(self.frontier)
         
         newBoard.stableDisks = [row[:] for row in self.stableDisks]
         newBoard.blackStableDisksCount = self.blackStableDisksCount
         newBoard.whiteStableDisksCount = self.whiteStableDisksCount
         newBoard.blackSemiStableDirections = self.blackSemiStableDirections
         newBoard.whiteSemiStableDirections = self.whiteSemiStableDirections
+        newBoard.zobristHash = self.zobristHash
         return newBoard
 
+    def makeMove(self, pos: tuple[int, int]) -> tuple:
+        """
+        Places a disk of the current player at the given position in place and passes the turn to the opponent.
+        Returns a record of the flipped disks and the old counters that `undoMove` uses to restore the board.
+        """
+        
+        if pos not in self.possibleMoves:
+            raise ValueError(f"{pos} is not a possible move for player {self.player}.")
+        
+        record = (pos, self.player, self.possibleMoves, self.zobristHash,
+                  self.blackCount, self.whiteCount, self.blackStableDisksCount, self.whiteStableDisksCount,
+                  self.blackSemiStableDirections, self.whiteSemiStableDirections,
+                  self.stabilityDirections, self.lastNewlyStable, self.frontier)
+        
+        # `captureDisks` updates the frontier in place, so the one of the record is kept unchanged.
+        self.frontier = set(self.frontier)
+        self.disks[pos[0]][pos[1]] = self.player
+        flipped = self.captureDisks(pos)
+        
+        self.zobristHash = zobristHashAfterMove(self.zobristHash, self.player, pos, flipped, self.col)
+        self.player = 3 - self.player
+        newlyStable = self.updateCount(flipped + [pos])
+        
+        return record + (flipped, newlyStable)
+
+    def undoMove(self, record: tuple) -> None:
+        """Restores the board to the state before the `makeMove` call that returned the given record."""
+        
+        (pos, player, possibleMoves, self.zobristHash,
+         self.blackCount, self.whiteCount, self.blackStableDisksCount, self.whiteStableDisksCount,
+         self.blackSemiStableDirections, self.whiteSemiStableDirections,
+         self.stabilityDirections, self.lastNewlyStable, self.frontier, flipped, newlyStable) = record
+        
+        for row, col in newlyStable:
+            self.stableDisks[row][col] = 0
+        
+        # Clearing the possible moves markers of the opponent before restoring the ones of the player.
+        for row, col in self.possibleMoves:
+            self.disks[row][col] = 0
+        
+        opponent = 3 - player
+        for row, col in flipped:
+            self.disks[row][col] = opponent
+        
+        self.disks[pos[0]][pos[1]] = 0
+        for row, col in possibleMoves:
+            self.disks[row][col] = -1
+        
+        self.player = player
+        self.possibleMoves = possibleMoves
+
+def scoreGameBoard(gameBoard: AiGameBoard | AiBitGameBoard) -> float:
+    """Returns the heuristic score of the game board from the point of view of the player whose turn it is."""
+    
+    if gameBoard.player == 1:
+        return 100 * (gameBoard.blackStableDisksCount - gameBoard.whiteStableDisksCount) + \
+                     (gameBoard.blackSemiStableDirections  - gameBoard.whiteSemiStableDirections)
+    
+    return 100 * (gameBoard.whiteStableDisksCount - gameBoard.blackStableDisksCount) + \
+                 (gameBoard.whiteSemiStableDirections  - gameBoard.blackSemiStableDirections)
+
 class GameBoardNode:
     """A node in the game board tree."""
     
-    def __init__(self, gameBoard: AiGameBoard):
+    __slots__ = ("gameBoard", "parent", "children", "bestMove", "score")
+    
+    def __init__(self, gameBoard: AiGameBoard, evaluator = None, score: float | None = None):
         self.gameBoard = gameBoard
         self.parent: GameBoardNode = None # type: ignore
         self.children: dict[tuple[int, int], GameBoardNode] = {}
         
-        if gameBoard.player == 1:
-            self.score = 100 * (gameBoard.blackStableDisksCount - gameBoard.whiteStableDisksCount) + \
-                                    (gameBoard.blackSemiStableDirections  - gameBoard.whiteSemiStableDirections)
-        elif gameBoard.player == 2:
-            self.score = 100 * (gameBoard.whiteStableDisksCount - gameBoard.blackStableDisksCount) + \
-                                    (gameBoard.whiteSemiStableDirections  - gameBoard.blackSemiStableDirections)
+        self.bestMove: tuple[int, int] | None = None
+        """The best move found by the last alpha-beta search of this node. It is tried first by the next search."""
+        
+        if score is None:
+            score = scoreGameBoard(gameBoard) if evaluator is None else evaluator.evaluate(gameBoard)
+        
+        self.score = score
+        """
+        The heuristic score of the board, by `scoreGameBoard` or by the given `OthelloEvaluator.Evaluator`.
+        A given `score` is used as is: the nodes of a tree with a batch evaluator get a placeholder until their batch is scored.
+        """
+
+class SearchTimeout(Exception):
+    """Raised inside the alpha-beta search when the time budget of `getBestMove` runs out."""
+
+class SearchCancelled(Exception):
+    """Raised inside the searches of a tree when `GameBoardTree.cancelSearch` is called. Unlike `SearchTimeout`, no move is returned."""
 
 class GameBoardTree:
     """A tree that represents the game board and its possible moves."""
 
-    def __init__(self, node: GameBoardNode, depth = 2) -> None:
+    def __init__(self, node: GameBoardNode, depth = 2, useAlphaBeta = False, transpositionTable: TranspositionTable | None = None,
+                 searchInPlace = False, maxNodes: int | None = None, maxBytes: int | None = None, endgameSolver = None,
+                 openingBook = None, batchEvaluator = None, evaluator = None) -> None:
         self.root = node
         self.searchDepth = depth
+        
+        self.useAlphaBeta = useAlphaBeta
+        """
+        If set, `getBestMove` runs a depth-first alpha-beta search that expands the nodes as it visits them,
+        instead of a minimax search over the tree built by `expandTree`. Both searches return the same move.
+        """
+        
+        self.transpositionTable = transpositionTable
+        """
+        An optional table of the alpha-beta search results. The same table can be kept for the whole game
+        so the results of the previous moves searches are reused.
+        """
+        
+        self.searchInPlace = searchInPlace
+        """
+        If set, the alpha-beta search walks a single board with `makeMove`/`undoMove` below the root children,
+        instead of building a `GameBoardNode` (and a board copy) for every visited position.
+        """
+        
+        self.deadline: float | None = None
+        """The `perf_counter` time at which the running alpha-beta search is stopped. `None` means no limit."""
+        
+        self.cancelled = False
+        """Set by `cancelSearch` (usually from another thread) to stop the running search. Must be reset before the next search."""
+        
+        self.ponderedMoves: dict[tuple[int, int], tuple] = {}
+        """The `(player, searchDepth, timeMs, bestMove, completedDepth)` search found by `ponder` after each opponent move at the root."""
+        
+        self.ponderedMove: tuple | None = None
+        """The pondered search of the root, if any, taken from `ponderedMoves` by `advanceRoot`. Used once by `getBestMove`."""
+        
+        self.completedDepth = 0
+        """
+        The depth of the search that chose the move of the last `getBestMove` call: the deepest completed search of a time budget,
+        the depth of the book search for a book move, the number of empty squares for a solved endgame, and `searchDepth` otherwise.
+        """
+        
+        self.nodeCount = 0
+        """The number of positions (nodes or in-place moves) that were generated by this tree so far."""
+        
+        self.collectStats = False
+        """If set, each search records a `SearchStats` in `searchStats`. Off by default as the timers slow the search down."""
+        
+        self.activeStats: SearchStats | None = None
+        """The statistics of the running search. Started by `expandTree` or `getBestMove`, and finished by `getBestMove`."""
+        
+        self.searchStats: SearchStats | None = None
+        """The statistics of the last `getBestMove` call, if `collectStats` is set."""
+        
+        self.maxNodes = maxNodes
+        """
+        The number of nodes that the tree keeps between searches. When a search or `advanceRoot` leaves more nodes than that,
+        the least useful subtrees are dropped (see `pruneTree`). They are expanded again if a later search needs them.
+        """
+        
+        self.maxBytes = maxBytes
+        """Same as `maxNodes`, but in (estimated) bytes. Converted to a number of nodes with the size of the root node."""
+        
+        self.treeSize = self.countNodes(node)
+        """The number of nodes in the tree, kept up to date by `expandNode`, `advanceRoot` and `pruneTree`."""
+        
+        self.endgameSolver = endgameSolver
+        """
+        An optional `OthelloEndgame.EndgameSolver`. When the root has few enough empty squares, `getBestMove` plays the move
+        that it finds, and only falls back to the heuristic search if the solver cannot find one in its time budget.
+        """
+        
+        self.openingBook = openingBook
+        """An optional `OthelloOpeningBook.OpeningBook`. When the root is in the book, `getBestMove` plays its move without a search."""
+        
+        self.batchEvaluator = batchEvaluator
+        """
+        An optional `OthelloBatchEval.BatchEvaluator` that replaces `scoreGameBoard` as the score of the positions.
+        The children of each expanded node are scored in one batch, and `expandTree` scores its whole frontier in one batch.
+        """
+        
+        self.pendingNodes: list[GameBoardNode] | None = None
+        """The nodes created by the running `expandTree` call that wait for their batch evaluation."""
+        
+        self.evaluator = evaluator
+        """
+        An optional `OthelloEvaluator.Evaluator` that scores the nodes and the in-place positions of the tree instead of `scoreGameBoard`.
+        The root node is created outside of the tree, so its score is not used by the searches.
+        """
+        
+        self.boardHelpers = (endgameSolver, openingBook, batchEvaluator, evaluator)
+        """
+        The `endgameSolver`, `openingBook`, `batchEvaluator` and `evaluator` given to the tree. They only know the 8x8 board,
+        so they are only used while the root is an 8x8 board (see `useBoardSize`), and the other sizes use `scoreGameBoard`.
+        """
+        
+        self.useBoardSize(node.gameBoard.row)
 
-    def expandTree(self) -> None:
-        """Expands the tree by adding the possible moves from the root node."""
-        
-        BFS_Nodes: list[GameBoardNode] = [self.root]
-        BFS_NodesNext: list[GameBoardNode] = []
-        
-        # Expanding the tree by adding the possible moves from the root node.
-        for _ in range(self.searchDepth):
-            for node in BFS_Nodes:
-                # If the node has children, then it has already been expanded.
-                if node.children:
-                    for pos in node.children:
-                        BFS_NodesNext.append(node.children[pos])
-                
-                # Otherwise, expand the node.
+    def useBoardSize(self, size: int) -> None:
+        """Enables the helpers of `boardHelpers` for a root of the given size if it is `8`, and disables them otherwise."""
+        
+        helpers = self.boardHelpers if size == 8 else (None, None, None, None)
+        self.endgameSolver, self.openingBook, self.batchEvaluator, self.evaluator = helpers
+
+    def expandNode(self, node: GameBoardNode) -> dict[tuple[int, int], GameBoardNode]:
+        """Adds the possible moves of the given node as its children if it has not been expanded yet."""
+        
+        if not node.children:
+            if self.activeStats is not None:
+                self.expandNodeWithStats(node, self.activeStats)
+            
+            else:
+                # With a batch evaluator, the children are scored together below instead of one by one.
+                score = 0.0 if self.batchEvaluator is not None else None
+                for pos in node.gameBoard.possibleMoves:
+                    newGameBoard = putDisk(node.gameBoard, pos)
+                    
+                    if newGameBoard:
+                        self.nodeCount += 1
+                        childNode = GameBoardNode(newGameBoard, self.evaluator, score)
+                        childNode.parent = node # type: ignore
+                        node.children[pos] = childNode
+            
+            self.treeSize += len(node.children)
+            
+            if self.batchEvaluator is not None and node.children:
+                if self.pendingNodes is not None:
+                    self.pendingNodes.extend(node.children.values())
                 else:
-                    for pos in node.gameBoard.possibleMoves:
-                        newGameBoard = putDisk(node.gameBoard, pos)
+                    self.scoreNodes(list(node.children.values()))
+        
+        return node.children
+
+    def expandNodeWithStats(self, node: GameBoardNode, stats: SearchStats) -> None:
+        """Same as `expandNode` for a node that has not been expanded yet, but also records the expansion and its timings in `stats`."""
+        
+        score = 0.0 if self.batchEvaluator is not None else None
+        for pos in node.gameBoard.possibleMoves:
+            startTime = perf_counter()
+            newGameBoard = putDisk(node.gameBoard, pos)
+            evaluationStart = perf_counter()
+            
+            if newGameBoard:
+                self.nodeCount += 1
+                childNode = GameBoardNode(newGameBoard, self.evaluator, score)
+                childNode.parent = node # type: ignore
+                node.children[pos] = childNode
+            
+            stats.moveGenerationSeconds += evaluationStart - startTime
+            stats.evaluationSeconds += perf_counter() - evaluationStart
+        
+        if node.children:
+            stats.addExpansion(len(node.children))
+
+    def scoreNodes(self, nodes: list[GameBoardNode]) -> None:
+        """Sets the scores of the given nodes with a single call of `batchEvaluator`."""
+        
+        if self.activeStats is None:
+            self.batchEvaluator.scoreNodes(nodes)
+            return
+        
+        startTime = perf_counter()
+        self.batchEvaluator.scoreNodes(nodes)
+        self.activeStats.evaluationSeconds += perf_counter() - startTime
+    
+    def scoreLeaf(self, gameBoard: AiGameBoard | AiBitGameBoard) -> float:
+        """Returns the score of a leaf board of the in-place search."""
+        
+        if self.batchEvaluator is not None:
+            return self.batchEvaluator.scoreGameBoards([gameBoard])[0]
+        
+        if self.evaluator is not None:
+            return self.evaluator.evaluate(gameBoard)
+        
+        return scoreGameBoard(gameBoard)
+    
+    def scoreMoves(self, gameBoard: AiGameBoard | AiBitGameBoard, moves) -> dict[tuple[int, int], float]:
+        """Returns the scores of the boards after each of the given moves with a single call of `batchEvaluator`."""
+        
+        positions = []
+        for pos in moves:
+            record = gameBoard.makeMove(pos)
+            positions.append(self.batchEvaluator.getPosition(gameBoard))
+            gameBoard.undoMove(record)
+        
+        return dict(zip(moves, self.batchEvaluator.scorePositions(positions)))
+    
+    def countNodes(self, node: GameBoardNode) -> int:
+        """Returns the number of nodes in the subtree of the given node, including itself."""
+        
+        count, stack = 0, [node]
+        while stack:
+            node = stack.pop()
+            count += 1
+            stack.extend(node.children.values())
+        
+        return count
+
+    def releaseChildren(self, node: GameBoardNode) -> int:
+        """
+        Removes all the nodes below the given node from the tree and returns their number. The links between the removed nodes
+        are cleared as well, so their memory is freed right away instead of waiting for the garbage collector to find the cycles.
+        """
+        
+        released, stack = 0, [node]
+        while stack:
+            current = stack.pop()
+            children = current.children
+            current.children = {}
+            
+            for child in children.values():
+                child.parent = None # type: ignore
+                stack.append(child)
+            
+            released += len(children)
+        
+        self.treeSize -= released
+        return released
+
+    def getNodeBudget(self) -> int | None:
+        """Returns the number of nodes allowed by `maxNodes` and `maxBytes`, or `None` if the tree is not bounded."""
+        
+        budget = self.maxNodes
+        if self.maxBytes is not None:
+            gameBoard = self.root.gameBoard
+            byteBudget = self.maxBytes // max(getNodeBytes(type(gameBoard), gameBoard.row), 1)
+            budget = byteBudget if budget is None else min(budget, byteBudget)
+        
+        return budget
+
+    def pruneTree(self, maxNodes: int | None = None) -> int:
+        """
+        Drops the least useful subtrees until the tree has at most `maxNodes` nodes (by default, the budget of `maxNodes`/`maxBytes`).
+        The children of a node are kept or dropped together, as the searches assume an expanded node has all its moves.
+        The nodes closer to the root, the best moves of the last searches and the moves with the best scores are kept first.
+        Returns the number of dropped nodes.
+        """
+        
+        if maxNodes is None:
+            maxNodes = self.getNodeBudget()
+            if maxNodes is None:
+                return 0
+        
+        def prune(node: GameBoardNode, budget: int) -> int:
+            """Prunes the subtree of the given node to `budget` nodes (not counting itself), and returns its new size."""
+            
+            children = node.children
+            if not children:
+                return 0
+            
+            if len(children) > budget:
+                self.releaseChildren(node)
+                return 0
+            
+            # A child score is from the point of view of the opponent, so the lowest scores are the best moves of the node.
+            order = sorted(children, key = lambda pos: (pos != node.bestMove, children[pos].score))
+            remaining = budget - len(children)
+            for pos in order:
+                remaining -= prune(children[pos], remaining)
+            
+            return budget - remaining
+        
+        # The root children are always kept, as the search of the root may be running over them.
+        treeSize = self.treeSize
+        self.treeSize = 1 + prune(self.root, max(maxNodes - 1, len(self.root.children)))
+        return treeSize - self.treeSize
+
+    def enforceNodeBudget(self) -> None:
+        """Prunes the tree if it has more nodes than its budget."""
+        
+        budget = self.getNodeBudget()
+        if budget is not None and self.treeSize > budget:
+            self.pruneTree(budget)
+
+    def advanceRoot(self, pos: tuple[int, int]) -> GameBoardNode:
+        """
+        Makes the child of the given move the new root, and drops the rest of the old tree: the old root and the subtrees of the other moves.
+        The subtree of the new root is kept for the next search (within the node budget). Returns the new root.
+        """
+        
+        oldRoot = self.root
+        newRoot = self.expandNode(oldRoot)[pos]
+        
+        del oldRoot.children[pos]
+        self.releaseChildren(oldRoot)
+        newRoot.parent = None # type: ignore
+        
+        self.root = newRoot
+        self.treeSize = self.countNodes(newRoot)
+        self.enforceNodeBudget()
+        
+        self.ponderedMove = self.ponderedMoves.get(pos)
+        self.ponderedMoves = {}
+        
+        return newRoot
+
+    def resetRoot(self, gameBoard: AiGameBoard | AiBitGameBoard) -> GameBoardNode:
+        """
+        Replaces the whole tree with a new root of the given board, for the positions that `advanceRoot` cannot reach:
+        a passed turn, or a position set from outside of the game. The transposition table is kept. Returns the new root.
+        """
+        
+        self.releaseChildren(self.root)
+        self.useBoardSize(gameBoard.row)
+        self.root = GameBoardNode(gameBoard, self.evaluator)
+        self.treeSize = 1
+        self.ponderedMove, self.ponderedMoves = None, {}
+        
+        return self.root
+
+    def startStats(self) -> SearchStats | None:
+        """Starts recording the statistics of a new search if `collectStats` is set and none is running. Returns the running statistics."""
+        
+        if self.collectStats and self.activeStats is None:
+            self.activeStats = SearchStats(self.searchDepth)
+        
+        return self.activeStats
+
+    def expandTree(self) -> None:
+        """
+        Expands the tree by adding the possible moves from the root node.
+        In alpha-beta mode, only the root is expanded as the search expands the rest of the tree on demand.
+        """
+        
+        stats = self.startStats()
+        startTime = perf_counter()
+        
+        if self.useAlphaBeta:
+            self.expandNode(self.root)
+        
+        else:
+            BFS_Nodes: list[GameBoardNode] = [self.root]
+            BFS_NodesNext: list[GameBoardNode] = []
+            
+            # With a batch evaluator, the new nodes are collected and scored all at once at the end.
+            if self.batchEvaluator is not None:
+                self.pendingNodes = []
+            
+            try:
+                # Expanding the tree by adding the possible moves from the root node.
+                for _ in range(self.searchDepth):
+                    for node in BFS_Nodes:
+                        if self.cancelled:
+                            raise SearchCancelled()
                         
-                        if newGameBoard:
-                            childNode = GameBoardNode(newGameBoard)
-                            childNode.parent = node # type: ignore
-                            node.children[pos] = childNode
-                            BFS_NodesNext.append(childNode)
+                        # If the node has children, then it has already been expanded. Otherwise, expand the node.
+                        for pos in self.expandNode(node):
+                            BFS_NodesNext.append(node.children[pos])
+                    
+                    BFS_Nodes = BFS_NodesNext
+                    BFS_NodesNext = []
             
-            BFS_Nodes = BFS_NodesNext
-            BFS_NodesNext = []
+            finally:
+                # The expanded nodes are scored even if the expansion was cancelled, as they are not expanded again.
+                if self.pendingNodes is not None:
+                    pendingNodes, self.pendingNodes = self.pendingNodes, None
+                    if pendingNodes:
+                        self.scoreNodes(pendingNodes)
+        
+        if stats is not None:
+            stats.totalSeconds += perf_counter() - startTime
 
     def minMax(self, node: GameBoardNode, player: bool, depthLimit: int) -> float:
         """Returns the score of the game board at the given node."""
         
         if not depthLimit or not node.children:
+            if self.activeStats is not None:
+                self.activeStats.leavesEvaluated += 1
+            
             return node.score
         
+        if self.cancelled:
+            raise SearchCancelled()
+        
         scores: dict[tuple[int, int], float] = {}
         for pos in node.children:
             scores[pos] = self.minMax(node.children[pos], player, depthLimit - 1)
@@ -248,13 +723,335 @@ class GameBoardTree:
         
         return max(scores.values())
 
-    def getBestMove(self, player) -> tuple[int, int]:
-        """Returns the best move for the current player."""
+    def orderMoves(self, children: dict[tuple[int, int], GameBoardNode], minimizing: bool, firstMove: tuple[int, int] | None = None) -> list[tuple[int, int]]:
+        """
+        Returns the moves of the given children with the most promising ones (by their stability score) first,
+        so the alpha-beta search gets its cutoffs as early as possible. `firstMove` is always moved to the front.
+        """
+        
+        moves = sorted(children, key = lambda pos: children[pos].score, reverse = not minimizing)
+        if firstMove in children:
+            moves.remove(firstMove) # type: ignore
+            moves.insert(0, firstMove) # type: ignore
+        
+        return moves
+
+    def getTableKey(self, gameBoard: AiGameBoard | AiBitGameBoard, player: int) -> int:
+        """Returns the transposition table key of the given board. The scores depend on the searching player, so it is part of the key."""
+        
+        return gameBoard.zobristHash ^ (ZOBRIST_SEARCHER_KEY if player == 2 else 0)
+
+    def lookupTable(self, key: int, depthLimit: int, alpha: float, beta: float) -> tuple[float | None, tuple[int, int] | None]:
+        """
+        Returns the score stored in the transposition table for the given key if it can be used for the search window,
+        and the stored best move, or `None` for each of them.
+        """
+        
+        entry = self.transpositionTable.lookup(key) # type: ignore
+        if entry is None:
+            return None, None
+        
+        _, entryDepth, bound, score, bestMove, _ = entry
+        
+        # The leaf scores are from the point of view of the player to move at the leaf, so only
+        # the scores of the same depth are comparable. The best move is still good for ordering.
+        if entryDepth == depthLimit and (bound == TranspositionTable.EXACT or
+                                         (bound == TranspositionTable.LOWER_BOUND and score >= beta) or
+                                         (bound == TranspositionTable.UPPER_BOUND and score <= alpha)):
+            return score, bestMove
+        
+        return None, bestMove
+
+    def storeTable(self, key: int, depthLimit: int, alphaOriginal: float, betaOriginal: float, value: float, bestMove: tuple[int, int] | None) -> None:
+        """Stores the search result of a node in the transposition table with the bound type matching the original search window."""
+        
+        if value <= alphaOriginal:
+            bound = TranspositionTable.UPPER_BOUND
+        elif value >= betaOriginal:
+            bound = TranspositionTable.LOWER_BOUND
+        else:
+            bound = TranspositionTable.EXACT
+        
+        self.transpositionTable.store(key, depthLimit, bound, value, bestMove) # type: ignore
+
+    def alphaBeta(self, node: GameBoardNode, player: int, depthLimit: int, alpha: float, beta: float) -> float:
+        """
+        Returns the same score as `minMax` for the given node if it lies within `(alpha, beta)`.
+        Otherwise, returns a bound that is `<= alpha` or `>= beta`, and skips the branches that cannot affect the result.
+        """
+        
+        if not depthLimit:
+            if self.activeStats is not None:
+                self.activeStats.leavesEvaluated += 1
+            
+            return node.score
+        
+        if self.cancelled:
+            raise SearchCancelled()
+        
+        if self.deadline is not None and perf_counter() > self.deadline:
+            raise SearchTimeout()
+        
+        tableMove = None
+        if self.transpositionTable is not None:
+            key = self.getTableKey(node.gameBoard, player)
+            score, tableMove = self.lookupTable(key, depthLimit, alpha, beta)
+            if score is not None:
+                return score
+        
+        children = self.expandNode(node)
+        if not children:
+            if self.activeStats is not None:
+                self.activeStats.leavesEvaluated += 1
+            
+            return node.score
+        
+        alphaOriginal, betaOriginal = alpha, beta
+        bestMove = None
+        firstMove = tableMove if tableMove is not None else node.bestMove
+        
+        if node.gameBoard.player == player:
+            value = inf
+            for pos in self.orderMoves(children, True, firstMove):
+                score = self.alphaBeta(children[pos], player, depthLimit - 1, alpha, beta)
+                if score < value:
+                    value, bestMove = score, pos
+                
+                if value <= alpha:
+                    break
+                
+                beta = min(beta, value)
+        else:
+            value = -inf
+            for pos in self.orderMoves(children, False, firstMove):
+                score = self.alphaBeta(children[pos], player, depthLimit - 1, alpha, beta)
+                if score > value:
+                    value, bestMove = score, pos
+                
+                if value >= beta:
+                    break
+                
+                alpha = max(alpha, value)
+        
+        node.bestMove = bestMove
+        
+        if self.transpositionTable is not None:
+            self.storeTable(key, depthLimit, alphaOriginal, betaOriginal, value, bestMove)
+        
+        return value
+
+    def alphaBetaInPlace(self, gameBoard: AiGameBoard | AiBitGameBoard, player: int, depthLimit: int, alpha: float, beta: float,
+                         score: float | None = None) -> float:
+        """
+        Same as `alphaBeta`, but searches the given board in place with `makeMove`/`undoMove` instead of building nodes.
+        `score` is the heuristic score of the board if it is already known (from the node or the parent that scored it), so a leaf is not scored again.
+        """
+        
+        stats = self.activeStats
+        if not depthLimit or not gameBoard.possibleMoves:
+            if score is not None:
+                if stats is not None:
+                    stats.leavesEvaluated += 1
+                
+                return score
+            
+            if stats is None:
+                return self.scoreLeaf(gameBoard)
+            
+            startTime = perf_counter()
+            score = self.scoreLeaf(gameBoard)
+            stats.evaluationSeconds += perf_counter() - startTime
+            stats.leavesEvaluated += 1
+            return score
+        
+        if self.cancelled:
+            raise SearchCancelled()
+        
+        if self.deadline is not None and perf_counter() > self.deadline:
+            raise SearchTimeout()
+        
+        moves = gameBoard.possibleMoves
+        
+        tableMove = None
+        if self.transpositionTable is not None:
+            key = self.getTableKey(gameBoard, player)
+            score, tableMove = self.lookupTable(key, depthLimit, alpha, beta)
+            if score is not None:
+                return score
+        
+        # The children are scored to order them the same way as `orderMoves` does.
+        scores: dict[tuple[int, int], float] = {}
+        evaluate = scoreGameBoard if self.evaluator is None else self.evaluator.evaluate
+        self.nodeCount += len(moves)
+        if self.batchEvaluator is not None:
+            if stats is None:
+                scores = self.scoreMoves(gameBoard, moves)
+            else:
+                stats.addExpansion(len(moves))
+                startTime = perf_counter()
+                scores = self.scoreMoves(gameBoard, moves)
+                stats.evaluationSeconds += perf_counter() - startTime
+        
+        elif stats is None:
+            for pos in moves:
+                record = gameBoard.makeMove(pos)
+                scores[pos] = evaluate(gameBoard)
+                gameBoard.undoMove(record)
+        
+        else:
+            stats.addExpansion(len(moves))
+            for pos in moves:
+                startTime = perf_counter()
+                record = gameBoard.makeMove(pos)
+                evaluationStart = perf_counter()
+                scores[pos] = evaluate(gameBoard)
+                undoStart = perf_counter()
+                gameBoard.undoMove(record)
+                
+                stats.moveGenerationSeconds += evaluationStart - startTime + perf_counter() - undoStart
+                stats.evaluationSeconds += undoStart - evaluationStart
+        
+        minimizing = gameBoard.player == player
+        alphaOriginal, betaOriginal = alpha, beta
+        
+        if depthLimit == 1:
+            # The children are leaves, so their scores are already known.
+            bestMove = min(scores, key = scores.get) if minimizing else max(scores, key = scores.get) # type: ignore
+            value = scores[bestMove]
+            
+            if stats is not None:
+                stats.leavesEvaluated += len(scores)
+        
+        else:
+            order = sorted(scores, key = scores.get, reverse = not minimizing) # type: ignore
+            if tableMove in scores:
+                order.remove(tableMove) # type: ignore
+                order.insert(0, tableMove) # type: ignore
+            
+            bestMove = None
+            value = inf if minimizing else -inf
+            for pos in order:
+                if stats is None:
+                    record = gameBoard.makeMove(pos)
+                    score = self.alphaBetaInPlace(gameBoard, player, depthLimit - 1, alpha, beta, scores[pos])
+                    gameBoard.undoMove(record)
+                
+                else:
+                    startTime = perf_counter()
+                    record = gameBoard.makeMove(pos)
+                    stats.moveGenerationSeconds += perf_counter() - startTime
+                    score = self.alphaBetaInPlace(gameBoard, player, depthLimit - 1, alpha, beta, scores[pos])
+                    startTime = perf_counter()
+                    gameBoard.undoMove(record)
+                    stats.moveGenerationSeconds += perf_counter() - startTime
+                
+                if minimizing:
+                    if score < value:
+                        value, bestMove = score, pos
+                    
+                    if value <= alpha:
+                        break
+                    
+                    beta = min(beta, value)
+                else:
+                    if score > value:
+                        value, bestMove = score, pos
+                    
+                    if value >= beta:
+                        break
+                    
+                    alpha = max(alpha, value)
+        
+        if self.transpositionTable is not None:
+            self.storeTable(key, depthLimit, alphaOriginal, betaOriginal, value, bestMove)
+        
+        return value
+
+    def getBestMove(self, player, timeMs: float | None = None) -> tuple[int, int]:
+        """
+        Returns the best move for the current player.
+        If `timeMs` is given, the search is deepened iteratively until the time budget runs out (see `iterativeDeepening`).
+        If `collectStats` is set, the statistics of the search (including the last `expandTree` call) are kept in `searchStats`.
+        """
+        
+        stats = self.startStats()
+        if stats is None:
+            bestMove = self.searchBestMove(player, timeMs)
+            self.enforceNodeBudget()
+            return bestMove
+        
+        table = self.transpositionTable
+        tableHits, tableLookups = (table.hits, table.hits + table.misses) if table is not None else (0, 0)
+        startTime = perf_counter()
+        
+        try:
+            bestMove = self.searchBestMove(player, timeMs)
+        
+        finally:
+            stats.totalSeconds += perf_counter() - startTime
+            stats.searchDepth, stats.timeMs = self.searchDepth, timeMs
+            stats.completedDepth = self.completedDepth
+            
+            if table is not None:
+                stats.tableHits = table.hits - tableHits
+                stats.tableLookups = table.hits + table.misses - tableLookups
+            
+            self.searchStats, self.activeStats = stats, None
+        
+        self.enforceNodeBudget()
+        stats.retainedNodes, stats.retainedBytes = measureTreeMemory(self.root)
+        return bestMove
+
+    def searchBestMove(self, player, timeMs: float | None = None) -> tuple[int, int]:
+        """Returns the best move for the current player. See `getBestMove`."""
+        
+        self.completedDepth = 0
+        
+        # A search of the same settings already ran while the opponent was thinking (see `ponder`).
+        ponderedMove, self.ponderedMove = self.ponderedMove, None
+        if ponderedMove is not None and ponderedMove[:3] == (player, self.searchDepth, timeMs):
+            self.root.bestMove, self.completedDepth = ponderedMove[3:]
+            return ponderedMove[3]
+        
+        if self.openingBook is not None and self.root.gameBoard.player == player:
+            entry = self.openingBook.getBookEntry(self.root.gameBoard)
+            if entry is not None:
+                self.root.bestMove, self.completedDepth = entry
+                return entry[0]
+        
+        if self.endgameSolver is not None and self.root.gameBoard.player == player:
+            # The solver resets its deadline, so a cancel that came before the solve (or during it) is checked here.
+            if self.cancelled:
+                raise SearchCancelled()
+
+            startTime = perf_counter()
+            bestMove = self.endgameSolver.getBestMove(self.root.gameBoard, timeMs)
+            if self.cancelled:
+                raise SearchCancelled()
+
+            if bestMove is not None:
+                gameBoard = self.root.gameBoard
+                self.root.bestMove = bestMove
+                self.completedDepth = gameBoard.row * gameBoard.col - gameBoard.blackCount - gameBoard.whiteCount
+                return bestMove
+            
+            # The time used by the solver is taken from the budget of the heuristic search.
+            if timeMs is not None:
+                timeMs = max(0.0, timeMs - (perf_counter() - startTime) * 1000)
+        
+        if timeMs is not None:
+            return self.iterativeDeepening(player, timeMs)
+        
+        if self.useAlphaBeta:
+            bestMove = self.getBestMoveAlphaBeta(player)
+            self.completedDepth = self.searchDepth
+            return bestMove
         
         scores: dict[tuple[int, int], float] = {}
         for pos in self.root.children:
             scores[pos] = self.minMax(self.root.children[pos], player, self.searchDepth - 1)
         
+        self.completedDepth = self.searchDepth
         if not scores:
             return (-1, -1)
         
@@ -263,18 +1060,324 @@ class GameBoardTree:
         
         return max(scores, key = scores.get) # type: ignore
 
-def putDisk(gameBoard: AiGameBoard, pos: tuple[int, int]) -> AiGameBoard | None:
+    def getBestMoveAlphaBeta(self, player) -> tuple[int, int]:
+        """Returns the same move as `getBestMove` using an alpha-beta search."""
+        
+        children = self.expandNode(self.root)
+        if not children:
+            return (-1, -1)
+        
+        table = self.transpositionTable
+        firstMove = self.root.bestMove
+        if table is not None:
+            table.newSearch()
+            entry = table.lookup(self.getTableKey(self.root.gameBoard, player))
+            if entry is not None and entry[4] is not None:
+                firstMove = entry[4]
+        
+        # `getBestMove` breaks ties in favor of the first child, so the original order is kept to do the same.
+        originalOrder = {pos: index for index, pos in enumerate(children)}
+        minimizing = self.root.gameBoard.player == player
+        
+        # Below the root children, the in-place search walks a board instead of the nodes.
+        if self.searchInPlace:
+            search = lambda node, *args: self.alphaBetaInPlace(node.gameBoard, *args, node.score)
+        else:
+            search = self.alphaBeta
+        
+        bestMove, bestScore = (-1, -1), inf if minimizing else -inf
+        for pos in self.orderMoves(children, minimizing, firstMove):
+            # A child that comes before the best move wins a tie, so the window is widened by the smallest
+            # possible step to get its exact score when it is equal to the best score.
+            winsTie = bestMove == (-1, -1) or originalOrder[pos] < originalOrder[bestMove]
+            
+            if minimizing:
+                bound = nextafter(bestScore, inf) if winsTie else bestScore
+                score = search(children[pos], player, self.searchDepth - 1, -inf, bound)
+                if score < bound:
+                    bestMove, bestScore = pos, score
+            else:
+                bound = nextafter(bestScore, -inf) if winsTie else bestScore
+                score = search(children[pos], player, self.searchDepth - 1, bound, inf)
+                if score > bound:
+                    bestMove, bestScore = pos, score
+            
+            # The searched subtrees are not needed for the rest of this search, so the tree can be pruned between them.
+            self.enforceNodeBudget()
+        
+        self.root.bestMove = bestMove
+        
+        if table is not None:
+            table.store(self.getTableKey(self.root.gameBoard, player), self.searchDepth, TranspositionTable.EXACT, bestScore, bestMove)
+        
+        return bestMove
+
+    def iterativeDeepening(self, player, timeMs: float, maxDepth: int | None = None) -> tuple[int, int]:
+        """
+        Runs alpha-beta searches of depth `1, 2, 3, ...` until `timeMs` milliseconds have passed or `maxDepth` is reached,
+        and returns the best move of the deepest search that was completed. Each search tries the principal variation
+        of the previous one first, which makes it much faster than searching the same depth from scratch.
+        The depth `1` search always completes, so a move is returned even if the budget is too small.
+        """
+        
+        children = self.expandNode(self.root)
+        if not children:
+            return (-1, -1)
+        
+        self.completedDepth = 0
+        if len(children) == 1:
+            return next(iter(children))
+        
+        gameBoard = self.root.gameBoard
+        emptySquares = gameBoard.row * gameBoard.col - gameBoard.blackCount - gameBoard.whiteCount
+        maxDepth = emptySquares if maxDepth is None else max(1, min(maxDepth, emptySquares))
+        
+        searchDepth = self.searchDepth
+        startTime = perf_counter()
+        deadline = startTime + timeMs / 1000
+        bestMove = (-1, -1)
+        
+        try:
+            for depth in range(1, maxDepth + 1):
+                iterationStart = perf_counter()
+                self.searchDepth = depth
+                self.deadline = deadline if depth > 1 else None
+                
+                bestMove = self.getBestMoveAlphaBeta(player)
+                self.completedDepth = depth
+                
+                # The next search is at least as slow as this one, so it is not started if it cannot finish in time.
+                now = perf_counter()
+                if now - iterationStart > deadline - now:
+                    break
+        
+        except SearchTimeout:
+            pass
+        
+        finally:
+            self.searchDepth = searchDepth
+            self.deadline = None
+        
+        return bestMove
+
+    def ponder(self, player, timeMs: float | None = None) -> None:
+        """
+        Searches the best move of `player` after each possible move of the opponent, who is to move at the root, so the next
+        `getBestMove` call returns at once after `advanceRoot`. Meant to run on the opponent's time (see `OthelloAiWorker.AiWorker`).
+        The most likely opponent moves are searched first, and each search is kept in `ponderedMoves` as soon as it is finished.
+        The searches that are cancelled before they finish are not lost either, as they fill the transposition table and the subtree of their move.
+        """
+        
+        root = self.root
+        if root.gameBoard.player == player:
+            return
+        
+        self.ponderedMove, self.ponderedMoves = None, {}
+        children = self.expandNode(root)
+        
+        # The statistics are only kept for the searches that are played.
+        collectStats, self.collectStats = self.collectStats, False
+        
+        # The root is a maximizing node of the search of `player`, as the opponent is to move.
+        replies = [pos for pos in self.orderMoves(children, False, root.bestMove) if children[pos].gameBoard.player == player]
+        
+        # The search of each reply only sees the subtree of its move, so each one gets an equal share of the node budget,
+        # and the subtrees of all the replies fit in the budget together.
+        maxNodes, maxBytes = self.maxNodes, self.maxBytes
+        budget = self.getNodeBudget()
+        replyBudget = max(budget // max(len(replies), 1), 1) if budget is not None else None
+        
+        try:
+            for pos in replies:
+                if self.cancelled:
+                    raise SearchCancelled()
+                
+                # Each opponent move is searched as if it was played, with its node as the root.
+                child = children[pos]
+                self.root, self.treeSize = child, self.countNodes(child)
+                if budget is not None:
+                    self.maxNodes, self.maxBytes = replyBudget, None
+                
+                try:
+                    self.expandTree()
+                    bestMove = self.searchBestMove(player, timeMs)
+                
+                finally:
+                    self.root = root
+                    self.maxNodes, self.maxBytes = maxNodes, maxBytes
+                    self.treeSize = self.countNodes(root)
+                    self.enforceNodeBudget()
+                
+                self.ponderedMoves[pos] = (player, self.searchDepth, timeMs, bestMove, self.completedDepth)
+        
+        finally:
+            self.collectStats = collectStats
+            self.enforceNodeBudget()
+
+    def cancelSearch(self) -> None:
+        """
+        Stops the running search of this tree as soon as possible, with a `SearchCancelled` exception in the thread that runs it.
+        The tree stays usable: the nodes expanded so far are kept, and the next search starts once `cancelled` is reset.
+        """
+        
+        self.cancelled = True
+        if self.endgameSolver is not None:
+            self.endgameSolver.deadline = 0.0
+
+    def getPrincipalVariation(self) -> list[tuple[int, int]]:
+        """Returns the sequence of best moves found by the last alpha-beta search, starting from the root."""
+        
+        moves: list[tuple[int, int]] = []
+        node = self.root
+        while node.bestMove is not None and node.bestMove in node.children:
+            moves.append(node.bestMove)
+            node = node.children[node.bestMove]
+        
+        return moves
+
+@cache
+def getNodeBytes(boardClass: type, size: int) -> int:
+    """
+    Returns an estimate of the memory in bytes of a `GameBoardNode` whose board is of the given class and size. Used by the `maxBytes`
+    budget of `GameBoardTree`. The tables that all the boards of the same class and size share (like the rays of the squares) are not counted.
+    """
+    
+    def newBoard() -> AiGameBoard | AiBitGameBoard:
+        return boardClass() if issubclass(boardClass, AiBitGameBoard) else boardClass(size)
+    
+    gameBoard, otherBoard = newBoard(), newBoard()
+    shared = [value for value, otherValue in zip(getAttributeValues(gameBoard), getAttributeValues(otherBoard))
+              if value is otherValue and isinstance(value, (tuple, list, dict, set, frozenset))]
+    
+    # The board after a move also holds the incremental state (like the stability directions) of the boards in the tree.
+    childBoard = putDisk(gameBoard, min(gameBoard.possibleMoves))
+    return measureTreeMemory(GameBoardNode(childBoard), shared)[1] # type: ignore
+
+def newAiGameBoard(size: int | None = None) -> AiGameBoard | AiBitGameBoard:
+    """
+    Returns a new AI game board using the backend selected by `configs.AI_BOARD_BACKEND`,
+    with `size` rows and columns (`configs.ROW_COL` by default).
+    """
+    
+    if AI_BOARD_BACKEND == "bitboard":
+        return getAiBitGameBoardClass(ROW_COL if size is None else size)()
+    
+    return AiGameBoard(size)
+
+def packGameBoard(gameBoard: AiGameBoard | AiBitGameBoard) -> tuple[int, ...]:
+    """
+    Returns a compact form of the AI game board that is cheap to send to other processes:
+    `(player, black, white, stable, blackStableDisksCount, whiteStableDisksCount, blackSemiStableDirections, whiteSemiStableDirections)`,
+    where `black`, `white` and `stable` have the bit `row * col_count + col` set for each disk.
+    """
+    
+    if isinstance(gameBoard, AiBitGameBoard):
+        black, white, stable = gameBoard.black, gameBoard.white, gameBoard.stable
+    
+    else:
+        black = white = stable = 0
+        for row in range(gameBoard.row):
+            for col in range(gameBoard.col):
+                bit = 1 << (row * gameBoard.col + col)
+                if gameBoard.disks[row][col] == 1:
+                    black |= bit
+                elif gameBoard.disks[row][col] == 2:
+                    white |= bit
+                
+                if gameBoard.stableDisks[row][col]:
+                    stable |= bit
+    
+    return (gameBoard.player, black, white, stable,
+            gameBoard.blackStableDisksCount, gameBoard.whiteStableDisksCount,
+            gameBoard.blackSemiStableDirections, gameBoard.whiteSemiStableDirections)
+
+def unpackGameBoard(packed: tuple[int, ...], size: int | None = None) -> AiGameBoard | AiBitGameBoard:
+    """
+    Returns an AI game board of the backend selected by `configs.AI_BOARD_BACKEND` from the output of `packGameBoard`.
+    The packed form does not have the board size, so the boards of other sizes than `configs.ROW_COL` need `size`.
+    """
+    
+    player, black, white, stable, *counters = packed
+    gameBoard = newAiGameBoard(size)
+    gameBoard.player = player
+    
+    if isinstance(gameBoard, AiBitGameBoard):
+        gameBoard.black, gameBoard.white, gameBoard.stable = black, white, stable
+        gameBoard.evaluatePossibleMoves()
+    
+    else:
+        for row in range(gameBoard.row):
+            for col in range(gameBoard.col):
+                bit = 1 << (row * gameBoard.col + col)
+                gameBoard.disks[row][col] = 1 if black & bit else 2 if white & bit else 0
+                gameBoard.stableDisks[row][col] = gameBoard.disks[row][col] if stable & bit else 0
+        
+        gameBoard.resetFrontier()
+        gameBoard.evaluatePossibleMoves()
+        gameBoard.blackCount, gameBoard.whiteCount = black.bit_count(), white.bit_count()
+    
+    (gameBoard.blackStableDisksCount, gameBoard.whiteStableDisksCount,
+     gameBoard.blackSemiStableDirections, gameBoard.whiteSemiStableDirections) = counters
+    gameBoard.zobristHash = zobristHash(gameBoard.disks, player)
+    
+    return gameBoard
+
+def formatGameBoard(gameBoard: GameBoard) -> str:
+    """Returns the disks of the game board as a string of `X` (black), `O` (white) and `-` (empty), row by row."""
+    
+    return "".join("XO"[value - 1] if value > 0 else "-" for disksRow in gameBoard.disks for value in disksRow)
+
+def parseGameBoard(text: str, player = 1) -> AiGameBoard | AiBitGameBoard:
+    """
+    Returns an AI game board with the disks of the output of `formatGameBoard` (whitespace is ignored) and the given player to move.
+    The stable disks are found by a full update, so they can differ from the ones of the game that reached the position.
+    The board size is the square root of the number of characters.
+    """
+    
+    text = "".join(text.split())
+    size = isqrt(len(text))
+    if size * size != len(text) or size < 4 or size % 2 or set(text) - set("XO-"):
+        raise ValueError(f"Expected the square of an even size of 'X', 'O' and '-', got {text!r}.")
+    
+    gameBoard = newAiGameBoard(size)
+    gameBoard.player = player
+    if isinstance(gameBoard, AiBitGameBoard):
+        gameBoard.black = sum(1 << index for index, char in enumerate(text) if char == "X")
+        gameBoard.white = sum(1 << index for index, char in enumerate(text) if char == "O")
+        gameBoard.evaluatePossibleMoves()
+    
+    else:
+        for index, char in enumerate(text):
+            gameBoard.disks[index // gameBoard.col][index % gameBoard.col] = "-XO".index(char)
+        
+        gameBoard.resetFrontier()
+    
+    gameBoard.updateCount()
+    gameBoard.zobristHash = zobristHash(gameBoard.disks, player)
+    
+    return gameBoard
+
+def putDisk(gameBoard: AiGameBoard | AiBitGameBoard, pos: tuple[int, int]) -> AiGameBoard | AiBitGameBoard | None:
     """Puts a disk at the specified position on the game board."""
     
+    if isinstance(gameBoard, AiBitGameBoard):
+        return gameBoard.putDisk(pos)
+    
     if not (0 <= pos[0] < gameBoard.row and 0 <= pos[1] < gameBoard.col and gameBoard.disks[pos[0]][pos[1]] == -1):
         return
     
     # If the position is within the boundaries and the location is empty, then put the disk.
     newGameBoard = gameBoard.shallowCopy()
-    newGameBoard.disks[pos[0]][pos[1]] = gameBoard.player
-    newGameBoard.captureDisks(pos)
+    newGameBoard.makeMove(pos)
     
+    return newGameBoard
+
+def passTurn(gameBoard: AiGameBoard | AiBitGameBoard) -> AiGameBoard | AiBitGameBoard:
+    """Returns a copy of the game board where the current player, who has no possible moves, passes the turn to the opponent."""
+    
+    newGameBoard = gameBoard.shallowCopy()
     newGameBoard.player = 3 - gameBoard.player
-    newGameBoard.updateCount()
+    newGameBoard.zobristHash ^= ZOBRIST_PLAYER_KEY
+    newGameBoard.evaluatePossibleMoves()
     
     return newGameBoard
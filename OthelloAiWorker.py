@@ -0,0 +1,126 @@
+"""
+This module runs the AI searches in a background thread, so the game window keeps handling its events and repainting while the AI thinks.
+The searches are pure Python, so they still share the interpreter with the event loop, but the loop only needs a few milliseconds per frame.
+"""
+
+from OthelloAiCore import GameBoardTree, SearchCancelled
+from threading import Thread
+from time import perf_counter
+from typing import Callable
+
+class AiWorker:
+    """
+    Runs one `GameBoardTree.getBestMove` (or `GameBoardTree.ponder`) call at a time in a background thread. The event loop starts
+    a search with `start`, polls for its move with `poll` on every frame, and can drop it with `cancel`.
+    While `busy` is set, the tree belongs to the worker thread and must not be used by the event loop.
+    """
+
+    def __init__(self) -> None:
+        self.thread: Thread | None = None
+        """The thread of the running (or finished but not yet polled) search."""
+
+        self.gameBoardTree: GameBoardTree | None = None
+        """The tree of the running search."""
+
+        self.result: list | None = None
+        """
+        The `[move, error]` of the running search, written by its thread: the best move, or the exception that the search raised
+        (which `poll` raises again in the event loop thread). Each search has its own list, so a cancelled thread that finishes
+        late cannot overwrite the result of the next search.
+        """
+
+        self.startTime = 0.0
+        """The `perf_counter` time at which the running search was started."""
+
+        self.pondering = False
+        """Whether the running search is a `GameBoardTree.ponder` call, which runs on the opponent's time and has no move."""
+
+    @property
+    def busy(self) -> bool:
+        """Whether a search was started and its move has not been polled yet."""
+
+        return self.thread is not None
+
+    @property
+    def thinkingSeconds(self) -> float:
+        """The time since the running search was started, or `0` if there is none."""
+
+        return perf_counter() - self.startTime if self.thread is not None else 0.0
+
+    def start(self, gameBoardTree: GameBoardTree, player: int, timeMs: float | None = None, ponder = False,
+              onFinished: Callable[[], None] | None = None) -> None:
+        """
+        Starts expanding the tree and searching the best move of `player` in the background. See `GameBoardTree.getBestMove`.
+        With `ponder`, the opponent of `player` is to move, and its possible moves are searched instead. See `GameBoardTree.ponder`.
+        `onFinished` is called by the worker thread once the search has ended (with a move, an error, or cancelled), so a loop
+        that waits for other events as well can be woken up instead of polling. See `OthelloEngine`.
+        """
+
+        if self.thread is not None:
+            raise RuntimeError("The AI worker is already searching.")
+
+        gameBoardTree.cancelled = False
+        self.gameBoardTree, self.result = gameBoardTree, [None, None]
+        self.startTime = perf_counter()
+        self.pondering = ponder
+
+        # A daemon thread, so a search that is still running does not keep the game process alive after the window is closed.
+        self.thread = Thread(target=self.run, args=(gameBoardTree, player, timeMs, ponder, self.result, onFinished), daemon=True)
+        self.thread.start()
+
+    def run(self, gameBoardTree: GameBoardTree, player: int, timeMs: float | None, ponder: bool, result: list,
+            onFinished: Callable[[], None] | None) -> None:
+        """The body of the worker thread. Writes the move or the exception of the search to `result`, then calls `onFinished`."""
+
+        try:
+            if ponder:
+                gameBoardTree.ponder(player, timeMs)
+            else:
+                gameBoardTree.expandTree()
+                result[0] = gameBoardTree.getBestMove(player, timeMs)
+
+        except SearchCancelled:
+            # The statistics of a cancelled `expandTree` call would be added to the next search.
+            gameBoardTree.activeStats = None
+
+        except BaseException as error:
+            result[1] = error
+
+        finally:
+            if onFinished is not None:
+                onFinished()
+
+    def poll(self, wait = False) -> tuple[int, int] | None:
+        """
+        Returns the move of the search once it is finished (only once), or `None` while it is running or if there is none.
+        With `wait`, the search is waited for, which is almost immediate once its `onFinished` was called.
+        """
+
+        if self.thread is not None and wait:
+            self.thread.join()
+
+        if self.thread is None or self.thread.is_alive():
+            return None
+
+        (move, error), self.result = self.result, None
+        self.thread = self.gameBoardTree = None
+        self.pondering = False
+        if error is not None:
+            raise error
+
+        return move
+
+    def cancel(self, wait = False) -> None:
+        """
+        Cancels the running search, if any, and drops its result: the thread stops at its next node. The tree can be searched again
+        once the thread has stopped, which is almost immediate for the searches of this process. With `wait`, the thread is joined
+        before returning, so the tree can be used right away. Otherwise, the tree should be replaced.
+        """
+
+        if self.thread is not None:
+            self.gameBoardTree.cancelSearch()
+            if wait:
+                self.thread.join()
+
+            self.thread = self.gameBoardTree = self.result = None
+            self.pondering = False
@@ -0,0 +1,409 @@
+"""
+This module runs a local server that analyses positions for several clients at once: each request asks for the best move
+and the search score of a position at a given depth. The searches run in a pool of processes, the identical requests
+that arrive while a search is running share it, and the finished results are kept in an LRU cache keyed by the canonical
+position (see `OthelloOpeningBook.getCanonicalKey`) and the depth, so the symmetric positions share their results too.
+Run `python OthelloAnalysisServer.py --help` for the command line options.
+
+The requests and the replies are JSON objects, one per line. The requests of a connection are handled concurrently,
+so each reply has the `id` of its request:
+
+- `{"id": 1, "board": "<squares>", "player": 1, "depth": 5}` replies `{"id": 1, "move": [row, col], "score": ..., "depth": 5,
+  "cached": false, "coalesced": false, "ms": ...}`, where `<squares>` is the output of `OthelloAiCore.formatGameBoard`.
+  The move is `null` if the player has none, and the score is the one that `OthelloOpeningBook` stores for its positions.
+  The depth goes up to the `maxDepth` of the server (`--max-depth`, 8 by default).
+- `{"id": 2, "command": "metrics"}` replies `{"id": 2, "metrics": {...}}`. See `AnalysisServer.getMetrics`.
+
+A request that cannot be analysed replies `{"id": ..., "error": "<reason>"}`.
+"""
+
+from OthelloAiCore import GameBoardNode, GameBoardTree, packGameBoard, unpackGameBoard, parseGameBoard, formatGameBoard, newAiGameBoard, putDisk
+from OthelloOpeningBook import SYMMETRIES, INVERSE_SYMMETRIES, getCanonicalKey
+from OthelloTranspositionTable import TranspositionTable
+from OthelloEvaluator import newEvaluator
+from configs import AI_TRANSPOSITION_TABLE_SIZE
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+from time import perf_counter
+import asyncio, json
+
+LATENCY_WINDOW = 10_000
+"""The number of the last requests whose latencies are used for the percentiles of the metrics."""
+
+_workerTable: TranspositionTable | None = None
+"""The transposition table of a worker process. It is kept between the searches that the process runs."""
+
+def analysePackedBoard(packed: tuple[int, ...], depth: int) -> tuple[tuple[int, int], float | None, int]:
+    """
+    Returns the best move of a packed board searched to the given depth, its search score (`None` without a transposition table),
+    and the number of positions that the search generated. Runs in the worker processes.
+    """
+
+    global _workerTable
+    if _workerTable is None and AI_TRANSPOSITION_TABLE_SIZE:
+        _workerTable = TranspositionTable(AI_TRANSPOSITION_TABLE_SIZE)
+
+    gameBoard = unpackGameBoard(packed)
+    tree = GameBoardTree(GameBoardNode(gameBoard), depth, useAlphaBeta=True, transpositionTable=_workerTable, searchInPlace=True,
+                         evaluator=newEvaluator())
+    tree.expandTree()
+
+    bestMove = tree.getBestMove(gameBoard.player)
+    entry = _workerTable.lookup(tree.getTableKey(gameBoard, gameBoard.player)) if _workerTable is not None else None
+    return bestMove, entry[3] if entry is not None else None, tree.nodeCount
+
+class LruCache:
+    """A mapping of a fixed number of entries, which drops its least recently used entry when a new one does not fit."""
+
+    def __init__(self, maxSize: int) -> None:
+        self.maxSize = maxSize
+        """The number of entries that the cache keeps. `0` disables it."""
+
+        self.entries: OrderedDict = OrderedDict()
+        """The entries, from the least to the most recently used."""
+
+        self.hits = 0
+        """The number of lookups that found their key."""
+
+        self.misses = 0
+        """The number of lookups that did not find their key."""
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, key):
+        """Returns the value of the given key and marks it as the most recently used, or `None` if it is not in the cache."""
+
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def store(self, key, value) -> None:
+        """Adds or replaces the value of the given key, and drops the least recently used entry if the cache is full."""
+
+        if not self.maxSize:
+            return
+
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxSize:
+            self.entries.popitem(last=False)
+
+def getPercentile(sortedValues: list[float], fraction: float) -> float:
+    """Returns the value below which the given fraction of the sorted values are (the nearest rank), or `0` if there is none."""
+
+    if not sortedValues:
+        return 0.0
+
+    return sortedValues[min(len(sortedValues) - 1, int(fraction * len(sortedValues)))]
+
+class AnalysisServer:
+    """
+    The state of an analysis server: its process pool, the searches in flight, the result cache and the metrics.
+    Everything but the searches runs in the event loop thread, so the state needs no locks.
+    """
+
+    def __init__(self, workers: int | None = None, cacheSize = 4096, maxDepth = 8) -> None:
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        """The worker processes of the searches."""
+
+        self.maxDepth = maxDepth
+        """
+        The deepest search that a request can ask for. The searches have no time budget and cannot be stopped,
+        so a deeper one could hold a worker process (and `close`) for a very long time.
+        """
+
+        self.cache = LruCache(cacheSize)
+        """The `(move index, score)` of the finished searches by `(canonical key, depth)`. The move is in the canonical orientation."""
+
+        self.inFlight: dict[tuple[int, int], asyncio.Future] = {}
+        """The running (or queued) search of each `(canonical key, depth)`, awaited by all the requests of the same key."""
+
+        self.waitingRequests = 0
+        """The number of requests that wait for a search, including the ones that share a search."""
+
+        self.requests = 0
+        """The number of analysis requests received, including the failed ones."""
+
+        self.errors = 0
+        """The number of requests that replied an error."""
+
+        self.coalesced = 0
+        """The number of requests that shared the search of an earlier request instead of starting their own."""
+
+        self.searches = 0
+        """The number of searches sent to the worker processes."""
+
+        self.searchedNodes = 0
+        """The number of positions generated by the finished searches."""
+
+        self.latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        """The milliseconds between the arrival and the reply of the last analysis requests."""
+
+        self.startTime = perf_counter()
+        """The `perf_counter` time at which the server was created."""
+
+        self.connections: set[asyncio.Task] = set()
+        """The tasks of the open connections."""
+
+    def close(self) -> None:
+        """Stops the worker processes. The queued searches are dropped."""
+
+        self.pool.shutdown(cancel_futures=True)
+
+    async def search(self, key: tuple[int, int], packed: tuple[int, ...], symmetryIndex: int, depth: int) -> tuple[int, float | None]:
+        """Runs the search of the given packed board in a worker process, and returns its `(move index, score)` in the canonical orientation."""
+
+        self.searches += 1
+        try:
+            pos, score, nodes = await asyncio.get_running_loop().run_in_executor(self.pool, analysePackedBoard, packed, depth)
+        finally:
+            del self.inFlight[key]
+
+        self.searchedNodes += nodes
+        result = (SYMMETRIES[symmetryIndex][pos[0] * 8 + pos[1]], score)
+        self.cache.store(key, result)
+        return result
+
+    async def analyse(self, request: dict) -> dict:
+        """Returns the reply to an analysis request. Raises a `ValueError` if the request is not valid."""
+
+        depth, player = request.get("depth"), request.get("player")
+        if type(depth) is not int or not 0 < depth <= self.maxDepth or player not in (1, 2) or not isinstance(request.get("board"), str):
+            raise ValueError(f"Expected a 'board' string, a 'player' of 1 or 2, and a 'depth' from 1 to {self.maxDepth}.")
+
+        gameBoard = parseGameBoard(request["board"], player)
+        if gameBoard.row != 8:
+            raise ValueError("Only the 8x8 positions can be analysed.")
+
+        if not gameBoard.possibleMoves:
+            return {"move": None, "score": None, "depth": depth, "cached": False, "coalesced": False}
+
+        packed = packGameBoard(gameBoard)
+        canonicalKey, symmetryIndex = getCanonicalKey(packed[1], packed[2], player)
+        key = (canonicalKey, depth)
+
+        cached = coalesced = False
+        result = self.cache.lookup(key)
+        if result is not None:
+            cached = True
+
+        else:
+            # The identical requests that arrive while the search runs wait for the same future.
+            future = self.inFlight.get(key)
+            if future is not None:
+                coalesced = True
+                self.coalesced += 1
+            else:
+                future = self.inFlight[key] = asyncio.ensure_future(self.search(key, packed, symmetryIndex, depth))
+
+            self.waitingRequests += 1
+            try:
+                result = await asyncio.shield(future)
+            finally:
+                self.waitingRequests -= 1
+
+        index = INVERSE_SYMMETRIES[symmetryIndex][result[0]]
+        pos = (index >> 3, index & 7)
+
+        # A move that is not possible can only come from a collision of the canonical keys.
+        if pos not in gameBoard.possibleMoves:
+            raise ValueError("The cached result does not match the position.")
+
+        return {"move": list(pos), "score": result[1], "depth": depth, "cached": cached, "coalesced": coalesced}
+
+    def getMetrics(self) -> dict:
+        """
+        Returns the metrics of the server: the number of searches in the worker processes (running or queued, `queueDepth`)
+        and of the requests that wait for them, the counters of the requests, the cache hit rate, and the latency percentiles
+        (in milliseconds) of the last `LATENCY_WINDOW` requests.
+        """
+
+        latencies = sorted(self.latencies)
+        lookups = self.cache.hits + self.cache.misses
+        seconds = perf_counter() - self.startTime
+        return {
+            "queueDepth": len(self.inFlight),
+            "waitingRequests": self.waitingRequests,
+            "requests": self.requests,
+            "errors": self.errors,
+            "searches": self.searches,
+            "coalesced": self.coalesced,
+            "searchedNodes": self.searchedNodes,
+            "cacheEntries": len(self.cache),
+            "cacheHits": self.cache.hits,
+            "cacheHitRate": self.cache.hits / lookups if lookups else 0.0,
+            "latencyMs": {"p50": getPercentile(latencies, 0.5), "p90": getPercentile(latencies, 0.9),
+                          "p99": getPercentile(latencies, 0.99), "max": latencies[-1] if latencies else 0.0},
+            "requestsPerSecond": self.requests / seconds if seconds else 0.0,
+        }
+
+    async def handleRequest(self, line: bytes) -> dict:
+        """Returns the reply to a request line."""
+
+        startTime = perf_counter()
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Expected a JSON object.")
+        except ValueError as error:
+            self.errors += 1
+            return {"id": None, "error": str(error)}
+
+        if request.get("command") == "metrics":
+            return {"id": request.get("id"), "metrics": self.getMetrics()}
+
+        self.requests += 1
+        try:
+            reply = await self.analyse(request)
+        except Exception as error:
+            # The failed searches reply their error too, so their requests are not left waiting.
+            self.errors += 1
+            return {"id": request.get("id"), "error": str(error)}
+
+        milliseconds = (perf_counter() - startTime) * 1000
+        self.latencies.append(milliseconds)
+        return {"id": request.get("id"), **reply, "ms": round(milliseconds, 3)}
+
+    async def handleConnection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Reads the requests of a connection until it is closed, and writes their replies as they are ready."""
+
+        connection = asyncio.current_task()
+        self.connections.add(connection) # type: ignore
+        writeLock = asyncio.Lock()
+        tasks: set[asyncio.Task] = set()
+
+        async def reply(line: bytes) -> None:
+            data = (json.dumps(await self.handleRequest(line)) + "\n").encode()
+            async with writeLock:
+                writer.write(data)
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    task = asyncio.create_task(reply(line))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+
+            if tasks:
+                await asyncio.wait(tasks)
+
+        except ConnectionError:
+            pass
+
+        finally:
+            for task in tasks:
+                task.cancel()
+
+            writer.close()
+            self.connections.discard(connection) # type: ignore
+
+    async def serve(self, host = "127.0.0.1", port = 8765, unixPath: str | None = None) -> asyncio.AbstractServer:
+        """Starts listening on the given TCP address, or on the given Unix socket path, and returns the `asyncio` server."""
+
+        # The worker processes are started first, so they do not inherit the sockets of the connections, which would keep them open.
+        await asyncio.get_running_loop().run_in_executor(self.pool, int)
+
+        if unixPath is not None:
+            return await asyncio.start_unix_server(self.handleConnection, unixPath)
+
+        return await asyncio.start_server(self.handleConnection, host, port)
+
+async def runLoadTest(clients = 8, requestsPerClient = 20, depth = 4, workers: int | None = None, cacheSize = 4096,
+                      positions = 16, seed = 0) -> dict:
+    """
+    Starts a server on a free local port, sends it `requestsPerClient` requests from each of `clients` concurrent connections,
+    one after the other on each connection, and returns the throughput and the server metrics. The requests are drawn from
+    `positions` random midgame positions, so they repeat and exercise the cache and the sharing of the searches.
+    """
+
+    random = Random(seed)
+    boards = []
+    for _ in range(positions):
+        gameBoard = newAiGameBoard()
+        for _ in range(random.randint(16, 24)):
+            if not gameBoard.possibleMoves:
+                break
+
+            gameBoard = putDisk(gameBoard, random.choice(sorted(gameBoard.possibleMoves)))
+
+        boards.append((formatGameBoard(gameBoard), gameBoard.player))
+
+    server = AnalysisServer(workers, cacheSize)
+    listener = await server.serve(port=0)
+    port = listener.sockets[0].getsockname()[1]
+
+    async def runClient(clientIndex: int) -> None:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        clientRandom = Random(seed + clientIndex + 1)
+        for requestIndex in range(requestsPerClient):
+            board, player = clientRandom.choice(boards)
+            writer.write((json.dumps({"id": requestIndex, "board": board, "player": player, "depth": depth}) + "\n").encode())
+            await writer.drain()
+
+            reply = json.loads(await reader.readline())
+            if "error" in reply:
+                raise RuntimeError(reply["error"])
+
+        writer.close()
+        await writer.wait_closed()
+
+    try:
+        startTime = perf_counter()
+        await asyncio.gather(*(runClient(clientIndex) for clientIndex in range(clients)))
+        seconds = perf_counter() - startTime
+
+        # The server side of the connections ends once it has read their end.
+        if server.connections:
+            await asyncio.wait(server.connections)
+
+        return {"clients": clients, "requests": clients * requestsPerClient, "seconds": seconds,
+                "throughput": clients * requestsPerClient / seconds, "metrics": server.getMetrics()}
+
+    finally:
+        listener.close()
+        server.close()
+
+async def main(host: str, port: int, unixPath: str | None, workers: int | None, cacheSize: int, maxDepth: int) -> None:
+    """Runs an analysis server until the process is stopped."""
+
+    server = AnalysisServer(workers, cacheSize, maxDepth)
+    try:
+        listener = await server.serve(host, port, unixPath)
+        async with listener:
+            print(f"Listening on {unixPath or f'{host}:{port}'}.", flush=True)
+            await listener.serve_forever()
+
+    finally:
+        server.close()
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Runs a local server that analyses Othello positions for several clients at once.")
+    parser.add_argument("--host", default="127.0.0.1", help="The address to listen on.")
+    parser.add_argument("-p", "--port", type=int, default=8765, help="The TCP port to listen on.")
+    parser.add_argument("-u", "--unix", default=None, help="Listen on this Unix socket path instead of a TCP port.")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="The number of search processes. Defaults to the number of CPUs.")
+    parser.add_argument("-c", "--cache-size", type=int, default=4096, help="The number of results kept in the cache.")
+    parser.add_argument("--max-depth", type=int, default=8, help="The deepest search that a request can ask for.")
+    parser.add_argument("--load-test", type=int, default=None, metavar="CLIENTS",
+                        help="Instead of serving, measure the throughput of this many concurrent clients and print the metrics.")
+    parser.add_argument("-d", "--depth", type=int, default=4, help="The search depth of the load test requests.")
+    parser.add_argument("-n", "--requests", type=int, default=20, help="The number of requests of each load test client.")
+    args = parser.parse_args()
+
+    try:
+        if args.load_test is not None:
+            print(json.dumps(asyncio.run(runLoadTest(args.load_test, args.requests, args.depth, args.workers, args.cache_size)), indent=1))
+        else:
+            asyncio.run(main(args.host, args.port, args.unix, args.workers, args.cache_size, args.max_depth))
+    except KeyboardInterrupt:
+        pass
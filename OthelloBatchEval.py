@@ -0,0 +1,185 @@
+"""
+This module contains a batched evaluation of AI positions with NumPy. The positions are stacked as an `(N, 2)` array of
+`(own, opp)` bitboards, and the features of all of them are computed with a few vectorized operations per feature,
+instead of a Python call per position. NumPy is optional: without it, `newBatchEvaluator` returns `None`.
+"""
+
+from OthelloBitboard import DIRECTIONS
+from configs import ROW_COL, AI_BATCH_EVALUATION
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+FEATURE_NAMES = ("mobility", "discs", "corners", "xSquares", "cSquares", "edges", "stableDiscs", "frontier")
+"""The features of a position, each one the difference between the player to move and the opponent."""
+
+DEFAULT_WEIGHTS = (10.0, 1.0, 50.0, -25.0, -10.0, 2.0, 100.0, -3.0)
+"""The default weight of each feature of `FEATURE_NAMES`. The stable discs have the same weight as in `OthelloAiCore.scoreGameBoard`."""
+
+CORNERS = 0x8100000000000081
+"""The bits of the four corners."""
+
+X_SQUARES = 0x0042000000004200
+"""The bits of the squares diagonally next to the corners."""
+
+C_SQUARES = 0x4281000000008142
+"""The bits of the edge squares next to the corners."""
+
+EDGES = 0xFF818181818181FF & ~(CORNERS | C_SQUARES)
+"""The bits of the other edge squares."""
+
+EDGE_DIRECTIONS = ((1, 0x00000000000000FE | 0xFE00000000000000), (-1, 0x000000000000007F | 0x7F00000000000000),
+                   (8, 0x0101010101010100 | 0x8080808080808000), (-8, 0x0001010101010101 | 0x0080808080808080))
+"""The `(shift, mask)` steps along the edges: the masks only keep the edge squares that the step reaches without leaving its edge."""
+
+if np is not None:
+    _DIRECTIONS = tuple((np.uint64(abs(shift)), shift > 0, np.uint64(mask)) for shift, mask in DIRECTIONS)
+    _EDGE_DIRECTIONS = tuple((np.uint64(abs(shift)), shift > 0, np.uint64(mask)) for shift, mask in EDGE_DIRECTIONS)
+    _MASKS = {name: np.uint64(mask) for name, mask in (("corners", CORNERS), ("xSquares", X_SQUARES), ("cSquares", C_SQUARES), ("edges", EDGES))}
+    _BYTE_COUNTS = np.array([bin(value).count("1") for value in range(256)], dtype=np.int64)
+
+def shiftArray(bits, shift, left: bool, mask):
+    """Returns the bits of the `uint64` array shifted by `shift` (to the left if `left` is set), keeping only the `mask` bits."""
+
+    return ((bits << shift) if left else (bits >> shift)) & mask
+
+def popCount(bits):
+    """Returns the number of set bits of each value of the `uint64` array."""
+
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bits).astype(np.int64)
+
+    return _BYTE_COUNTS[bits.reshape(-1, 1).view(np.uint8)].sum(axis=1).reshape(bits.shape)
+
+def getMovesArray(own, opp):
+    """Same as `OthelloBitboard.getMovesBits` for each pair of the given `uint64` arrays."""
+
+    empty = ~(own | opp)
+    moves = np.zeros_like(own)
+    for shift, left, mask in _DIRECTIONS:
+        run = shiftArray(own, shift, left, mask) & opp
+        for _ in range(5):
+            run |= shiftArray(run, shift, left, mask) & opp
+
+        moves |= shiftArray(run, shift, left, mask) & empty
+
+    return moves
+
+def getStableArray(own):
+    """
+    Returns the discs of each `own` array value that are connected to one of its corners by its own discs along an edge.
+    These discs can never be flipped, so they are a subset of the stable discs counted by `AiGameBoard.updateCount`.
+    """
+
+    stable = own & _MASKS["corners"]
+    for _ in range(7):
+        grown = stable
+        for shift, left, mask in _EDGE_DIRECTIONS:
+            grown |= shiftArray(stable, shift, left, mask) & own
+
+        stable = grown
+
+    return stable
+
+def getFrontierArray(own, opp):
+    """Returns the discs of each `own` array value that are next to an empty square."""
+
+    empty = ~(own | opp)
+    nextToEmpty = np.zeros_like(own)
+    for shift, left, mask in _DIRECTIONS:
+        nextToEmpty |= shiftArray(empty, shift, left, mask)
+
+    return own & nextToEmpty
+
+class BatchEvaluator:
+    """
+    A linear evaluation of the features of `FEATURE_NAMES`, computed for a whole batch of positions at once.
+    The scores are from the point of view of the player to move, like the ones of `OthelloAiCore.scoreGameBoard`.
+    """
+
+    def __init__(self, weights = DEFAULT_WEIGHTS) -> None:
+        if np is None:
+            raise ImportError("The batched evaluation needs NumPy.")
+
+        self.weights = np.asarray(weights, dtype=np.float64)
+        """The weight of each feature of `FEATURE_NAMES`."""
+
+        self.batches = 0
+        """The number of batches evaluated so far."""
+
+        self.positions = 0
+        """The number of positions evaluated so far."""
+
+    def getPosition(self, gameBoard) -> tuple[int, int]:
+        """Returns the `(own, opp)` bitboards of the player to move of the given board."""
+
+        # Imported here, as `OthelloAiCore` uses the evaluator without importing this module.
+        from OthelloAiCore import packGameBoard
+
+        _, black, white, *_ = packGameBoard(gameBoard)
+        return (black, white) if gameBoard.player == 1 else (white, black)
+
+    def stackPositions(self, positions: list[tuple[int, int]]) -> "np.ndarray":
+        """Returns the `(N, 2)` `uint64` array of the given `(own, opp)` bitboards."""
+
+        return np.array(positions, dtype=np.uint64).reshape(-1, 2)
+
+    def getFeatures(self, positions: "np.ndarray") -> "np.ndarray":
+        """Returns the `(N, len(FEATURE_NAMES))` array of the features of the given `(N, 2)` array of positions."""
+
+        # The counts of both players are computed in a single pass over the `(2N,)` arrays of `(own, opp)` then `(opp, own)`,
+        # which halves the number of NumPy calls. The small batches of the search are dominated by the cost of these calls.
+        count = len(positions)
+        own = np.concatenate((positions[:, 0], positions[:, 1]))
+        opp = np.concatenate((positions[:, 1], positions[:, 0]))
+        features = np.empty((count, len(FEATURE_NAMES)), dtype=np.int64)
+
+        def difference(counts):
+            return counts[:count] - counts[count:]
+
+        features[:, 0] = difference(popCount(getMovesArray(own, opp)))
+        features[:, 1] = difference(popCount(own))
+        for column, name in enumerate(("corners", "xSquares", "cSquares", "edges"), 2):
+            features[:, column] = difference(popCount(own & _MASKS[name]))
+
+        features[:, 6] = difference(popCount(getStableArray(own)))
+        features[:, 7] = difference(popCount(getFrontierArray(own, opp)))
+        return features
+
+    def evaluate(self, positions: "np.ndarray") -> "np.ndarray":
+        """Returns the scores of the given `(N, 2)` array of positions."""
+
+        self.batches += 1
+        self.positions += len(positions)
+        return self.getFeatures(positions) @ self.weights
+
+    def scorePositions(self, positions: list[tuple[int, int]]) -> list[float]:
+        """Returns the scores of the given `(own, opp)` bitboards, evaluated in a single batch."""
+
+        if not positions:
+            return []
+
+        return self.evaluate(self.stackPositions(positions)).tolist()
+
+    def scoreGameBoards(self, gameBoards) -> list[float]:
+        """Returns the scores of the given boards, evaluated in a single batch."""
+
+        return self.scorePositions([self.getPosition(gameBoard) for gameBoard in gameBoards])
+
+    def scoreNodes(self, nodes) -> None:
+        """Sets the `score` of each of the given `GameBoardNode`s, evaluated in a single batch."""
+
+        nodes = list(nodes)
+        for node, score in zip(nodes, self.scoreGameBoards([node.gameBoard for node in nodes])):
+            node.score = score
+
+def newBatchEvaluator() -> BatchEvaluator | None:
+    """
+    Returns a new batch evaluator if it is enabled in `configs` and NumPy is installed. Otherwise, returns `None`.
+    The positions are stacked as `uint64` values, so the other board sizes than 8x8 have no batch evaluator.
+    """
+
+    if AI_BATCH_EVALUATION and np is not None and ROW_COL == 8:
+        return BatchEvaluator()
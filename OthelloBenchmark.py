@@ -0,0 +1,506 @@
+"""
+This module is used to measure the speed of the AI board operations and searches on a fixed corpus of positions
+(`OthelloBenchmarkPositions.json`), and to check the move generation with perft counts, so the results can be compared across commits.
+Run `python OthelloBenchmark.py --help` for the command line options.
+"""
+
+from OthelloCore import GameBoard
+from OthelloAiCore import (GameBoardNode, GameBoardTree, AiGameBoard, AiBitGameBoard, newAiGameBoard, passTurn, putDisk, scoreGameBoard,
+                           formatGameBoard, parseGameBoard)
+from OthelloBitboard import getAiBitGameBoardClass
+from OthelloTranspositionTable import TranspositionTable
+from OthelloSearchStats import measureTreeMemory
+from OthelloBatchEval import BatchEvaluator, np
+from configs import AI_BOARD_BACKEND, AI_USE_ALPHA_BETA, AI_TRANSPOSITION_TABLE_SIZE, AI_SEARCH_IN_PLACE
+from os import path
+from random import Random
+from time import perf_counter
+from typing import Callable
+import json, platform, subprocess, sys, tracemalloc
+
+CORPUS_PATH = path.join(path.dirname(path.abspath(__file__)), "OthelloBenchmarkPositions.json")
+"""The checked-in corpus of benchmark positions."""
+
+def loadCorpus(corpusPath = CORPUS_PATH) -> list[dict]:
+    """
+    Returns the positions of the corpus. Each position has a `name`, a `phase` (`opening`, `midgame` or `endgame`),
+    the `player` to move, the `board` rows (see `OthelloAiCore.formatGameBoard`) and its `perft` counts for the depths `1, 2, ...`.
+    """
+
+    with open(corpusPath) as corpusFile:
+        return json.load(corpusFile)["positions"]
+
+def perft(gameBoard: AiGameBoard | AiBitGameBoard, depth: int) -> int:
+    """
+    Returns the number of move sequences of `depth` moves from the given board, using the same `makeMove`/`undoMove` as the AI search.
+    A pass counts as a move, and a finished game counts as a single sequence.
+    """
+
+    if not depth:
+        return 1
+
+    moves = gameBoard.possibleMoves
+    if not moves:
+        passedBoard = passTurn(gameBoard)
+        return perft(passedBoard, depth - 1) if passedBoard.possibleMoves else 1
+
+    if depth == 1:
+        return len(moves)
+
+    count = 0
+    for pos in list(moves):
+        record = gameBoard.makeMove(pos)
+        count += perft(gameBoard, depth - 1)
+        gameBoard.undoMove(record)
+
+    return count
+
+def referencePerft(disks: list[list[int]], player: int, depth: int) -> int:
+    """Same as `perft`, but uses the plain game rules of `OthelloCore.GameBoard`. Used to compute the counts of the corpus."""
+
+    if not depth:
+        return 1
+
+    gameBoard = GameBoard()
+    gameBoard.disks = [row[:] for row in disks]
+    gameBoard.player = player
+    gameBoard.resetFrontier()
+    gameBoard.evaluatePossibleMoves()
+
+    if not gameBoard.possibleMoves:
+        gameBoard.player = 3 - player
+        gameBoard.evaluatePossibleMoves()
+        return referencePerft(disks, 3 - player, depth - 1) if gameBoard.possibleMoves else 1
+
+    count = 0
+    for pos in gameBoard.possibleMoves:
+        child = [[max(value, 0) for value in row] for row in gameBoard.disks]
+        childBoard = GameBoard()
+        childBoard.disks, childBoard.player = child, player
+        childBoard.resetFrontier()
+        childBoard.disks[pos[0]][pos[1]] = player
+        childBoard.captureDisks(pos)
+        count += referencePerft(childBoard.disks, 3 - player, depth - 1)
+
+    return count
+
+def checkPerft(positions: list[dict], maxDepth: int | None = None) -> list[dict]:
+    """Returns the perft counts of the AI boards that do not match the counts of the corpus. An empty list means all of them match."""
+
+    mismatches = []
+    for position in positions:
+        for depth, expected in enumerate(position["perft"][:maxDepth], 1):
+            count = perft(parseGameBoard("".join(position["board"]), position["player"]), depth)
+            if count != expected:
+                mismatches.append({"name": position["name"], "depth": depth, "expected": expected, "count": count})
+
+    return mismatches
+
+class BudgetTree(GameBoardTree):
+    """A game board tree that records the size of the whole tree each time its node budget is enforced. Used by `checkPonderBudget`."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super(BudgetTree, self).__init__(*args, **kwargs)
+
+        self.wholeRoot = self.root
+        """The root of the whole tree, as `ponder` moves `root` to each reply while it searches it."""
+
+        self.peakNodes = 0
+        """The largest size of the whole tree before it was pruned."""
+
+        self.prunedNodes = 0
+        """The largest size of the whole tree after it was pruned."""
+
+    def enforceNodeBudget(self) -> None:
+        self.peakNodes = max(self.peakNodes, self.countNodes(self.wholeRoot))
+        super(BudgetTree, self).enforceNodeBudget()
+        self.prunedNodes = max(self.prunedNodes, self.countNodes(self.wholeRoot))
+
+def checkPonderBudget(positions: list[dict], depth = 3, maxNodes = 1000) -> list[dict]:
+    """
+    Ponders the replies to each position with a `maxNodes` budget (and the search options of `configs`), and returns the positions
+    whose whole tree was left with more than `maxNodes` nodes by a pruning. An empty list means the budget held.
+    Between two prunings, the tree grows by the search of a single move, the same as in `getBestMove`.
+    """
+
+    overruns = []
+    for position in positions:
+        gameBoard = parseGameBoard("".join(position["board"]), position["player"])
+        tree = BudgetTree(GameBoardNode(gameBoard), depth, useAlphaBeta=AI_USE_ALPHA_BETA, searchInPlace=AI_SEARCH_IN_PLACE, maxNodes=maxNodes)
+        tree.ponder(3 - gameBoard.player)
+
+        if tree.prunedNodes > maxNodes or tree.treeSize > maxNodes:
+            overruns.append({"name": position["name"], "maxNodes": maxNodes, "prunedNodes": tree.prunedNodes,
+                             "peakNodes": tree.peakNodes, "treeSize": tree.treeSize})
+
+    return overruns
+
+def timeCalls(function: Callable[[], object], minSeconds = 0.2) -> tuple[int, float]:
+    """Calls `function` repeatedly for at least `minSeconds` seconds, and returns the number of calls and the seconds per call."""
+
+    calls, startTime = 0, perf_counter()
+    while True:
+        function()
+        calls += 1
+        seconds = perf_counter() - startTime
+        if seconds >= minSeconds:
+            return calls, seconds / calls
+
+def measurePeakMemory(function: Callable[[], object]) -> int:
+    """Returns the peak number of bytes allocated by a call of `function`, as traced by `tracemalloc`."""
+
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def newBenchmarkTree(gameBoard: AiGameBoard | AiBitGameBoard, depth: int, useAlphaBeta: bool,
+                     batchEvaluator: BatchEvaluator | None = None) -> GameBoardTree:
+    """Returns a new tree of the given board with the search options selected in `configs`, and a new transposition table."""
+
+    table = TranspositionTable(AI_TRANSPOSITION_TABLE_SIZE) if useAlphaBeta and AI_TRANSPOSITION_TABLE_SIZE else None
+    return GameBoardTree(GameBoardNode(gameBoard.shallowCopy()), depth, useAlphaBeta=useAlphaBeta, transpositionTable=table,
+                         searchInPlace=AI_SEARCH_IN_PLACE, batchEvaluator=batchEvaluator)
+
+def benchmarkBoardOperations(gameBoard: AiGameBoard | AiBitGameBoard, minSeconds: float) -> dict[str, dict]:
+    """Times the board operations that the search runs for every node, once for each possible move of the given board."""
+
+    moves = sorted(gameBoard.possibleMoves)
+    results = {}
+
+    def addResult(name: str, function: Callable[[], object], calls: int) -> None:
+        _, seconds = timeCalls(function, minSeconds)
+        results[name] = {"calls": calls, "microseconds": seconds / calls * 1e6}
+
+    # The boards are copied before the timed calls, as `captureDisks` and `updateCount` change them.
+    def copies() -> list:
+        return [gameBoard.shallowCopy() for _ in moves]
+
+    def captureAll(boards: list) -> None:
+        for board, pos in zip(boards, moves):
+            if isinstance(board, AiGameBoard):
+                board.disks[pos[0]][pos[1]] = board.player
+
+            board.captureDisks(pos)
+
+    addResult("evaluatePossibleMoves", gameBoard.shallowCopy().evaluatePossibleMoves, 1)
+    if not moves:
+        return results
+
+    captured = copies()
+    captureAll(captured)
+
+    addResult("shallowCopy", copies, len(moves))
+    addResult("captureDisks", lambda: captureAll(copies()), len(moves))
+    addResult("updateCount", lambda: [board.shallowCopy().updateCount() for board in captured], len(moves))
+    addResult("putDisk", lambda: [putDisk(gameBoard, pos) for pos in moves], len(moves))
+    addResult("scoreGameBoard", lambda: [scoreGameBoard(board) for board in captured], len(moves))
+
+    # The batch evaluation is timed on a batch of many positions, like the frontiers of `expandTree`. The alpha-beta searches
+    # score much smaller batches (the moves of a single position), see `benchmarkBatchSearch` for their end to end times.
+    if np is not None:
+        evaluator = BatchEvaluator()
+        positions = [evaluator.getPosition(board) for board in captured] * 64
+        addResult("batchEvaluation", lambda: evaluator.scorePositions(positions), len(positions))
+
+    # `captureDisks` and `updateCount` are timed on copies, so the time of the copies is removed from them.
+    for name in ("captureDisks", "updateCount"):
+        results[name]["microseconds"] = max(0.0, results[name]["microseconds"] - results["shallowCopy"]["microseconds"])
+
+    return results
+
+def benchmarkSearch(gameBoard: AiGameBoard | AiBitGameBoard, depths: list[int], expandDepths: list[int], measureMemory = True) -> dict[str, list]:
+    """Times `expandTree` (the full minimax tree) and `getBestMove` (with the search options of `configs`) at the given depths."""
+
+    def search(name: str, tree: GameBoardTree) -> tuple[int, int] | None:
+        tree.expandTree()
+        return tree.getBestMove(gameBoard.player) if name == "getBestMove" else None
+
+    results: dict[str, list] = {"expandTree": [], "getBestMove": []}
+    for name, searchDepths, useAlphaBeta in (("expandTree", expandDepths, False), ("getBestMove", depths, AI_USE_ALPHA_BETA)):
+        for depth in searchDepths:
+            tree = newBenchmarkTree(gameBoard, depth, useAlphaBeta)
+            startTime = perf_counter()
+            move = search(name, tree)
+            seconds = perf_counter() - startTime
+
+            result = {"depth": depth, "nodes": tree.nodeCount, "seconds": seconds,
+                      "nodesPerSecond": tree.nodeCount / seconds if seconds else 0.0}
+            if move is not None:
+                result["move"] = list(move)
+
+            # The memory is measured by another search, as tracing the allocations slows it down.
+            if measureMemory:
+                memoryTree = newBenchmarkTree(gameBoard, depth, useAlphaBeta)
+                result["peakBytes"] = measurePeakMemory(lambda: search(name, memoryTree))
+
+            results[name].append(result)
+
+    return results
+
+def benchmarkBatchSearch(gameBoard: AiGameBoard | AiBitGameBoard, depth: int) -> dict[str, list]:
+    """
+    Times the same searches as `benchmarkSearch` at the given depth from start to end, without and then with a `BatchEvaluator`.
+    The batch evaluator is a different evaluation function, so the searches may visit different numbers of nodes and select different moves.
+    """
+
+    results: dict[str, list] = {"expandTree": [], "getBestMove": []}
+    for name, useAlphaBeta in (("expandTree", False), ("getBestMove", AI_USE_ALPHA_BETA)):
+        for batchEvaluator in (None, BatchEvaluator()):
+            tree = newBenchmarkTree(gameBoard, depth, useAlphaBeta, batchEvaluator)
+            startTime = perf_counter()
+            tree.expandTree()
+            move = tree.getBestMove(gameBoard.player) if name == "getBestMove" else None
+            seconds = perf_counter() - startTime
+
+            result = {"depth": depth, "batch": batchEvaluator is not None, "nodes": tree.nodeCount, "seconds": seconds,
+                      "nodesPerSecond": tree.nodeCount / seconds if seconds else 0.0}
+            if move is not None:
+                result["move"] = list(move)
+
+            if batchEvaluator is not None:
+                result["batches"] = batchEvaluator.batches
+                result["batchPositions"] = batchEvaluator.positions
+
+            results[name].append(result)
+
+    return results
+
+def measureNodeMemory(positions: list[dict], depth = 3) -> dict[str, float]:
+    """
+    Returns the memory per node of the full trees of the given depth (built by `expandTree`) of the positions,
+    as traced by `tracemalloc` and as estimated by `OthelloSearchStats.measureTreeMemory`.
+    """
+
+    nodes = tracedBytes = estimatedBytes = 0
+    for position in positions:
+        gameBoard = parseGameBoard("".join(position["board"]), position["player"])
+
+        tracemalloc.start()
+        try:
+            tree = GameBoardTree(GameBoardNode(gameBoard), depth)
+            tree.expandTree()
+            tracedBytes += tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+
+        treeNodes, treeBytes = measureTreeMemory(tree.root)
+        nodes += treeNodes
+        estimatedBytes += treeBytes
+
+    return {"depth": depth, "nodes": nodes, "bytesPerNode": tracedBytes / nodes if nodes else 0.0,
+            "estimatedBytesPerNode": estimatedBytes / nodes if nodes else 0.0}
+
+def getCommit() -> str | None:
+    """Returns the git commit of this module, if it is in a git repository."""
+
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=path.dirname(path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def runBenchmarks(positions: list[dict], depths = range(1, 7), expandDepths = range(1, 5), minSeconds = 0.2,
+                  measureMemory = True, perftDepth: int | None = None, batchDepth = 3) -> dict:
+    """
+    Runs the perft check and the benchmarks of every position, and returns all the results with the totals of each phase.
+    `getBestMove` is timed at `depths` (1 to 6 by default) and `expandTree` at `expandDepths` (1 to 4 by default), as the full
+    minimax tree of `expandTree` grows by about the number of moves per ply and does not fit in memory much deeper.
+    Both are also timed at `batchDepth` without and with the batch evaluation (if NumPy is installed and `batchDepth` is not `0`).
+    The results are the same JSON document that `compareResults` reads.
+    """
+
+    mismatches = checkPerft(positions, perftDepth)
+    overruns = checkPonderBudget(positions)
+    results = {
+        "commit": getCommit(),
+        "python": platform.python_version(),
+        "backend": AI_BOARD_BACKEND,
+        "useAlphaBeta": AI_USE_ALPHA_BETA,
+        "transpositionTableSize": AI_TRANSPOSITION_TABLE_SIZE,
+        "searchInPlace": AI_SEARCH_IN_PLACE,
+        "perftOk": not mismatches,
+        "perftMismatches": mismatches,
+        "ponderBudgetOk": not overruns,
+        "ponderBudgetOverruns": overruns,
+        "nodeMemory": measureNodeMemory(positions),
+        "positions": [],
+        "totals": {},
+    }
+
+    for position in positions:
+        gameBoard = parseGameBoard("".join(position["board"]), position["player"])
+        positionResults = {"name": position["name"], "phase": position["phase"],
+                           "operations": benchmarkBoardOperations(gameBoard, minSeconds),
+                           **benchmarkSearch(gameBoard, list(depths), list(expandDepths), measureMemory)}
+        if np is not None and batchDepth:
+            positionResults["batchSearch"] = benchmarkBatchSearch(gameBoard, batchDepth)
+
+        results["positions"].append(positionResults)
+
+        # The totals are kept for each phase and search depth, as they are the numbers to compare across commits.
+        for name in ("expandTree", "getBestMove"):
+            for result in positionResults[name]:
+                total = results["totals"].setdefault(f"{position['phase']}/{name}/{result['depth']}",
+                                                     {"nodes": 0, "seconds": 0.0, "peakBytes": 0})
+                total["nodes"] += result["nodes"]
+                total["seconds"] += result["seconds"]
+                total["peakBytes"] = max(total["peakBytes"], result.get("peakBytes", 0))
+
+            for result in positionResults.get("batchSearch", {}).get(name, []):
+                total = results["totals"].setdefault(f"{position['phase']}/{name}/{result['depth']}/{'batch' if result['batch'] else 'noBatch'}",
+                                                     {"nodes": 0, "seconds": 0.0, "peakBytes": 0})
+                total["nodes"] += result["nodes"]
+                total["seconds"] += result["seconds"]
+
+    for total in results["totals"].values():
+        total["nodesPerSecond"] = total["nodes"] / total["seconds"] if total["seconds"] else 0.0
+
+    return results
+
+def benchmarkBoardSizes(sizes = (8, 10, 12, 16), depth = 3, seed = 0) -> list[dict]:
+    """
+    Times a `getBestMove` search (with the search options of `configs`) on a midgame position of each board size, with both backends.
+    The position is reached by the same random moves on both backends, a quarter of the squares after the start.
+    """
+
+    results = []
+    for size in sizes:
+        random = Random(seed + size)
+        gameBoards = {"list": AiGameBoard(size), "bitboard": getAiBitGameBoardClass(size)()}
+        for _ in range(size * size // 4):
+            if not gameBoards["list"].possibleMoves:
+                gameBoards = {backend: passTurn(gameBoard) for backend, gameBoard in gameBoards.items()}
+                if not gameBoards["list"].possibleMoves:
+                    break
+
+            move = random.choice(sorted(gameBoards["list"].possibleMoves))
+            gameBoards = {backend: putDisk(gameBoard, move) for backend, gameBoard in gameBoards.items()}
+
+        for backend, gameBoard in gameBoards.items():
+            tree = newBenchmarkTree(gameBoard, depth, AI_USE_ALPHA_BETA)
+            startTime = perf_counter()
+            tree.expandTree()
+            move = tree.getBestMove(gameBoard.player)
+            seconds = perf_counter() - startTime
+
+            results.append({"size": size, "backend": backend, "depth": depth, "nodes": tree.nodeCount, "seconds": seconds,
+                            "nodesPerSecond": tree.nodeCount / seconds if seconds else 0.0, "move": list(move) if move else None})
+
+    return results
+
+def compareResults(old: dict, new: dict) -> list[str]:
+    """Returns a line for each total of the two results, with the old and new nodes per second and their ratio."""
+
+    lines = [f"{old.get('commit')} -> {new.get('commit')}"]
+    for key, newTotal in new["totals"].items():
+        oldTotal = old["totals"].get(key)
+        if oldTotal is None:
+            continue
+
+        ratio = newTotal["nodesPerSecond"] / oldTotal["nodesPerSecond"] if oldTotal["nodesPerSecond"] else 0.0
+        lines.append(f"{key:28} {oldTotal['nodesPerSecond']:12.0f} {newTotal['nodesPerSecond']:12.0f} nodes/s  x{ratio:.2f}"
+                     f"  nodes {oldTotal['nodes']} -> {newTotal['nodes']}")
+
+    if "nodeMemory" in old and "nodeMemory" in new:
+        oldBytes, newBytes = old["nodeMemory"]["bytesPerNode"], new["nodeMemory"]["bytesPerNode"]
+        lines.append(f"{'bytes per node':28} {oldBytes:12.0f} {newBytes:12.0f}          x{newBytes / oldBytes if oldBytes else 0.0:.2f}")
+
+    if not new.get("perftOk", True):
+        lines.append(f"PERFT MISMATCHES: {new['perftMismatches']}")
+
+    if not new.get("ponderBudgetOk", True):
+        lines.append(f"PONDER BUDGET OVERRUNS: {new['ponderBudgetOverruns']}")
+
+    return lines
+
+def buildCorpus(seed = 0, positionsPerPhase = 4, perftDepth = 4) -> dict:
+    """
+    Returns a new corpus of the starting position and positions reached by random games, with their perft counts
+    computed by `referencePerft`. Used to create `OthelloBenchmarkPositions.json`.
+    """
+
+    random = Random(seed)
+    phases = {"opening": (4, 10), "midgame": (20, 32), "endgame": (44, 50)}
+    positions = [{"name": "start", "phase": "opening", "player": 1, "game": newAiGameBoard()}]
+
+    for phase, (minPly, maxPly) in phases.items():
+        count = 0
+        while count < positionsPerPhase:
+            gameBoard, plies = newAiGameBoard(), random.randint(minPly, maxPly)
+            for _ in range(plies):
+                if not gameBoard.possibleMoves:
+                    gameBoard = passTurn(gameBoard)
+                    if not gameBoard.possibleMoves:
+                        break
+
+                gameBoard = putDisk(gameBoard, random.choice(sorted(gameBoard.possibleMoves)))
+
+            # Positions without possible moves are skipped, as they only test the passes.
+            if gameBoard.possibleMoves:
+                count += 1
+                positions.append({"name": f"{phase}-{count}", "phase": phase, "player": gameBoard.player, "game": gameBoard})
+
+    for position in positions:
+        gameBoard = position.pop("game")
+        text = formatGameBoard(gameBoard)
+        position["board"] = [text[row * gameBoard.col:(row + 1) * gameBoard.col] for row in range(gameBoard.row)]
+
+        disks = [[max(value, 0) for value in row] for row in gameBoard.disks]
+        position["perft"] = [referencePerft(disks, position["player"], depth) for depth in range(1, perftDepth + 1)]
+
+    return {"seed": seed, "positions": positions}
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Benchmarks the AI board operations and searches on the positions of the corpus.")
+    parser.add_argument("-o", "--output", default=None, help="The JSON file to write the results to. Defaults to the standard output.")
+    parser.add_argument("-c", "--compare", default=None, help="A results file of an earlier run to compare the new results with.")
+    parser.add_argument("-d", "--max-depth", type=int, default=6, help="The deepest getBestMove search.")
+    parser.add_argument("-e", "--max-expand-depth", type=int, default=4, help="The deepest expandTree (full minimax tree) expansion.")
+    parser.add_argument("-p", "--phase", action="append", default=None, help="Only benchmark the positions of this phase.")
+    parser.add_argument("--min-seconds", type=float, default=0.2, help="The minimum time of each board operation benchmark.")
+    parser.add_argument("--batch-depth", type=int, default=3, help="The depth of the searches timed with the batch evaluation (0 to skip them).")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the peak memory measurements (they run every search twice).")
+    parser.add_argument("--perft-only", action="store_true", help="Only run the perft check.")
+    parser.add_argument("--build-corpus", action="store_true", help="Write a new corpus to OthelloBenchmarkPositions.json.")
+    parser.add_argument("--board-sizes", type=int, nargs="*", default=None,
+                        help="Only time a search on each of these board sizes (8 10 12 16 by default), with both backends.")
+    args = parser.parse_args()
+
+    if args.build_corpus:
+        with open(CORPUS_PATH, "w") as corpusFile:
+            json.dump(buildCorpus(), corpusFile, indent=1)
+            corpusFile.write("\n")
+        sys.exit()
+
+    if args.board_sizes is not None:
+        for result in benchmarkBoardSizes(args.board_sizes or (8, 10, 12, 16)):
+            print(f"{result['size']:2}x{result['size']:<2} {result['backend']:8} depth {result['depth']}  {result['nodes']:7} nodes"
+                  f"  {result['seconds']:7.3f} s  {result['nodesPerSecond']:9.0f} nodes/s")
+        sys.exit()
+
+    positions = [position for position in loadCorpus() if args.phase is None or position["phase"] in args.phase]
+
+    if args.perft_only:
+        mismatches = checkPerft(positions)
+        print(json.dumps({"perftOk": not mismatches, "perftMismatches": mismatches}))
+        sys.exit(1 if mismatches else 0)
+
+    results = runBenchmarks(positions, range(1, args.max_depth + 1), range(1, args.max_expand_depth + 1), args.min_seconds, not args.no_memory,
+                            batchDepth=args.batch_depth)
+
+    if args.output:
+        with open(args.output, "w") as outputFile:
+            json.dump(results, outputFile, indent=1)
+    else:
+        print(json.dumps(results, indent=1))
+
+    if args.compare:
+        with open(args.compare) as compareFile:
+            print("\n".join(compareResults(json.load(compareFile), results)), file=sys.stderr)
+
+    sys.exit(0 if results["perftOk"] and results["ponderBudgetOk"] else 1)
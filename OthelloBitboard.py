@@ -0,0 +1,577 @@
+"""This module contains a bitboard implementation of the game board that is used by the AI to search faster."""
+
+from OthelloCore import getEdgeStableAxes
+from OthelloPatterns import updatePatternIndices
+from OthelloTranspositionTable import zobristHash, getZobristKeys, ZOBRIST_PLAYER_KEY
+from configs import SQUARE_LENGTH, ROW_COL, DIAGONAL_MARGIN, AI_STABILITY_EDGE_TABLE, AI_VERIFY_STABILITY
+from functools import cache
+
+BOARD_MASK = (1 << 64) - 1
+"""A mask with all the `64` squares of the board set."""
+
+NOT_FIRST_COL = 0xFEFEFEFEFEFEFEFE
+"""A mask of all the squares except the ones in the first (left) column."""
+
+NOT_LAST_COL = 0x7F7F7F7F7F7F7F7F
+"""A mask of all the squares except the ones in the last (right) column."""
+
+DIRECTIONS = ((1, NOT_FIRST_COL), (-1, NOT_LAST_COL), (8, BOARD_MASK), (-8, BOARD_MASK),
+              (9, NOT_FIRST_COL), (-9, NOT_LAST_COL), (7, NOT_LAST_COL), (-7, NOT_FIRST_COL))
+"""
+The eight directions as `(shift, mask)` pairs, in the same order as `GameBoard._legelSteps`.
+The square at `(row, col)` is mapped to bit `row * 8 + col`, so moving one step by `(rowStep, colStep)`
+is a shift by `rowStep * 8 + colStep`, and the mask drops the squares that wrapped around to the other side of the board.
+"""
+
+AXIS_LINE_MASKS = tuple(tuple(sum(1 << (row * 8 + col) for row in range(8) for col in range(8) if isOnLine(index >> 3, index & 7, row, col))
+                              for index in range(64))
+                        for isOnLine in (lambda row_i, col_i, row, col: row - col == row_i - col_i,
+                                         lambda row_i, col_i, row, col: col == col_i,
+                                         lambda row_i, col_i, row, col: row + col == row_i + col_i,
+                                         lambda row_i, col_i, row, col: row == row_i))
+"""
+The bits of the line that goes through each square for each of the four axes checked by `AiGameBoard.updateCount`
+(`(-1, -1)`, `(-1, 0)`, `(-1, 1)` and `(0, 1)`), indexed by the axis then the square bit index.
+"""
+
+EDGE_STABLE_AXES = tuple(axes for row in getEdgeStableAxes(8, 8) for axes in row)
+"""The axes that are always stable for each square, indexed by the square bit index. See `OthelloCore.getEdgeStableAxes`."""
+
+def squareBit(pos: tuple[int, int]) -> int:
+    """Returns the bit of the square at the given position."""
+
+    return 1 << (pos[0] * 8 + pos[1])
+
+def bitsToSquares(bits: int) -> list[tuple[int, int]]:
+    """Returns the positions of all the set bits, ordered by row then column."""
+
+    squares = []
+    while bits:
+        lowBit = bits & -bits
+        index = lowBit.bit_length() - 1
+        squares.append((index >> 3, index & 7))
+        bits ^= lowBit
+
+    return squares
+
+def getMovesBits(own: int, opp: int) -> int:
+    """Returns the bits of the empty squares where `own` can place a disk and capture some of the `opp` disks."""
+
+    empty = ~(own | opp) & BOARD_MASK
+    moves = 0
+    for shift, mask in DIRECTIONS:
+        # Sliding over the runs of opponent disks that start next to one of our disks. A run is at most `6` disks long.
+        if shift > 0:
+            run = (own << shift) & mask & opp
+            run |= (run << shift) & mask & opp
+            run |= (run << shift) & mask & opp
+            run |= (run << shift) & mask & opp
+            run |= (run << shift) & mask & opp
+            run |= (run << shift) & mask & opp
+            moves |= (run << shift) & mask & empty
+        else:
+            run = (own >> -shift) & mask & opp
+            run |= (run >> -shift) & mask & opp
+            run |= (run >> -shift) & mask & opp
+            run |= (run >> -shift) & mask & opp
+            run |= (run >> -shift) & mask & opp
+            run |= (run >> -shift) & mask & opp
+            moves |= (run >> -shift) & mask & empty
+
+    return moves
+
+def getFlipsBits(own: int, opp: int, move: int) -> int:
+    """Returns the bits of the `opp` disks that are captured when `own` places a disk at the `move` bit."""
+
+    flips = 0
+    for shift, mask in DIRECTIONS:
+        run = 0
+        square = ((move << shift) if shift > 0 else (move >> -shift)) & mask
+        while square & opp:
+            run |= square
+            square = ((square << shift) if shift > 0 else (square >> -shift)) & mask
+
+        # The run is only captured if it is closed by one of our disks.
+        if square & own:
+            flips |= run
+
+    return flips
+
+class BoardGeometry:
+    """
+    The bit layout and the tables of the bitboards of a square board of any even size. The square at `(row, col)` is mapped to bit
+    `row * size + col`, so the bitboards of the boards larger than 8x8 are simply larger Python integers, and every operation
+    stays a few shifts and masks per direction instead of a walk over the squares. The module constants above are the ones of the 8x8 board.
+    """
+
+    def __init__(self, size: int) -> None:
+        if size < 4 or size % 2:
+            raise ValueError(f"The board size must be an even number of at least 4, got {size}.")
+
+        self.size = size
+        """The number of rows and columns of the board."""
+
+        self.boardMask = (1 << (size * size)) - 1
+        """A mask with all the squares of the board set."""
+
+        firstCol = sum(1 << (row * size) for row in range(size))
+        notFirstCol = self.boardMask & ~firstCol
+        notLastCol = self.boardMask & ~(firstCol << (size - 1))
+
+        self.directions = ((1, notFirstCol), (-1, notLastCol), (size, self.boardMask), (-size, self.boardMask),
+                           (size + 1, notFirstCol), (-size - 1, notLastCol), (size - 1, notLastCol), (-size + 1, notFirstCol))
+        """The eight directions as `(shift, mask)` pairs, same as `DIRECTIONS`."""
+
+        lines = ((lambda row_i, col_i, row, col: row - col == row_i - col_i), (lambda row_i, col_i, row, col: col == col_i),
+                 (lambda row_i, col_i, row, col: row + col == row_i + col_i), (lambda row_i, col_i, row, col: row == row_i))
+        self.axisLineMasks = tuple(tuple(sum(1 << (row * size + col) for row in range(size) for col in range(size)
+                                             if isOnLine(index // size, index % size, row, col))
+                                         for index in range(size * size))
+                                   for isOnLine in lines)
+        """Same as `AXIS_LINE_MASKS`."""
+
+        self.edgeStableAxes = tuple(axes for row in getEdgeStableAxes(size, size) for axes in row)
+        """Same as `EDGE_STABLE_AXES`."""
+
+        self.zobristKeys, self.zobristFlipKeys = getZobristKeys(size)
+        """The Zobrist keys of the squares, by bit index. See `OthelloTranspositionTable.getZobristKeys`."""
+
+        # The unrolled functions of the module are faster, so they are used for the 8x8 board.
+        if size == 8:
+            self.getMoves, self.getFlips = getMovesBits, getFlipsBits
+
+    def squareBit(self, pos: tuple[int, int]) -> int:
+        """Returns the bit of the square at the given position."""
+
+        return 1 << (pos[0] * self.size + pos[1])
+
+    def bitsToSquares(self, bits: int) -> list[tuple[int, int]]:
+        """Returns the positions of all the set bits, ordered by row then column."""
+
+        squares = []
+        while bits:
+            lowBit = bits & -bits
+            squares.append(divmod(lowBit.bit_length() - 1, self.size))
+            bits ^= lowBit
+
+        return squares
+
+    def getMoves(self, own: int, opp: int) -> int:
+        """Same as `getMovesBits` on a board of this size. A run of opponent disks is at most `size - 2` disks long."""
+
+        empty = ~(own | opp) & self.boardMask
+        moves = 0
+        for shift, mask in self.directions:
+            if shift > 0:
+                run = (own << shift) & mask & opp
+                for _ in range(self.size - 3):
+                    run |= (run << shift) & mask & opp
+
+                moves |= (run << shift) & mask & empty
+            else:
+                run = (own >> -shift) & mask & opp
+                for _ in range(self.size - 3):
+                    run |= (run >> -shift) & mask & opp
+
+                moves |= (run >> -shift) & mask & empty
+
+        return moves
+
+    def getFlips(self, own: int, opp: int, move: int) -> int:
+        """Same as `getFlipsBits` on a board of this size."""
+
+        flips = 0
+        for shift, mask in self.directions:
+            run = 0
+            square = ((move << shift) if shift > 0 else (move >> -shift)) & mask
+            while square & opp:
+                run |= square
+                square = ((square << shift) if shift > 0 else (square >> -shift)) & mask
+
+            if square & own:
+                flips |= run
+
+        return flips
+
+@cache
+def getBoardGeometry(size: int) -> BoardGeometry:
+    """Returns the `BoardGeometry` of the given board size, built once per size."""
+
+    return BoardGeometry(size)
+
+class BitGameBoard:
+    """
+    A game board that stores the disks as two integers (one bit per square for each color) instead of a 2D array.
+
+    The `disks`, `possibleMoves`, `blackCount` and `whiteCount` attributes of `OthelloCore.GameBoard` are still available
+    as read-only views that are computed from the bitboards, so the GUI can display this board as is.
+    It does not subclass `GameBoard`, so that its instances only hold the slots below and no `__dict__`.
+    """
+
+    __slots__ = ("player", "black", "white", "moves", "_disks")
+
+    squareLength = SQUARE_LENGTH
+    """The length of each square on the game board."""
+
+    row = col = ROW_COL
+
+    geometry = getBoardGeometry(ROW_COL)
+    """The bit layout of the board. The boards of the other sizes are instances of the subclasses of `getAiBitGameBoardClass`."""
+
+    diagonalMargin = DIAGONAL_MARGIN
+    """The margin between the board and the top left of the game window."""
+
+    def __init__(self):
+        half, squareBit = self.row // 2, self.geometry.squareBit
+
+        self.player = 1
+        """The current plyer turn. `1` for black, `2` for white. Black always starts first."""
+
+        self.black = squareBit((half - 1, half)) | squareBit((half, half - 1))
+        """The bits of the black disks."""
+
+        self.white = squareBit((half - 1, half - 1)) | squareBit((half, half))
+        """The bits of the white disks."""
+
+        self.moves = 0
+        """The bits of the possible moves for the current player."""
+
+        self._disks: list[list[int]] | None = None
+        """A cache of the 2D array view of the board. Reset whenever the bitboards change."""
+
+        self.evaluatePossibleMoves()
+
+    @property
+    def disks(self) -> list[list[int]]:
+        """A 2D array view of the board where possible moves are marked with `-1`, same as `GameBoard.disks`."""
+
+        if self._disks is None:
+            self._disks = [[0] * self.col for _ in range(self.row)]
+            for value, bits in ((1, self.black), (2, self.white), (-1, self.moves)):
+                for row, col in self.geometry.bitsToSquares(bits):
+                    self._disks[row][col] = value
+
+        return self._disks
+
+    @property
+    def possibleMoves(self) -> set[tuple[int, int]]:
+        """The set of possible moves for the current player."""
+
+        return set(self.geometry.bitsToSquares(self.moves))
+
+    @property
+    def blackCount(self) -> int:
+        """The number of black disks on the board."""
+
+        return self.black.bit_count()
+
+    @property
+    def whiteCount(self) -> int:
+        """The number of white disks on the board."""
+
+        return self.white.bit_count()
+
+    def isPossibleMove(self, pos: tuple[int, int]) -> bool:
+        """Checks if the current player can place a disk at the given position."""
+
+        return 0 <= pos[0] < self.row and 0 <= pos[1] < self.col and bool(self.moves & self.geometry.squareBit(pos))
+
+    def evaluatePossibleMoves(self):
+        """Update the list of possible moves for the current player."""
+
+        if self.player == 1:
+            self.moves = self.geometry.getMoves(self.black, self.white)
+        else:
+            self.moves = self.geometry.getMoves(self.white, self.black)
+
+        self._disks = None
+
+    def captureDisks(self, pos: tuple[int, int]) -> int:
+        """
+        Places a disk of the current player at the given position and captures (flips) the disks of the opponent in its line of sight.
+        Returns the bits of the captured disks.
+        """
+
+        move = self.geometry.squareBit(pos)
+        if self.player == 1:
+            flips = self.geometry.getFlips(self.black, self.white, move)
+            self.black |= flips | move
+            self.white &= ~flips
+        else:
+            flips = self.geometry.getFlips(self.white, self.black, move)
+            self.white |= flips | move
+            self.black &= ~flips
+
+        self._disks = None
+        return flips
+
+    def updateCount(self):
+        """The disk counters are computed from the bitboards, so there is nothing to update."""
+
+class AiBitGameBoard(BitGameBoard):
+    """A bitboard version of `OthelloAiCore.AiGameBoard` that computes the same counters and heuristics."""
+
+    __slots__ = ("stable", "blackStableDisksCount", "whiteStableDisksCount", "blackSemiStableDirections", "whiteSemiStableDirections",
+                 "zobristHash", "stabilityDirections", "lastNewlyStable", "patternIndices")
+
+    verifyStability = AI_VERIFY_STABILITY
+    """If set, every incremental stability update is checked against a full recompute."""
+
+    def __init__(self):
+        super(AiBitGameBoard, self).__init__()
+
+        self.stable = 0
+        """The bits of the stable/safe disks on the game board. Same as `AiGameBoard.stableDisks`."""
+
+        self.blackStableDisksCount = 0
+        """Counts the number of stable/safe black disks on the board."""
+
+        self.whiteStableDisksCount = 0
+        """Counts the number of stable/safe white disks on the board."""
+
+        self.blackSemiStableDirections = 0
+        """Counts the number of directions in which the black disks cannot be captured."""
+
+        self.whiteSemiStableDirections = 0
+        """Counts the number of directions in which the white disks cannot be captured."""
+
+        self.zobristHash = zobristHash(self.disks, self.player)
+        """The Zobrist hash of the disks and the current player. Updated incrementally by `putDisk`."""
+
+        self.stabilityDirections: bytearray | None = None
+        """
+        The number of stable directions of each non-stable disk found by the last `updateCount` call, plus one, by bit index.
+        `0` means the square has no result. A byte per square takes far less memory than a dict, and every board in the search tree keeps one.
+        """
+
+        self.lastNewlyStable = 0
+        """The bits of the disks that were marked stable by the last `updateCount` call."""
+
+        self.patternIndices: list[int] | None = None
+        """
+        The index of each instance of `OthelloPatterns.PATTERN_INSTANCES`, set by the pattern evaluator the first time it scores
+        the board. Once set, it is updated incrementally by `makeMove` and passed on to the copies of the board.
+        """
+
+    def updateCount(self, changedBits: int | None = None):
+        """
+        Updates the GameBoard counters. Mirrors `AiGameBoard.updateCount`.
+        If `changedBits` (the placed and flipped disks since the last call) is given, only the stability axes
+        whose line goes through a changed square are checked again, same as `AiGameBoard.updateCount`.
+        """
+
+        # A disk is counted as stable only if it was marked stable before this call,
+        # as `AiGameBoard.updateCount` counts each disk before checking its stability.
+        self.blackStableDisksCount = (self.black & self.stable).bit_count()
+        self.whiteStableDisksCount = (self.white & self.stable).bit_count()
+        self.blackSemiStableDirections = self.whiteSemiStableDirections = 0
+
+        steps = ((-1, -1), (-1, 0), (-1, 1), (0, 1))
+        geometry = self.geometry
+        axisLineMasks, size = geometry.axisLineMasks, geometry.size
+        edgeStableAxes = geometry.edgeStableAxes if AI_STABILITY_EDGE_TABLE else None
+        stableBefore = self.stable
+
+        cached = self.stabilityDirections if changedBits is not None else None
+        if cached is not None:
+            # The result of an axis only depends on the squares in the line of that axis. So, an axis is checked again only if
+            # its line goes through a placed or flipped disk, or through a disk that was marked stable by the last update
+            # (the disks that were checked before it did not see it as stable).
+            dirtyAxes = [0, 0, 0, 0]
+            changed = changedBits | self.lastNewlyStable # type: ignore
+            while changed:
+                lowBit = changed & -changed
+                changed ^= lowBit
+                for axis in range(4):
+                    dirtyAxes[axis] |= axisLineMasks[axis][lowBit.bit_length() - 1]
+
+        directions = bytearray(size * size)
+
+        # The disks are checked in the same (row by row) order as `AiGameBoard.updateCount`, as a disk that
+        # is marked stable affects the stability of the disks that are checked after it.
+        disks = (self.black | self.white) & ~self.stable
+        while disks:
+            bit = disks & -disks
+            disks ^= bit
+            index = bit.bit_length() - 1
+
+            stabilityCounter = axis = 0
+            if cached is not None and cached[index]:
+                # The axes before the last result were stable and the next one was not. The check resumes
+                # from the first of these axes that has changed, or is skipped if none of them has changed.
+                stabilityCounter = cached[index] - 1
+                for axis in range(stabilityCounter + 1):
+                    if dirtyAxes[axis] & bit:
+                        stabilityCounter = axis
+                        break
+                else:
+                    axis = 4
+
+            while axis < 4:
+                if not (edgeStableAxes and edgeStableAxes[index][axis]) and not self.isStable(divmod(index, size), steps[axis]):
+                    break
+
+                stabilityCounter += 1
+                axis += 1
+
+            if stabilityCounter == 4:
+                self.stable |= bit
+
+                # The disks after this one see it as stable, so their lines have changed.
+                if cached is not None:
+                    for axis in range(4):
+                        dirtyAxes[axis] |= axisLineMasks[axis][index]
+
+            else:
+                directions[index] = stabilityCounter + 1
+                if self.black & bit:
+                    self.blackSemiStableDirections += stabilityCounter
+
+                else:
+                    self.whiteSemiStableDirections += stabilityCounter
+
+        self.stabilityDirections = directions
+        self.lastNewlyStable = self.stable & ~stableBefore
+        self.evaluatePossibleMoves()
+
+        if cached is not None and self.verifyStability:
+            fullBoard = self.shallowCopy()
+            fullBoard.stable = stableBefore
+            fullBoard.updateCount()
+
+            assert fullBoard.stable == self.stable, "The incremental update marked different stable disks."
+            assert (fullBoard.blackSemiStableDirections, fullBoard.whiteSemiStableDirections) == \
+                   (self.blackSemiStableDirections, self.whiteSemiStableDirections), "The incremental stability counters do not match."
+
+    def isStable(self, pos: tuple[int, int], step: tuple[int, int]):
+        """Checks if the specified disk is stable/safe at the given position and its opposite. Mirrors `AiGameBoard.isStable`."""
+
+        size = self.geometry.size
+        if self.black & (1 << (pos[0] * size + pos[1])):
+            own, opp = self.black, self.white
+        else:
+            own, opp = self.white, self.black
+
+        stabilityCounter = 0
+        for rowStep, colStep in (step, (-step[0], -step[1])):
+            row, col = pos[0] + rowStep, pos[1] + colStep
+            keepSearching = False
+
+            while True:
+                # Reached the edge of the board.
+                if not (0 <= row < size and 0 <= col < size):
+                    if keepSearching:
+                        stabilityCounter += 1
+                        break
+
+                    return True
+
+                bit = 1 << (row * size + col)
+                if own & bit:
+                    if self.stable & bit:
+                        return True
+
+                    row, col = row + rowStep, col + colStep
+                    keepSearching = True
+
+                elif opp & bit:
+                    if self.stable & bit:
+                        stabilityCounter += 1
+                        break
+
+                    row, col = row + rowStep, col + colStep
+                    keepSearching = True
+                else:
+                    break
+
+        return stabilityCounter == 2
+
+    def shallowCopy(self):
+        """Returns a shallow copy of the current game board."""
+
+        # Skipping `__init__` as every attribute is overwritten below.
+        # The class also sets the board size. See `getAiBitGameBoardClass`.
+        boardClass = type(self)
+        newBoard = boardClass.__new__(boardClass)
+        newBoard.player = self.player
+        newBoard.black = self.black
+        newBoard.white = self.white
+        newBoard.moves = self.moves
+        newBoard._disks = None
+
+        newBoard.stable = self.stable
+        newBoard.blackStableDisksCount = self.blackStableDisksCount
+        newBoard.whiteStableDisksCount = self.whiteStableDisksCount
+        newBoard.blackSemiStableDirections = self.blackSemiStableDirections
+        newBoard.whiteSemiStableDirections = self.whiteSemiStableDirections
+        newBoard.zobristHash = self.zobristHash
+        newBoard.stabilityDirections = self.stabilityDirections
+        newBoard.lastNewlyStable = self.lastNewlyStable
+        newBoard.patternIndices = self.patternIndices
+        return newBoard
+
+    def makeMove(self, pos: tuple[int, int]) -> tuple:
+        """
+        Places a disk of the current player at the given position in place and passes the turn to the opponent.
+        Returns a record of the old bitboards and counters that `undoMove` uses to restore the board.
+        """
+
+        if not self.isPossibleMove(pos):
+            raise ValueError(f"{pos} is not a possible move for player {self.player}.")
+
+        record = (self.player, self.black, self.white, self.moves, self.stable, self.zobristHash,
+                  self.blackStableDisksCount, self.whiteStableDisksCount,
+                  self.blackSemiStableDirections, self.whiteSemiStableDirections,
+                  self.stabilityDirections, self.lastNewlyStable, self.patternIndices)
+
+        geometry = self.geometry
+        index = pos[0] * geometry.size + pos[1]
+        flips = self.captureDisks(pos)
+        changedBits = flips | (1 << index)
+
+        if self.patternIndices is not None:
+            self.patternIndices = updatePatternIndices(self.patternIndices, self.player, index, flips)
+
+        hashValue = self.zobristHash ^ ZOBRIST_PLAYER_KEY ^ geometry.zobristKeys[self.player][index]
+        while flips:
+            lowBit = flips & -flips
+            hashValue ^= geometry.zobristFlipKeys[lowBit.bit_length() - 1]
+            flips ^= lowBit
+
+        self.zobristHash = hashValue
+        self.player = 3 - self.player
+        self.updateCount(changedBits)
+
+        return record
+
+    def undoMove(self, record: tuple) -> None:
+        """Restores the board to the state before the `makeMove` call that returned the given record."""
+
+        (self.player, self.black, self.white, self.moves, self.stable, self.zobristHash,
+         self.blackStableDisksCount, self.whiteStableDisksCount,
+         self.blackSemiStableDirections, self.whiteSemiStableDirections,
+         self.stabilityDirections, self.lastNewlyStable, self.patternIndices) = record
+        self._disks = None
+
+    def putDisk(self, pos: tuple[int, int]) -> "AiBitGameBoard | None":
+        """Returns a new game board with a disk of the current player placed at the given position. Same as `OthelloAiCore.putDisk`."""
+
+        if not self.isPossibleMove(pos):
+            return
+
+        newGameBoard = self.shallowCopy()
+        newGameBoard.makeMove(pos)
+
+        return newGameBoard
+
+@cache
+def getAiBitGameBoardClass(size: int) -> type[AiBitGameBoard]:
+    """
+    Returns the `AiBitGameBoard` class of the boards with `size` rows and columns: `AiBitGameBoard` itself for `configs.ROW_COL`,
+    and a subclass with its own `row`, `col` and `geometry` otherwise. The size is a class attribute, so the boards of the search tree do not store it.
+    """
+
+    if size == AiBitGameBoard.row:
+        return AiBitGameBoard
+
+    return type(f"AiBitGameBoard{size}x{size}", (AiBitGameBoard,), {"__slots__": (), "row": size, "col": size, "geometry": getBoardGeometry(size)})
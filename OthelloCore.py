@@ -1,15 +1,27 @@
 """This module contains the core logic of the Othello game that is used by other modules."""
 
 from configs import SQUARE_LENGTH, ROW_COL, DIAGONAL_MARGIN
+from functools import cache
+
+LEGAL_STEPS = ((0, 1), (0,  -1), (1,  0), (-1, 0),
+               (1, 1), (-1, -1), (1, -1), (-1, 1))
+"""The eight directions in which a player can move a disk. The opposite of the direction at index `i` is at index `i ^ 1`."""
+
+STEP_INDICES = {step: index for index, step in enumerate(LEGAL_STEPS)}
+"""The index of each direction in `LEGAL_STEPS`."""
 
 class GameBoard:
     """A class that represents the game board."""
     
-    def __init__(self):
+    def __init__(self, size: int | None = None):
         self.squareLength = SQUARE_LENGTH
         """The length of each square on the game board."""
         
-        self.row = self.col = ROW_COL # The number of rows and columns on the game board.
+        size = ROW_COL if size is None else size
+        if size < 4 or size % 2:
+            raise ValueError(f"The board size must be an even number of at least 4, got {size}.")
+        
+        self.row = self.col = size # The number of rows and columns on the game board. Defaults to `configs.ROW_COL`.
         
         self.diagonalMargin = DIAGONAL_MARGIN
         """The margin between the board and the top left of the game window."""
@@ -30,66 +42,90 @@ class GameBoard:
         self.whiteCount = 2
         """The number of white disks on the board."""
         
-        self._legelSteps = ((0, 1), (0,  -1), (1,  0), (-1, 0),
-                            (1, 1), (-1, -1), (1, -1), (-1, 1))
+        self._legelSteps = LEGAL_STEPS
         """The eight directions in which a player can move a disk."""
         
+        self.rays = getSquareRays(self.row, self.col)
+        """The squares in each direction of each square. See `getSquareRays`."""
+        
+        self.frontier: set[tuple[int, int]] = set()
+        """
+        The empty squares next to a disk, kept up to date by `captureDisks`. The possible moves are among them, so only these squares are checked.
+        The code that sets the disks directly must call `resetFrontier` afterwards.
+        """
+        
         self.possibleMoves: set[tuple[int, int]] = set()
         """A list of possible moves for the current player."""
         
+        self.resetFrontier()
         self.evaluatePossibleMoves()
 
+    def resetFrontier(self):
+        """Finds the empty squares next to a disk from scratch."""
+        
+        self.frontier = {(row, col) for row in range(self.row) for col in range(self.col)
+                         if self.disks[row][col] <= 0 and any(self.disks[ray[0][0]][ray[0][1]] > 0 for ray in self.rays[row][col] if ray)}
+
     def evaluatePossibleMoves(self):
         """Update the list of possible moves for the current player."""
         
+        disks = self.disks
+        player, opponent = self.player, 3 - self.player # (3 - 1 = 2), (3 - 2 = 1)
+        
         # Resetting the list of possible moves.
-        self.possibleMoves = set()
-        
-        # Clearing any empty positions marked as possible moves (-1) that have been found in a previous call to this function.
-        for row_i in range(self.row):
-            for col_i in range(self.col):
-                if self.disks[row_i][col_i] == -1:
-                    self.disks[row_i][col_i] = 0
-        
-        opponent = 3 - self.player # (3 - 1 = 2), (3 - 2 = 1)
-        
-        # Checking for possible moves that the current player can make by iterating over each
-        # position on the board and checking if it contains a dicks belonging to the current player.
-        # If a dick is found, then we check in all eight directions to see if there are any opposing
-        # dicks that can be captured by moving in that direction. If a sequence of opposing dicks is
-        # found, and the next position in that direction is empty, then that empty position is considered
-        # a valid move and added to the list of available positions.
-        for row_i in range(self.row):
-            for col_i in range(self.col):
-                if self.disks[row_i][col_i] == self.player:
-                    for rowStep, colStep in self._legelSteps:
-                        row, col = row_i + rowStep, col_i + colStep
-                        if 0 <= row < self.row and 0 <= col < self.col and self.disks[row][col] == opponent:
-                            while 0 <= row < self.row and 0 <= col < self.col and self.disks[row][col] == opponent:
-                                row += rowStep
-                                col += colStep
-                            if 0 <= row < self.row and 0 <= col < self.col and self.disks[row][col] == 0:
-                                self.disks[row][col] = -1 # Marking the empty position as a possible move.
-                                self.possibleMoves.add((row, col))
+        self.possibleMoves = possibleMoves = set()
+        
+        # Checking for possible moves that the current player can make by walking the rays of each empty square next to a disk.
+        # If a ray starts with a sequence of opposing disks that is closed by a disk of the current player, then the empty square
+        # is a valid move: it is marked with `-1` and added to the list of available positions. The rays end at the edge of the board,
+        # so no bounds are checked. The markers of the previous call are cleared along the way, as they are on frontier squares.
+        for row, col in self.frontier:
+            disks[row][col] = 0
+            for ray in self.rays[row][col]:
+                captures = False
+                for rayRow, rayCol in ray:
+                    value = disks[rayRow][rayCol]
+                    if value != opponent:
+                        break
+                    
+                    captures = True
+                
+                if captures and value == player:
+                    disks[row][col] = -1 # Marking the empty position as a possible move.
+                    possibleMoves.add((row, col))
+                    break
 
-    def captureDisks(self, pos: tuple[int, int]):
-        """Capture (flip) the disks of the opponent that are in the line of sight of the disk at the given position."""
-        
-        opponent = 3 - self.player
-        for rowStep, colStep in self._legelSteps:
-            row, col = pos[0] + rowStep, pos[1] + colStep
-            if 0 <= row < self.row and 0 <= col < self.col and self.disks[row][col] == opponent:
-                while 0 <= row < self.row and 0 <= col < self.col and self.disks[row][col] == opponent:
-                    row += rowStep
-                    col += colStep
+    def captureDisks(self, pos: tuple[int, int]) -> list[tuple[int, int]]:
+        """
+        Capture (flip) the disks of the opponent that are in the line of sight of the disk at the given position.
+        Returns the positions of the captured disks. The placed disk leaves the frontier, and its empty neighbors join it.
+        """
+        
+        disks, frontier = self.disks, self.frontier
+        player, opponent = self.player, 3 - self.player
+        
+        flipped: list[tuple[int, int]] = []
+        frontier.discard(pos)
+        for ray in self.rays[pos[0]][pos[1]]:
+            count = 0
+            for row, col in ray:
+                value = disks[row][col]
+                if value != opponent:
+                    break
                 
-                # After the while loop, if the current position contains a disk belonging to the current player, then capture the opponent's disks.
-                # Else if the position has no disks, then do not capture the opponent's disks.
-                if 0 <= row < self.row and 0 <= col < self.col and self.disks[row][col] == self.player:
-                    while (row, col) != (pos[0], pos[1]):
-                        row -= rowStep
-                        col -= colStep
-                        self.disks[row][col] = self.player
+                count += 1
+            
+            # If the sequence of opponent's disks is closed by a disk belonging to the current player, then capture them,
+            # from the farthest one like the original walk back. Else if the sequence ends at an empty square or at the edge, do not capture them.
+            if count and value == player:
+                for row, col in ray[count - 1::-1]:
+                    disks[row][col] = player
+                    flipped.append((row, col))
+            
+            if ray and disks[ray[0][0]][ray[0][1]] <= 0:
+                frontier.add(ray[0])
+        
+        return flipped
 
     def updateCount(self):
         """Update some of the GameBoard counters."""
@@ -104,5 +140,37 @@ class GameBoard:
                 elif self.disks[row][col] == 2:
                     self.whiteCount += 1
 
+@cache
+def getEdgeStableAxes(rows: int, cols: int) -> tuple[tuple[tuple[bool, ...], ...], ...]:
+    """
+    Returns a table of the axes (in the order checked by `OthelloAiCore.AiGameBoard.updateCount`) in which each square is next to the edge
+    of the board. `AiGameBoard.isStable` always returns `True` for these axes, as one of their two directions leaves the board right away,
+    so a corner disk is stable in all four axes and an edge disk is stable in three of them without walking the board.
+    """
+    
+    steps = ((-1, -1), (-1, 0), (-1, 1), (0, 1))
+    return tuple(tuple(tuple(not (0 <= row + rowStep < rows and 0 <= col + colStep < cols) or
+                             not (0 <= row - rowStep < rows and 0 <= col - colStep < cols) for rowStep, colStep in steps)
+                       for col in range(cols)) for row in range(rows))
+
+@cache
+def getSquareRays(rows: int, cols: int) -> tuple[tuple[tuple[tuple[tuple[int, int], ...], ...], ...], ...]:
+    """
+    Returns a table of the rays of each square: the squares in each direction of `LEGAL_STEPS` (in the same order),
+    from the nearest one to the edge of the board. Walking a ray needs no bounds check, and a ray is empty if the square is on the edge.
+    """
+    
+    def getRay(row: int, col: int, rowStep: int, colStep: int) -> tuple[tuple[int, int], ...]:
+        ray = []
+        row, col = row + rowStep, col + colStep
+        while 0 <= row < rows and 0 <= col < cols:
+            ray.append((row, col))
+            row, col = row + rowStep, col + colStep
+        
+        return tuple(ray)
+    
+    return tuple(tuple(tuple(getRay(row, col, rowStep, colStep) for rowStep, colStep in LEGAL_STEPS)
+                       for col in range(cols)) for row in range(rows))
+
 if __name__ == "__main__":
     print(GameBoard().possibleMoves)
@@ -0,0 +1,226 @@
+"""
+This module contains an exact endgame solver. With few empty squares left, the final disk difference can be searched to the end
+of the game, which is the real objective, instead of the stability heuristic of `OthelloAiCore.scoreGameBoard`.
+"""
+
+from OthelloAiCore import AiGameBoard, SearchTimeout, packGameBoard
+from OthelloBitboard import AiBitGameBoard, BOARD_MASK, getMovesBits, getFlipsBits
+from configs import ROW_COL, AI_ENDGAME_EXACT_EMPTIES, AI_ENDGAME_WLD_EMPTIES, AI_ENDGAME_TIME_MS, AI_ENDGAME_TABLE_SIZE
+from time import perf_counter
+
+QUADRANT_MASKS = tuple(sum(1 << (row * 8 + col) for row in rows for col in cols)
+                       for rows in (range(0, 4), range(4, 8)) for cols in (range(0, 4), range(4, 8)))
+"""The bits of the four `4x4` quadrants of the board, which are used as the regions of the parity ordering."""
+
+FASTEST_FIRST_EMPTIES = 7
+"""With more empty squares than this, the moves are ordered by the opponent mobility (fastest-first). Otherwise by parity."""
+
+TABLE_EMPTIES = 7
+"""The positions with at least this many empty squares are stored in the hash table. The smaller ones are faster to search again."""
+
+class EndgameSolver:
+    """
+    A negamax alpha-beta search of the final disk difference, used by `GameBoardTree.getBestMove` for the last empty squares.
+    The positions are `(own, opp)` bitboards of the player to move, so both AI board backends are solved the same way.
+
+    With at most `exactEmpties` empty squares, the exact final score is searched. With at most `wldEmpties`, only
+    whether the game is won, lost or drawn is searched (a null window around `0`), which is much faster.
+    """
+
+    def __init__(self, exactEmpties = 12, wldEmpties = 14, tableSize = 1 << 16, timeMs: float | None = None) -> None:
+        self.exactEmpties = exactEmpties
+        """The number of empty squares at which the exact final score is searched."""
+
+        self.wldEmpties = wldEmpties
+        """The number of empty squares at which the win/loss/draw result is searched."""
+
+        self.tableSize = tableSize
+        """The maximum number of positions in `table`. The table is cleared when it is full."""
+
+        self.table: dict[tuple[int, int], tuple[int, int]] = {}
+        """The `(lower, upper)` bounds of the final score of the searched `(own, opp)` positions."""
+
+        self.timeMs = timeMs
+        """The time budget of a solve, used if `getBestMove` is not given one. `None` means no limit."""
+
+        self.deadline: float | None = None
+        """The `perf_counter` time at which the running solve is stopped."""
+
+        self.nodes = 0
+        """The number of positions visited by the running (or last) solve."""
+
+        self.lastResult: dict[str, object] = {}
+        """The mode, move, score, number of nodes and time of the last solve."""
+
+    def getFinalScore(self, own: int, opp: int) -> int:
+        """Returns the final disk difference of the player to move. The empty squares go to the winner."""
+
+        ownCount, oppCount = own.bit_count(), opp.bit_count()
+        empties = 64 - ownCount - oppCount
+        if ownCount > oppCount:
+            return ownCount - oppCount + empties
+
+        if ownCount < oppCount:
+            return ownCount - oppCount - empties
+
+        return 0
+
+    def orderMoves(self, own: int, opp: int, moves: int, empty: int) -> list[tuple[int, int]]:
+        """
+        Returns the `(move, flips)` pairs of the given move bits in search order. With many empty squares, the moves that leave
+        the opponent with the fewest moves are first (fastest-first). The moves in the regions with an odd number of empty
+        squares come first as well (parity), as the last move of such a region is often ours.
+        """
+
+        oddRegions = 0
+        for mask in QUADRANT_MASKS:
+            if (empty & mask).bit_count() & 1:
+                oddRegions |= mask
+
+        ordered = []
+        fastestFirst = empty.bit_count() > FASTEST_FIRST_EMPTIES
+        while moves:
+            move = moves & -moves
+            moves ^= move
+            flips = getFlipsBits(own, opp, move)
+
+            key = 0 if move & oddRegions else 1
+            if fastestFirst:
+                key += 2 * getMovesBits(opp ^ flips, own | move | flips).bit_count()
+
+            ordered.append((key, move, flips))
+
+        ordered.sort(key = lambda item: item[0])
+        return [(move, flips) for _, move, flips in ordered]
+
+    def solve(self, own: int, opp: int, alpha: int, beta: int) -> int:
+        """
+        Returns the final score of the player to move if it lies within `(alpha, beta)`.
+        Otherwise, returns a bound that is `<= alpha` or `>= beta` (fail-soft).
+        """
+
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes & 0x3FF and perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+        empty = ~(own | opp) & BOARD_MASK
+        moves = getMovesBits(own, opp)
+        if not moves:
+            if not getMovesBits(opp, own):
+                return self.getFinalScore(own, opp)
+
+            return -self.solve(opp, own, -beta, -alpha)
+
+        # The last empty square: the move is forced, and there is no reply that can change the result.
+        if not empty & (empty - 1):
+            flips = getFlipsBits(own, opp, empty)
+            return self.getFinalScore(own | empty | flips, opp ^ flips)
+
+        key = None
+        if empty.bit_count() >= TABLE_EMPTIES:
+            key = (own, opp)
+            bounds = self.table.get(key)
+            if bounds is not None:
+                lower, upper = bounds
+                if lower >= beta:
+                    return lower
+
+                if upper <= alpha or lower == upper:
+                    return upper
+
+                alpha, beta = max(alpha, lower), min(beta, upper)
+
+        alphaOriginal = alpha
+        value = -65
+        for move, flips in self.orderMoves(own, opp, moves, empty):
+            score = -self.solve(opp ^ flips, own | move | flips, -beta, -alpha)
+            if score > value:
+                value = score
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        break
+
+        if key is not None:
+            if len(self.table) >= self.tableSize:
+                self.table.clear()
+
+            lower, upper = self.table.get(key, (-64, 64))
+            if value <= alphaOriginal:
+                upper = min(upper, value)
+            elif value >= beta:
+                lower = max(lower, value)
+            else:
+                lower = upper = value
+
+            self.table[key] = (lower, upper)
+
+        return value
+
+    def solveRoot(self, own: int, opp: int, exact = True) -> tuple[int, int]:
+        """
+        Returns the best move bit of the player to move and its final score. Without `exact`, the score is only
+        `> 0` for a win, `< 0` for a loss and `0` for a draw, and the first winning move found is returned.
+        """
+
+        alpha, beta = (-65, 65) if exact else (-1, 1)
+        empty = ~(own | opp) & BOARD_MASK
+
+        bestMove, bestScore = 0, -65
+        for move, flips in self.orderMoves(own, opp, getMovesBits(own, opp), empty):
+            score = -self.solve(opp ^ flips, own | move | flips, -beta, -alpha)
+            if score > bestScore:
+                bestMove, bestScore = move, score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        return bestMove, bestScore
+
+    def getBestMove(self, gameBoard: AiGameBoard | AiBitGameBoard, timeMs: float | None = None) -> tuple[int, int] | None:
+        """
+        Returns the best move of the player to move found by solving the endgame, or `None` if the board has too many empty squares,
+        if the win/loss/draw search only found losing moves (the heuristic search may still find a move that the opponent misplays),
+        if the time budget ran out, or if the board is not an 8x8 one.
+        """
+
+        if gameBoard.row != 8:
+            return None
+
+        _, black, white, *_ = packGameBoard(gameBoard)
+        own, opp = (black, white) if gameBoard.player == 1 else (white, black)
+        empties = 64 - (black | white).bit_count()
+        if empties > max(self.exactEmpties, self.wldEmpties) or not getMovesBits(own, opp):
+            return None
+
+        exact = empties <= self.exactEmpties
+        timeMs = self.timeMs if timeMs is None else timeMs
+        startTime = perf_counter()
+        self.deadline = startTime + timeMs / 1000 if timeMs is not None else None
+        self.nodes = 0
+
+        try:
+            move, score = self.solveRoot(own, opp, exact)
+        except SearchTimeout:
+            self.lastResult = {"mode": "exact" if exact else "wld", "move": None, "score": None,
+                               "nodes": self.nodes, "seconds": perf_counter() - startTime}
+            return None
+        finally:
+            self.deadline = None
+
+        index = move.bit_length() - 1
+        pos = (index >> 3, index & 7)
+        self.lastResult = {"mode": "exact" if exact else "wld", "move": pos, "score": score,
+                           "nodes": self.nodes, "seconds": perf_counter() - startTime}
+
+        if not exact and score < 0:
+            return None
+
+        return pos
+
+def newEndgameSolver() -> EndgameSolver | None:
+    """Returns a new endgame solver with the settings of `configs`, or `None` if it is disabled. The solver only plays 8x8 boards."""
+
+    if ROW_COL == 8 and (AI_ENDGAME_EXACT_EMPTIES or AI_ENDGAME_WLD_EMPTIES):
+        return EndgameSolver(AI_ENDGAME_EXACT_EMPTIES, AI_ENDGAME_WLD_EMPTIES, AI_ENDGAME_TABLE_SIZE, AI_ENDGAME_TIME_MS)
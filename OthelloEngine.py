@@ -0,0 +1,309 @@
+"""
+This module runs the AI as a long-lived process without a game window, driven by text commands on the standard input,
+so other programs can query it without paying the start of a new process for every position. The tree and the transposition
+table are kept between the commands, so each query only costs its search. Run `python OthelloEngine.py --help` for the options.
+
+The commands are one per line, and each reply is a line on the standard output:
+
+- `position startpos [moves <move> ...]` or `position board <squares> <X|O> [moves <move> ...]` sets the position,
+  where `<squares>` is the output of `OthelloAiCore.formatGameBoard` for a board of the size of `configs.ROW_COL`. When the position continues the previous one,
+  the tree is advanced along the new moves, so the work of the earlier searches is kept.
+- `move <move>` plays a move (`pass` if the player to move has none).
+- `go`, `go depth <plies>` or `go time <milliseconds>` starts searching the player to move in the background,
+  and replies `info ...` then `bestmove <move>` once it is done.
+- `stop` stops the running search, and replies with the best move of the deepest search that was completed and its depth.
+  If no depth was completed yet (always the case for `go depth`), it replies the move with the best heuristic score, `info depth 0` and no `pv`.
+  The other commands (except `isready` and `quit`) stop the running search the same way before they run, so each `go` gets its `bestmove`.
+- `isready` replies `readyok`, `newgame` clears the tree and the transposition table, and `quit` ends the process.
+
+The moves are written as a column letter and a row number, from `a1` at the top left, or `pass`.
+A malformed or illegal command replies `error <reason>` and changes nothing. A search that fails replies `error <reason>` instead of `bestmove`.
+"""
+
+from OthelloAiCore import GameBoardNode, GameBoardTree, AiGameBoard, AiBitGameBoard, newAiGameBoard, passTurn, putDisk, parseGameBoard
+from OthelloAiWorker import AiWorker
+from OthelloTranspositionTable import TranspositionTable
+from OthelloEndgame import newEndgameSolver
+from OthelloOpeningBook import newOpeningBook
+from OthelloBatchEval import newBatchEvaluator
+from OthelloEvaluator import newEvaluator
+from configs import ROW_COL, AI_USE_ALPHA_BETA, AI_TRANSPOSITION_TABLE_SIZE, AI_SEARCH_IN_PLACE, AI_TREE_MAX_NODES, AI_TREE_MAX_BYTES
+from queue import Queue
+from threading import Thread
+from time import perf_counter
+from typing import TextIO
+import sys
+
+def formatMove(pos: tuple[int, int] | None) -> str:
+    """Returns the protocol name of the given move (`None` for a pass): its column letter and its row number, like `d3`."""
+
+    if pos is None:
+        return "pass"
+
+    return f"{chr(ord('a') + pos[1])}{pos[0] + 1}"
+
+def parseMove(text: str) -> tuple[int, int] | None:
+    """Returns the `(row, col)` move of the given protocol name, or `None` for `pass`. See `formatMove`."""
+
+    text = text.lower()
+    if text == "pass":
+        return None
+
+    if len(text) < 2 or not "a" <= text[0] <= "z" or not text[1:].isdigit():
+        raise ValueError(f"Invalid move {text!r}.")
+
+    return int(text[1:]) - 1, ord(text[0]) - ord("a")
+
+def playMove(gameBoard: AiGameBoard | AiBitGameBoard, pos: tuple[int, int] | None) -> AiGameBoard | AiBitGameBoard:
+    """Returns a copy of the game board after the given move (`None` for a pass). Raises a `ValueError` if the move is not legal."""
+
+    if pos is None:
+        if gameBoard.possibleMoves:
+            raise ValueError("Cannot pass with possible moves.")
+
+        return passTurn(gameBoard)
+
+    if pos not in gameBoard.possibleMoves:
+        raise ValueError(f"Illegal move {formatMove(pos)}.")
+
+    return putDisk(gameBoard, pos) # type: ignore
+
+class Engine:
+    """
+    The state of an engine process: the position set by the commands, and the tree that searches it in the background.
+    The same tree and transposition table are used for the whole session, so the nodes and the results of the earlier
+    searches are reused by the later ones. The replies are written by the thread that calls `handleCommand` and `handleFinished`.
+    """
+
+    def __init__(self, output: TextIO = sys.stdout, depth = 4) -> None:
+        self.output = output
+        """The stream that the replies are written to."""
+
+        self.startPosition: tuple[str, int] | None = None
+        """The `(squares, player)` of the position that the moves of `moves` start from, or `None` for the starting position."""
+
+        self.moves: list[tuple[int, int] | None] = []
+        """The moves played from `startPosition` to the root of the tree. `None` is a pass."""
+
+        table = TranspositionTable(AI_TRANSPOSITION_TABLE_SIZE) if AI_USE_ALPHA_BETA and AI_TRANSPOSITION_TABLE_SIZE else None
+        self.gameBoardTree = GameBoardTree(GameBoardNode(newAiGameBoard()), depth, useAlphaBeta=AI_USE_ALPHA_BETA, transpositionTable=table,
+                                           searchInPlace=AI_SEARCH_IN_PLACE, maxNodes=AI_TREE_MAX_NODES, maxBytes=AI_TREE_MAX_BYTES,
+                                           endgameSolver=newEndgameSolver(), openingBook=newOpeningBook(),
+                                           batchEvaluator=newBatchEvaluator(), evaluator=newEvaluator())
+        """The tree of the position, kept for the whole session."""
+
+        self.defaultDepth = depth
+        """The search depth of `go` without a depth or a time."""
+
+        self.aiWorker = AiWorker()
+        """Runs the searches of `go` in the background, so `stop` can be read while they run."""
+
+        self.searchId = 0
+        """The number of the last search that was started, so the end of an older (cancelled) search is ignored."""
+
+        self.searchStart: tuple[float, int] = (0.0, 0)
+        """The `perf_counter` time and the `nodeCount` of the tree at the start of the running search."""
+
+        self.onFinished = None
+        """Called with the number of a search by the worker thread when the search has ended. Set by `run`."""
+
+    def reply(self, line: str) -> None:
+        """Writes a reply line."""
+
+        self.output.write(line + "\n")
+        self.output.flush()
+
+    def advance(self, gameBoard: AiGameBoard | AiBitGameBoard, pos: tuple[int, int] | None) -> AiGameBoard | AiBitGameBoard:
+        """Plays the given legal move (`None` for a pass) at the root of the tree, and returns the new root board."""
+
+        if pos is None:
+            return self.gameBoardTree.resetRoot(passTurn(gameBoard)).gameBoard
+
+        return self.gameBoardTree.advanceRoot(pos).gameBoard
+
+    def setPosition(self, startPosition: tuple[str, int] | None, moves: list[tuple[int, int] | None]) -> None:
+        """
+        Sets the position of the given start position and moves. Raises a `ValueError`, without changing the position, if one of the moves is illegal.
+        If the position continues the current one, the tree is only advanced along the new moves.
+        """
+
+        startBoard = gameBoard = newAiGameBoard() if startPosition is None else parseGameBoard(*startPosition)
+        for pos in moves:
+            gameBoard = playMove(gameBoard, pos)
+
+        if startPosition == self.startPosition and moves[:len(self.moves)] == self.moves:
+            gameBoard, newMoves = self.gameBoardTree.root.gameBoard, moves[len(self.moves):]
+        else:
+            gameBoard, newMoves = self.gameBoardTree.resetRoot(startBoard).gameBoard, moves
+
+        for pos in newMoves:
+            gameBoard = self.advance(gameBoard, pos)
+
+        self.startPosition, self.moves = startPosition, list(moves)
+
+    def startSearch(self, depth: int | None, timeMs: float | None) -> None:
+        """Starts searching the best move of the player to move, with the given depth or time budget."""
+
+        gameBoard = self.gameBoardTree.root.gameBoard
+        if not gameBoard.possibleMoves:
+            self.reply("bestmove pass")
+            return
+
+        self.gameBoardTree.searchDepth = depth or self.defaultDepth
+        self.gameBoardTree.completedDepth = 0
+        self.searchId += 1
+        self.searchStart = (perf_counter(), self.gameBoardTree.nodeCount)
+
+        searchId, onFinished = self.searchId, self.onFinished
+        self.aiWorker.start(self.gameBoardTree, gameBoard.player, timeMs,
+                            onFinished=(lambda: onFinished(searchId)) if onFinished is not None else None)
+
+    def finishSearch(self, pos: tuple[int, int] | None, variation: list[tuple[int, int]] | None = None) -> None:
+        """Replies the statistics and the given move of the search that just ended, with the given `pv` (by default, the one of the tree)."""
+
+        tree = self.gameBoardTree
+        startTime, startNodes = self.searchStart
+        milliseconds = (perf_counter() - startTime) * 1000
+        depth = tree.completedDepth
+        if variation is None:
+            variation = tree.getPrincipalVariation()
+
+        info = f"info depth {depth} nodes {tree.nodeCount - startNodes} time {milliseconds:.0f}"
+        self.reply(" ".join([info, "pv", *map(formatMove, variation)]) if variation else info)
+        self.reply(f"bestmove {formatMove(pos)}")
+
+    def handleFinished(self, searchId: int) -> None:
+        """Replies the move of the given search, which has just ended, unless it was cancelled. A failed search replies its error."""
+
+        if searchId == self.searchId and self.aiWorker.busy:
+            try:
+                pos = self.aiWorker.poll(wait=True)
+            except Exception as error:
+                self.reply(f"error The search failed: {error!r}")
+                return
+
+            self.finishSearch(pos)
+
+    def stopSearch(self) -> None:
+        """
+        Cancels the running search, if any, and replies the best move found so far: the one of its deepest completed depth,
+        or the move with the best heuristic score if no depth was completed.
+        """
+
+        if not self.aiWorker.busy:
+            return
+
+        self.aiWorker.cancel(wait=True)
+        tree = self.gameBoardTree
+        root = tree.root
+
+        # The root keeps the move of the last completed depth, but the nodes below it may hold the moves of the cancelled depth,
+        # so only the move itself is replied as the `pv`.
+        if tree.completedDepth and root.bestMove in root.gameBoard.possibleMoves:
+            self.finishSearch(root.bestMove, [root.bestMove])
+            return
+
+        tree.completedDepth = 0
+        self.finishSearch(tree.orderMoves(tree.expandNode(root), True)[0], [])
+
+    def handleCommand(self, line: str) -> bool:
+        """Runs a command line. Returns `False` for `quit`."""
+
+        words = line.split()
+        if not words:
+            return True
+
+        command, arguments = words[0], words[1:]
+        if command == "quit":
+            self.aiWorker.cancel()
+            return False
+
+        if command == "stop":
+            self.stopSearch()
+            return True
+
+        if command == "isready":
+            self.reply("readyok")
+            return True
+
+        # The other commands change the tree, so a running search is stopped first, and its move is replied as for `stop`.
+        self.stopSearch()
+
+        try:
+            if command == "position":
+                if arguments[:1] == ["startpos"]:
+                    startPosition, rest = None, arguments[1:]
+                elif arguments[:1] == ["board"] and len(arguments) >= 3 and arguments[2] in ("X", "O"):
+                    startPosition, rest = (arguments[1], "XO".index(arguments[2]) + 1), arguments[3:]
+                    if parseGameBoard(*startPosition).row != ROW_COL:
+                        raise ValueError(f"Only the {ROW_COL}x{ROW_COL} positions can be set.")
+                else:
+                    raise ValueError("Expected 'position startpos' or 'position board <squares> <X|O>'.")
+
+                if rest and rest[0] != "moves":
+                    raise ValueError(f"Expected 'moves', got {rest[0]!r}.")
+
+                self.setPosition(startPosition, [parseMove(text) for text in rest[1:]])
+
+            elif command == "move" and len(arguments) == 1:
+                pos = parseMove(arguments[0])
+                playMove(self.gameBoardTree.root.gameBoard, pos)
+                self.advance(self.gameBoardTree.root.gameBoard, pos)
+                self.moves.append(pos)
+
+            elif command == "go" and len(arguments) in (0, 2):
+                depth = timeMs = None
+                if arguments[:1] == ["depth"] and arguments[1].isdigit() and int(arguments[1]) > 0:
+                    depth = int(arguments[1])
+                elif arguments[:1] == ["time"]:
+                    timeMs = float(arguments[1])
+                elif arguments:
+                    raise ValueError("Expected 'go', 'go depth <plies>' or 'go time <milliseconds>'.")
+
+                self.startSearch(depth, timeMs)
+
+            elif command == "newgame":
+                self.gameBoardTree.resetRoot(newAiGameBoard())
+                self.startPosition, self.moves = None, []
+                if self.gameBoardTree.transpositionTable is not None:
+                    self.gameBoardTree.transpositionTable.clear()
+
+            else:
+                raise ValueError(f"Unknown command {line.strip()!r}.")
+
+        except ValueError as error:
+            self.reply(f"error {error}")
+
+        return True
+
+    def run(self, commands: TextIO = sys.stdin) -> None:
+        """
+        Runs the commands of the given stream until `quit` or its end. The lines are read by another thread, so the commands
+        and the ends of the searches are handled in the order they happen, by this thread only.
+        """
+
+        events: Queue = Queue()
+        self.onFinished = lambda searchId: events.put(("finished", searchId))
+
+        def readCommands() -> None:
+            for line in commands:
+                events.put(("command", line))
+
+            events.put(("command", "quit"))
+
+        Thread(target=readCommands, daemon=True).start()
+        while True:
+            kind, value = events.get()
+            if kind == "finished":
+                self.handleFinished(value)
+            elif not self.handleCommand(value):
+                return
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Runs the Othello AI as a process driven by text commands on the standard input.")
+    parser.add_argument("-d", "--depth", type=int, default=4, help="The search depth of 'go' without a depth or a time.")
+    args = parser.parse_args()
+
+    Engine(depth=args.depth).run()
@@ -0,0 +1,158 @@
+"""
+This module contains the evaluators that `GameBoardTree` can use instead of the stability heuristic of `OthelloAiCore.scoreGameBoard`.
+An evaluator is any object with an `evaluate(gameBoard)` method that returns the score of the board from the point of view of
+the player to move. See `Evaluator`.
+"""
+
+from OthelloAiCore import AiGameBoard, AiBitGameBoard, packGameBoard
+from OthelloPatterns import PATTERN_TYPES, PATTERN_INSTANCES, getPatternIndices
+from configs import ROW_COL, AI_EVALUATOR, AI_PATTERN_WEIGHTS_PATH
+from array import array
+from operator import getitem
+from os import path
+from typing import Protocol
+import struct, sys
+
+WEIGHTS_MAGIC = b"OTHPAT01"
+"""The first bytes of a weights file."""
+
+WEIGHTS_HEADER = struct.Struct("<8sII")
+"""The header of a weights file: the magic bytes, the number of game stages and the number of pattern types."""
+
+SQUARE_WEIGHTS = (
+    (100, -20, 10,  5,  5, 10, -20, 100),
+    (-20, -50, -2, -2, -2, -2, -50, -20),
+    ( 10,  -2, -1, -1, -1, -1,  -2,  10),
+    (  5,  -2, -1, -1, -1, -1,  -2,   5),
+    (  5,  -2, -1, -1, -1, -1,  -2,   5),
+    ( 10,  -2, -1, -1, -1, -1,  -2,  10),
+    (-20, -50, -2, -2, -2, -2, -50, -20),
+    (100, -20, 10,  5,  5, 10, -20, 100),
+)
+"""The classic value of a disk on each square, used to initialize the pattern weights when there is no weights file."""
+
+class Evaluator(Protocol):
+    """
+    The interface of the evaluators of `GameBoardNode` and `GameBoardTree`. Without an evaluator, the tree uses `scoreGameBoard`.
+    The evaluators must be deterministic, as the search compares the scores of the same position across searches.
+    """
+
+    def evaluate(self, gameBoard: AiGameBoard | AiBitGameBoard) -> float:
+        """Returns the heuristic score of the game board from the point of view of the player whose turn it is."""
+        ...
+
+class PatternEvaluator(Evaluator):
+    """
+    Sums the weights of the configurations of the board patterns (see `OthelloPatterns`), from the point of view of black.
+    All the instances of a pattern type share the weight table of the type, and each game stage (by number of disks) has its own tables.
+
+    The pattern indices of the bitboard boards are computed once, then updated incrementally by `AiBitGameBoard.makeMove`
+    as the disks flip, so a score only costs a table lookup per pattern instance.
+    """
+
+    def __init__(self, weights: list[list[array]]) -> None:
+        self.weights = weights
+        """The weight table (`3 ** len(squares)` floats) of each pattern type, for each game stage."""
+
+        self.stages = len(weights)
+        """The number of game stages. The stage of a board is set by its number of disks."""
+
+        self.instanceTables = [[tables[typeIndex] for typeIndex, _ in PATTERN_INSTANCES] for tables in weights]
+        """The weight table of each pattern instance, for each game stage."""
+
+    def evaluate(self, gameBoard: AiGameBoard | AiBitGameBoard) -> float:
+        if isinstance(gameBoard, AiBitGameBoard):
+            black, white = gameBoard.black, gameBoard.white
+            indices = gameBoard.patternIndices
+            if indices is None:
+                indices = gameBoard.patternIndices = getPatternIndices(black, white)
+        else:
+            _, black, white, *_ = packGameBoard(gameBoard)
+            indices = getPatternIndices(black, white)
+
+        tables = self.instanceTables[((black | white).bit_count() - 4) * self.stages // 61]
+        score = sum(map(getitem, tables, indices))
+        return score if gameBoard.player == 1 else -score
+
+    @classmethod
+    def fromSquareWeights(cls, squareWeights = SQUARE_WEIGHTS, stages = 1) -> "PatternEvaluator":
+        """
+        Returns an evaluator whose pattern weights add up to the given square values: the value of each square is split
+        evenly between the pattern instances that contain it, so the score is the sum of the values of the black disks
+        minus the ones of the white disks.
+        """
+
+        coverCounts = [0] * 64
+        for _, squares in PATTERN_INSTANCES:
+            for square in squares:
+                coverCounts[square] += 1
+
+        tables = []
+        for _, squares in PATTERN_TYPES:
+            # The table of the first `k` digits is extended with the next digit, which is the most significant one.
+            table = [0.0]
+            for row, col in squares:
+                value = squareWeights[row][col] / coverCounts[row * 8 + col]
+                table = table + [weight + value for weight in table] + [weight - value for weight in table]
+
+            tables.append(table)
+
+        return cls([[array("f", table) for table in tables] for _ in range(stages)])
+
+    @classmethod
+    def load(cls, weightsPath: str) -> "PatternEvaluator":
+        """Returns an evaluator with the weights of the given file (see `save`)."""
+
+        with open(weightsPath, "rb") as weightsFile:
+            data = weightsFile.read()
+
+        magic, stages, typeCount = WEIGHTS_HEADER.unpack_from(data, 0)
+        sizes = [3 ** len(squares) for _, squares in PATTERN_TYPES]
+        if magic != WEIGHTS_MAGIC or typeCount != len(PATTERN_TYPES) or len(data) != WEIGHTS_HEADER.size + stages * sum(sizes) * 4:
+            raise ValueError(f"{weightsPath!r} is not a valid pattern weights file.")
+
+        weights, offset = [], WEIGHTS_HEADER.size
+        for _ in range(stages):
+            tables = []
+            for size in sizes:
+                table = array("f")
+                table.frombytes(data[offset:offset + size * 4])
+                if sys.byteorder == "big":
+                    table.byteswap()
+
+                tables.append(table)
+                offset += size * 4
+
+            weights.append(tables)
+
+        return cls(weights)
+
+    def save(self, weightsPath: str) -> None:
+        """
+        Writes the weights to a binary file: a header (see `WEIGHTS_HEADER`), then the little-endian `float32` weight table
+        of each pattern type of `OthelloPatterns.PATTERN_TYPES`, for each stage.
+        """
+
+        with open(weightsPath, "wb") as weightsFile:
+            weightsFile.write(WEIGHTS_HEADER.pack(WEIGHTS_MAGIC, self.stages, len(PATTERN_TYPES)))
+            for tables in self.weights:
+                for table in tables:
+                    if sys.byteorder == "big":
+                        table = array("f", table)
+                        table.byteswap()
+
+                    weightsFile.write(table.tobytes())
+
+def newEvaluator() -> Evaluator | None:
+    """
+    Returns the evaluator selected by `configs.AI_EVALUATOR`, or `None` for the stability heuristic.
+    The pattern evaluator loads the weights file if there is one, and starts from the square values otherwise.
+    The patterns are the ones of the 8x8 board, so the other board sizes always use the stability heuristic.
+    """
+
+    if AI_EVALUATOR == "pattern" and ROW_COL == 8:
+        weightsPath = path.join(path.dirname(path.abspath(__file__)), AI_PATTERN_WEIGHTS_PATH)
+        if path.exists(weightsPath):
+            return PatternEvaluator.load(weightsPath)
+
+        return PatternEvaluator.fromSquareWeights()
@@ -0,0 +1,381 @@
+"""
+This module contains a compact binary archive of finished games, for the corpora of self-play games and the recorded matches.
+Each game is a small header (the players, their search depths and the result) followed by one byte per move, and the archive
+can be appended to, read as a stream, or read at random through an index of the offset of each game.
+Run `python OthelloGameArchive.py --help` to inspect an archive.
+
+An archive file is a header (see `ARCHIVE_HEADER`), then the games one after the other: a `GAME_HEADER`, then the square index
+`row * size + col` of each move. The passes are not stored, as a player only passes when it has no possible moves,
+so the replay passes by itself (see `replayGame`). The index file (the archive path followed by `INDEX_SUFFIX`)
+is a header (see `INDEX_HEADER`), then the little-endian `uint64` offset of each game in the archive.
+"""
+
+from OthelloCore import GameBoard
+from configs import ROW_COL, GAME_ARCHIVE_PATH
+from array import array
+from os import path
+from typing import Iterator
+import mmap, struct, sys
+
+ARCHIVE_MAGIC = b"OTHARC01"
+"""The first bytes of an archive file."""
+
+ARCHIVE_HEADER = struct.Struct("<8sB7x")
+"""The header of an archive file: the magic bytes and the board size of its games."""
+
+GAME_HEADER = struct.Struct("<BBBBBxHHH")
+"""
+The header of a game: the kind of the black and the white players (see `PLAYER_HUMAN` and `PLAYER_AI`), their search depths,
+the winner (`0` for a draw), the final number of black and white disks, and the number of moves that follow the header.
+"""
+
+INDEX_MAGIC = b"OTHIDX01"
+"""The first bytes of an index file."""
+
+INDEX_HEADER = struct.Struct("<8s")
+"""The header of an index file: the magic bytes. The number of games is given by the size of the file."""
+
+INDEX_SUFFIX = ".idx"
+"""The suffix that is added to the path of an archive to get the path of its index."""
+
+PLAYER_HUMAN = 0
+"""The kind of a player that plays by hand."""
+
+PLAYER_AI = 1
+"""The kind of a player that is an AI. Its depth is the one of its searches, or `0` for the searches with a time budget."""
+
+class ArchivedGame:
+    """A finished game of an archive."""
+
+    def __init__(self, moves: bytes, blackPlayer = PLAYER_AI, whitePlayer = PLAYER_AI, blackDepth = 0, whiteDepth = 0,
+                 winner = 0, blackCount = 0, whiteCount = 0, size = ROW_COL) -> None:
+        self.moves = moves
+        """The square index `row * size + col` of each move, without the passes."""
+
+        self.blackPlayer = blackPlayer
+        """The kind of the black player. See `PLAYER_HUMAN` and `PLAYER_AI`."""
+
+        self.whitePlayer = whitePlayer
+        """The kind of the white player."""
+
+        self.blackDepth = blackDepth
+        """The search depth of the black player, or `0` for a human or a time budget."""
+
+        self.whiteDepth = whiteDepth
+        """The search depth of the white player."""
+
+        self.winner = winner
+        """The winner of the game. `1` for black, `2` for white, `0` for a draw."""
+
+        self.blackCount = blackCount
+        """The final number of black disks."""
+
+        self.whiteCount = whiteCount
+        """The final number of white disks."""
+
+        self.size = size
+        """The number of rows and columns of the board."""
+
+    def __repr__(self) -> str:
+        return (f"ArchivedGame({len(self.moves)} moves, players {self.blackPlayer}/{self.whitePlayer}, "
+                f"depths {self.blackDepth}/{self.whiteDepth}, winner {self.winner}, {self.blackCount}-{self.whiteCount})")
+
+    def getMoves(self) -> list[tuple[int, int]]:
+        """Returns the `(row, col)` position of each move."""
+
+        return [divmod(index, self.size) for index in self.moves]
+
+    def pack(self) -> bytes:
+        """Returns the bytes of the game in an archive: its header and its moves."""
+
+        return GAME_HEADER.pack(self.blackPlayer, self.whitePlayer, self.blackDepth, self.whiteDepth, self.winner,
+                                self.blackCount, self.whiteCount, len(self.moves)) + self.moves
+
+    @classmethod
+    def fromGameBoard(cls, gameBoard: GameBoard, moves: list[tuple[int, int] | None], blackPlayer = PLAYER_AI, whitePlayer = PLAYER_AI,
+                      blackDepth = 0, whiteDepth = 0) -> "ArchivedGame":
+        """Returns the game of the given moves (`None` for a pass, which is dropped), with the result of its final board."""
+
+        blackCount, whiteCount = gameBoard.blackCount, gameBoard.whiteCount
+        winner = 1 if blackCount > whiteCount else 2 if whiteCount > blackCount else 0
+        return cls(bytes(row * gameBoard.col + col for row, col in filter(None, moves)), blackPlayer, whitePlayer,
+                   min(blackDepth, 255), min(whiteDepth, 255), winner, blackCount, whiteCount, gameBoard.col)
+
+def readArchiveHeader(archiveFile, archivePath: str) -> int:
+    """Reads the header of an open archive file and returns its board size. Raises a `ValueError` if it is not an archive."""
+
+    data = archiveFile.read(ARCHIVE_HEADER.size)
+    if len(data) != ARCHIVE_HEADER.size or data[:len(ARCHIVE_MAGIC)] != ARCHIVE_MAGIC:
+        raise ValueError(f"{archivePath!r} is not a valid game archive file.")
+
+    return ARCHIVE_HEADER.unpack(data)[1]
+
+def readGameAt(archiveFile, size: int) -> ArchivedGame | None:
+    """Reads the game at the position of an open archive file, or returns `None` at the end of the file."""
+
+    header = archiveFile.read(GAME_HEADER.size)
+    if not header:
+        return None
+
+    if len(header) != GAME_HEADER.size:
+        raise ValueError("The game archive is truncated.")
+
+    blackPlayer, whitePlayer, blackDepth, whiteDepth, winner, blackCount, whiteCount, moveCount = GAME_HEADER.unpack(header)
+    moves = archiveFile.read(moveCount)
+    if len(moves) != moveCount:
+        raise ValueError("The game archive is truncated.")
+
+    return ArchivedGame(moves, blackPlayer, whitePlayer, blackDepth, whiteDepth, winner, blackCount, whiteCount, size)
+
+def readGames(archivePath: str) -> Iterator[ArchivedGame]:
+    """Yields the games of an archive in order. The file is read through a buffer, so only the current game is in memory."""
+
+    with open(archivePath, "rb") as archiveFile:
+        size = readArchiveHeader(archiveFile, archivePath)
+        while (game := readGameAt(archiveFile, size)) is not None:
+            yield game
+
+class GameArchiveWriter:
+    """
+    Appends games to an archive and to its index. The archive and the index are created if they do not exist.
+    Use it as a context manager, or call `close` once all the games are written.
+    """
+
+    def __init__(self, archivePath: str, size = ROW_COL) -> None:
+        if not 4 <= size <= 16:
+            raise ValueError(f"The moves are stored in one byte, so the board size must be at most 16, got {size}.")
+
+        self.path = archivePath
+        self.size = size
+        """The board size of the games of the archive."""
+
+        if path.exists(archivePath) and path.getsize(archivePath):
+            with open(archivePath, "rb") as archiveFile:
+                if readArchiveHeader(archiveFile, archivePath) != size:
+                    raise ValueError(f"The games of {archivePath!r} are not {size}x{size} games.")
+
+            # A missing or outdated index is rebuilt first, so the offsets of the new games follow the ones of the old games.
+            GameArchive(archivePath).close()
+
+        self.archiveFile = open(archivePath, "ab")
+        """The archive file, open for appending."""
+
+        self.indexFile = open(archivePath + INDEX_SUFFIX, "ab")
+        """The index file, open for appending."""
+
+        if not self.archiveFile.tell():
+            self.archiveFile.write(ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, size))
+
+        if not self.indexFile.tell():
+            self.indexFile.write(INDEX_HEADER.pack(INDEX_MAGIC))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self) -> None:
+        self.archiveFile.close()
+        self.indexFile.close()
+
+    def write(self, game: ArchivedGame) -> None:
+        """Appends a game to the archive, and its offset to the index."""
+
+        if game.size != self.size:
+            raise ValueError(f"Cannot write a {game.size}x{game.size} game to a {self.size}x{self.size} archive.")
+
+        self.indexFile.write(struct.pack("<Q", self.archiveFile.tell()))
+        self.archiveFile.write(game.pack())
+
+def buildIndex(archivePath: str) -> array:
+    """
+    Returns the offset of each game of an archive, found by reading the game headers and skipping their moves,
+    and writes them to the index file of the archive.
+    """
+
+    offsets, archiveSize = array("Q"), path.getsize(archivePath)
+    with open(archivePath, "rb") as archiveFile:
+        readArchiveHeader(archiveFile, archivePath)
+        while header := archiveFile.read(GAME_HEADER.size):
+            offsets.append(archiveFile.tell() - GAME_HEADER.size)
+            if len(header) != GAME_HEADER.size or archiveFile.seek(GAME_HEADER.unpack(header)[-1], 1) > archiveSize:
+                raise ValueError("The game archive is truncated.")
+
+    with open(archivePath + INDEX_SUFFIX, "wb") as indexFile:
+        indexFile.write(INDEX_HEADER.pack(INDEX_MAGIC))
+        if sys.byteorder == "big":
+            offsets = array("Q", offsets)
+            offsets.byteswap()
+
+        indexFile.write(offsets.tobytes())
+
+    return offsets
+
+class GameArchive:
+    """
+    A read-only archive with random access to its games through their index. The index file is read through `mmap`,
+    so opening an archive of millions of games does not load their offsets. A missing or outdated index is rebuilt with `buildIndex`.
+    """
+
+    def __init__(self, archivePath: str) -> None:
+        self.path = archivePath
+        self.archiveFile = open(archivePath, "rb")
+        """The archive file."""
+
+        self.size = readArchiveHeader(self.archiveFile, archivePath)
+        """The board size of the games of the archive."""
+
+        self.indexMmap: mmap.mmap | None = None
+        """The memory-mapped index file, or `None` if the archive has no game."""
+
+        self.count = 0
+        """The number of games of the archive."""
+
+        if not self.loadIndex():
+            buildIndex(archivePath)
+            if not self.loadIndex():
+                raise ValueError(f"Cannot index the game archive {archivePath!r}.")
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, gameIndex: int) -> ArchivedGame:
+        """Returns the game of the given index, read at its offset."""
+
+        if gameIndex < 0:
+            gameIndex += self.count
+
+        if not 0 <= gameIndex < self.count:
+            raise IndexError(f"There is no game {gameIndex} in an archive of {self.count} games.")
+
+        self.archiveFile.seek(self.getOffset(gameIndex))
+        return readGameAt(self.archiveFile, self.size) # type: ignore
+
+    def __iter__(self) -> Iterator[ArchivedGame]:
+        return readGames(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self) -> None:
+        if self.indexMmap is not None:
+            self.indexMmap.close()
+
+        self.archiveFile.close()
+
+    def getOffset(self, gameIndex: int) -> int:
+        """Returns the offset of the given game in the archive file."""
+
+        return struct.unpack_from("<Q", self.indexMmap, INDEX_HEADER.size + gameIndex * 8)[0] # type: ignore
+
+    def loadIndex(self) -> bool:
+        """
+        Maps the index file, and returns whether it matches the archive: the end of its last game is the end of the archive.
+        The games that were appended without their offset, or a truncated index, make it outdated.
+        """
+
+        if self.indexMmap is not None:
+            self.indexMmap.close()
+            self.indexMmap, self.count = None, 0
+
+        indexPath, archiveSize = self.path + INDEX_SUFFIX, path.getsize(self.path)
+        if not path.exists(indexPath):
+            return archiveSize == ARCHIVE_HEADER.size
+
+        with open(indexPath, "rb") as indexFile:
+            if path.getsize(indexPath) <= INDEX_HEADER.size:
+                return indexFile.read(len(INDEX_MAGIC)) == INDEX_MAGIC and archiveSize == ARCHIVE_HEADER.size
+
+            indexMmap = mmap.mmap(indexFile.fileno(), 0, access=mmap.ACCESS_READ)
+
+        count = (len(indexMmap) - INDEX_HEADER.size) // 8
+        if indexMmap[:len(INDEX_MAGIC)] != INDEX_MAGIC or len(indexMmap) != INDEX_HEADER.size + count * 8:
+            indexMmap.close()
+            return False
+
+        self.indexMmap, self.count = indexMmap, count
+        lastOffset = self.getOffset(count - 1)
+        self.archiveFile.seek(lastOffset)
+        header = self.archiveFile.read(GAME_HEADER.size)
+        if len(header) == GAME_HEADER.size and lastOffset + GAME_HEADER.size + GAME_HEADER.unpack(header)[-1] == archiveSize:
+            return True
+
+        indexMmap.close()
+        self.indexMmap, self.count = None, 0
+        return False
+
+def replayGame(game: ArchivedGame) -> Iterator[GameBoard]:
+    """
+    Yields the board of each position of the game: the start, then the board after each move. The player without
+    possible moves passes. The same board is updated in place by `GameBoard.captureDisks` and yielded again for each move,
+    so the positions are cheap to walk through, and the ones that are kept must be copied.
+    Raises a `ValueError` if a move is not possible.
+    """
+
+    gameBoard = GameBoard(game.size)
+    yield gameBoard
+
+    for index in game.moves:
+        pos = divmod(index, game.size)
+        if pos not in gameBoard.possibleMoves:
+            raise ValueError(f"The move {pos} of the game is not possible.")
+
+        # Same as a move of `OthelloPvP.putDisk`, with the disks counted from the flipped ones instead of the whole board.
+        gameBoard.disks[pos[0]][pos[1]] = gameBoard.player
+        flipped = len(gameBoard.captureDisks(pos))
+        if gameBoard.player == 1:
+            gameBoard.blackCount, gameBoard.whiteCount = gameBoard.blackCount + flipped + 1, gameBoard.whiteCount - flipped
+        else:
+            gameBoard.blackCount, gameBoard.whiteCount = gameBoard.blackCount - flipped, gameBoard.whiteCount + flipped + 1
+
+        gameBoard.player = 3 - gameBoard.player
+        gameBoard.evaluatePossibleMoves()
+        if not gameBoard.possibleMoves:
+            gameBoard.player = 3 - gameBoard.player
+            gameBoard.evaluatePossibleMoves()
+
+        yield gameBoard
+
+def recordGame(gameBoard: GameBoard, moves: list[tuple[int, int] | None], blackPlayer: int, whitePlayer: int,
+               blackDepth = 0, whiteDepth = 0, archivePath: str | None = GAME_ARCHIVE_PATH) -> None:
+    """
+    Appends a finished game to the archive of the given path (relative to this module), if there is one.
+    Used by the game windows to record their matches. See `configs.GAME_ARCHIVE_PATH`.
+    """
+
+    if archivePath is None or not moves:
+        return
+
+    archivePath = path.join(path.dirname(path.abspath(__file__)), archivePath)
+    with GameArchiveWriter(archivePath, gameBoard.col) as writer:
+        writer.write(ArchivedGame.fromGameBoard(gameBoard, moves, blackPlayer, whitePlayer, blackDepth, whiteDepth))
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Prints the games of an Othello game archive, and checks that they replay to their results.")
+    parser.add_argument("archive", help="The archive file.")
+    parser.add_argument("-g", "--game", type=int, action="append", default=None, help="Only print this game (by its index).")
+    parser.add_argument("--reindex", action="store_true", help="Rebuild the index of the archive.")
+    args = parser.parse_args()
+
+    if args.reindex:
+        print(f"{len(buildIndex(args.archive))} games indexed.")
+
+    with GameArchive(args.archive) as archive:
+        games = ((gameIndex, archive[gameIndex]) for gameIndex in args.game) if args.game is not None else enumerate(archive)
+        mismatches = 0
+        for gameIndex, game in games:
+            for gameBoard in replayGame(game):
+                pass
+
+            if (gameBoard.blackCount, gameBoard.whiteCount) != (game.blackCount, game.whiteCount):
+                mismatches += 1
+
+            print(gameIndex, game)
+
+        print(f"{len(archive)} games, {mismatches} of the printed ones do not replay to their result.")
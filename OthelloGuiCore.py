@@ -1,6 +1,7 @@
 from OthelloCore import GameBoard
-from configs import WINDOW_SIZE, ICON_SIZE, COLOR_STYLE
-from pygame import image, draw, font
+from configs import WINDOW_SIZE, WINDOW_STYLE, ICON_SIZE, COLOR_STYLE
+from pygame import image, draw, font, display, Rect, Surface
+from functools import cache
 from os import path
 import sys
 
@@ -33,6 +34,12 @@ class GameIcons:
             return self.possibleMoveDisk
         return self.empty
 
+@cache
+def getFont(size: int):
+    """Return the default font of the given size. Loading a font is slow, so each size is only loaded once."""
+
+    return font.Font(None, size)
+
 
 def displayGameboardHStyle(screen, gameBoard: GameBoard, icons: GameIcons):
     """Display the gameboard on the given screen."""
@@ -70,7 +77,7 @@ def displayGameboardHStyle(screen, gameBoard: GameBoard, icons: GameIcons):
         screen.blit(icons.whiteDisk, (playerIconPosX, WhiteIconPosY))
 
     # Drawing the disk counters of the players.
-    fontObj = font.Font(None, icons.size)
+    fontObj = getFont(icons.size)
 
     # The black player.
     textSurfaceObj = fontObj.render(str(gameBoard.blackCount), True, (0, 0, 0))
@@ -144,7 +151,7 @@ def displayGameboardVStyle(screen, gameBoard: GameBoard, icons: GameIcons):
         screen.blit(icons.whiteDisk, (WhiteIconPosX, PlayerIconPosY))
 
     # Drawing the disk counters of the players.
-    fontObj = font.Font(None, icons.size)
+    fontObj = getFont(icons.size)
 
     # The black player.
     textSurfaceObj = fontObj.render(str(gameBoard.blackCount), True, (0, 0, 0))
@@ -160,7 +167,7 @@ def displayGameboardVStyle(screen, gameBoard: GameBoard, icons: GameIcons):
 
     # Printing Game Over if there is no possible moves for both players.
     if not gameBoard.possibleMoves:
-        fontObj = font.Font(None, icons.size * 3 // 4)
+        fontObj = getFont(icons.size * 3 // 4)
 
         msg = "Game Over. " + ("Black wins!" if gameBoard.blackCount > gameBoard.whiteCount else "White wins!" if gameBoard.blackCount < gameBoard.whiteCount else "Tie!")
         textSurfaceObj = fontObj.render(msg, True, (100, 20, 40))
@@ -173,3 +180,178 @@ def displayGameboardVStyle(screen, gameBoard: GameBoard, icons: GameIcons):
         textRectangleObj = textSurfaceObj.get_rect()
         textRectangleObj.bottomleft = (gameBoard.diagonalMargin, gameBoard.diagonalMargin + gameBoard.col * gameBoard.squareLength + icons.size * 5 // 3 + extraMargin - 5)
         screen.blit(textSurfaceObj, textRectangleObj)
+
+class GameBoardRenderer:
+    """
+    Draws a game board on the screen like `displayGameboardHStyle`/`displayGameboardVStyle`, but only redraws what changed since the last frame:
+    the background and the grid are pre-rendered once, the squares are only redrawn when their disk changes, and the texts are only
+    rendered once. `update` only sends the changed areas of the screen to the display, so an idle screen costs almost nothing.
+    """
+
+    def __init__(self, screen, icons: GameIcons, style = WINDOW_STYLE):
+        self.screen = screen
+        self.icons = icons
+
+        self.style = style
+        """The window style, `"H"` or `"V"`. See `configs.WINDOW_STYLE`."""
+
+        self.boardOffsetY = 13 if style == "V" else 0
+        """The vertical offset of the grid and the disks, which leaves room for the players icons above the board in the `V` style."""
+
+        self.static: Surface | None = None
+        """The background and the grid, which are restored under the redrawn parts of the screen."""
+
+        self.squareRects: list[list[Rect]] = []
+        """The area of the disk icon of each square."""
+
+        self.drawnDisks: list[list[int | None]] | None = None
+        """The disk value of each square in the last frame. `None` means that the whole screen is redrawn by the next frame."""
+
+        self.drawnSprites: list[tuple[Surface, Rect]] = []
+        """The icons and texts of the last frame (the players panel and the status text), with their areas."""
+
+        self.texts: dict[tuple[str, int, tuple[int, int, int]], Surface] = {}
+        """The rendered texts, by text, font size and color."""
+
+    def invalidate(self) -> None:
+        """Makes the next frame redraw the whole screen, for example after the window was hidden or drawn over."""
+
+        self.drawnDisks = None
+
+    def renderText(self, text: str, size: int, color: tuple[int, int, int]) -> Surface:
+        """Returns the surface of the given text, rendered once per text, font size and color."""
+
+        key = (text, size, color)
+        surface = self.texts.get(key)
+        if surface is None:
+            # The status text changes over time, so the old texts are dropped from time to time.
+            if len(self.texts) > 256:
+                self.texts.clear()
+
+            surface = self.texts[key] = getFont(size).render(text, True, color)
+
+        return surface
+
+    def buildStatic(self, gameBoard: GameBoard) -> None:
+        """Pre-renders the background and the grid of the given board, and computes the area of each square."""
+
+        margin, length, offsetY = gameBoard.diagonalMargin, gameBoard.squareLength, self.boardOffsetY
+        self.static = Surface(self.screen.get_size()).convert()
+        self.static.blit(self.icons.background, (0, 0))
+
+        # Drawing the gameboard grid. `+ 1` is for the right and bottom borders.
+        for col in range(gameBoard.col + 1):
+            draw.line(self.static, (0, 0, 0), (margin + col * length, margin + offsetY), (margin + col * length, margin + gameBoard.row * length + offsetY))
+
+        for row in range(gameBoard.row + 1):
+            draw.line(self.static, (0, 0, 0), (margin, margin + row * length + offsetY), (margin + gameBoard.col * length, margin + row * length + offsetY))
+
+        icons = (self.icons.blackDisk, self.icons.whiteDisk, self.icons.possibleMoveDisk, self.icons.empty)
+        iconWidth, iconHeight = max(icon.get_width() for icon in icons), max(icon.get_height() for icon in icons)
+        imageMargin = margin + length // 2 - self.icons.size // 2
+        self.squareRects = [[Rect(col * length + imageMargin, row * length + imageMargin + offsetY, iconWidth, iconHeight)
+                             for col in range(gameBoard.col)] for row in range(gameBoard.row)]
+
+    def getSprites(self, gameBoard: GameBoard, status: str | None) -> list[tuple[Surface, Rect]]:
+        """Returns the icons and texts around the board (the players panel, the game over message and the status text) with their areas."""
+
+        icons, sprites = self.icons, []
+        boardBottom = gameBoard.diagonalMargin + gameBoard.row * gameBoard.squareLength
+
+        def addText(text: str, size: int, color: tuple[int, int, int], **position) -> None:
+            surface = self.renderText(text, size, color)
+            sprites.append((surface, surface.get_rect(**position)))
+
+        if self.style == "H":
+            playerIconPosX = gameBoard.diagonalMargin + gameBoard.col * gameBoard.squareLength + gameBoard.squareLength // 2
+            blackIconPos = (playerIconPosX, int(playerIconPosX // 2 - icons.size * 1.5))
+            whiteIconPos = (playerIconPosX, int(playerIconPosX // 2 - icons.size * 0.25))
+            blackCountCenter = (playerIconPosX + icons.size * 2, int(blackIconPos[1] + icons.size // 2))
+            whiteCountCenter = (playerIconPosX + icons.size * 2, int(whiteIconPos[1] + icons.size // 2))
+        else:
+            iconPosY = gameBoard.diagonalMargin // 2 - icons.size // 2 + self.boardOffsetY // 2
+            blackIconPos = (gameBoard.diagonalMargin + gameBoard.col * gameBoard.squareLength // 8, iconPosY)
+            whiteIconPos = (gameBoard.diagonalMargin + gameBoard.col * gameBoard.squareLength * 5 // 8, iconPosY)
+            blackCountCenter = (blackIconPos[0] + icons.size * 2, int(iconPosY + icons.size // 2))
+            whiteCountCenter = (whiteIconPos[0] + icons.size * 2, int(iconPosY + icons.size // 2))
+
+        # The players icons.
+        blackIcon, whiteIcon = (icons.blackDisk, icons.possibleMoveDisk) if gameBoard.player == 1 else (icons.possibleMoveDisk, icons.whiteDisk)
+        sprites.append((blackIcon, blackIcon.get_rect(topleft=blackIconPos)))
+        sprites.append((whiteIcon, whiteIcon.get_rect(topleft=whiteIconPos)))
+
+        # The disk counters of the players.
+        addText(str(gameBoard.blackCount), icons.size, (0, 0, 0), center=blackCountCenter)
+        addText(str(gameBoard.whiteCount), icons.size, (0, 0, 0), center=whiteCountCenter)
+
+        # The game over message if there is no possible moves for both players.
+        if not gameBoard.possibleMoves:
+            winner = "Black wins!" if gameBoard.blackCount > gameBoard.whiteCount else "White wins!" if gameBoard.blackCount < gameBoard.whiteCount else "Tie!"
+            if self.style == "H":
+                addText("Game Over.", icons.size, (100, 20, 40), center=(whiteCountCenter[0], int(whiteIconPos[1] + icons.size * 2)))
+                addText(winner, icons.size, (20, 100, 40), center=(whiteCountCenter[0], int(whiteIconPos[1] + icons.size * 3)))
+                addText("Press the 'Space' key to start a new game.", icons.size, (0, 0, 0),
+                        bottomleft=(gameBoard.diagonalMargin, boardBottom + icons.size * 4 // 3))
+            else:
+                addText("Game Over. " + winner, icons.size * 3 // 4, (100, 20, 40),
+                        bottomleft=(gameBoard.diagonalMargin, boardBottom + icons.size + self.boardOffsetY - 5))
+                addText("Press the 'Space' key to start a new game.", icons.size * 3 // 4, (0, 0, 0),
+                        bottomleft=(gameBoard.diagonalMargin, boardBottom + icons.size * 5 // 3 + self.boardOffsetY - 5))
+
+        # The status text, at the bottom right of the screen.
+        if status:
+            addText(status, icons.size * 3 // 4, (100, 20, 40), bottomright=(self.screen.get_width() - gameBoard.diagonalMargin, self.screen.get_height() - 10))
+
+        return sprites
+
+    def draw(self, gameBoard: GameBoard, status: str | None = None) -> list[Rect]:
+        """Draws the changes of the given board (and of the status text) since the last frame on the screen. Returns the changed areas."""
+
+        screen, static = self.screen, self.static
+        if static is None or len(self.squareRects) != gameBoard.row or len(self.squareRects[0]) != gameBoard.col:
+            self.buildStatic(gameBoard)
+            static, self.drawnDisks = self.static, None
+
+        changedRects: list[Rect] = []
+        if self.drawnDisks is None:
+            screen.blit(static, (0, 0))
+            changedRects.append(screen.get_rect())
+            self.drawnDisks = [[None] * gameBoard.col for _ in range(gameBoard.row)]
+            self.drawnSprites = []
+
+        # The areas of the old icons and texts are restored first, as they may have moved or been removed.
+        sprites = self.getSprites(gameBoard, status)
+        spritesChanged = sprites != self.drawnSprites
+        restoredRects: list[Rect] = []
+        if spritesChanged:
+            for _, rect in self.drawnSprites:
+                screen.blit(static, rect, rect)
+                restoredRects.append(rect)
+
+        # Drawing the disks that changed, and the ones that were under a restored area.
+        disks, drawnDisks = gameBoard.disks, self.drawnDisks
+        for row, rects in enumerate(self.squareRects):
+            for col, rect in enumerate(rects):
+                value = disks[row][col]
+                if value != drawnDisks[row][col] or (restoredRects and rect.collidelist(restoredRects) != -1):
+                    screen.blit(static, rect, rect)
+                    screen.blit(self.icons.getDiskIconByValue(value), rect)
+                    drawnDisks[row][col] = value
+                    changedRects.append(rect)
+
+        if spritesChanged or any(rect.collidelist(changedRects) != -1 for _, rect in sprites):
+            for surface, rect in sprites:
+                screen.blit(surface, rect)
+
+            changedRects.extend(restoredRects)
+            changedRects.extend(rect for _, rect in sprites)
+
+        self.drawnSprites = sprites
+        return changedRects
+
+    def update(self, gameBoard: GameBoard, status: str | None = None) -> None:
+        """Draws the changes of the given board since the last frame, and only sends their areas to the display."""
+
+        changedRects = self.draw(gameBoard, status)
+        if changedRects:
+            display.update(changedRects)
@@ -0,0 +1,233 @@
+"""
+This module contains the opening book of the AI: the best moves of the first positions of the game, searched offline.
+The book is a sorted binary file that is read through `mmap`, so opening it does not load or parse it.
+Run `python OthelloOpeningBook.py --help` to build a new book.
+"""
+
+from OthelloAiCore import GameBoardNode, GameBoardTree, AiGameBoard, newAiGameBoard, packGameBoard, unpackGameBoard, putDisk, passTurn
+from OthelloBitboard import AiBitGameBoard
+from OthelloTranspositionTable import TranspositionTable, ZOBRIST_KEYS, ZOBRIST_PLAYER_KEY
+from configs import ROW_COL, AI_OPENING_BOOK_PATH
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
+from itertools import repeat
+from os import path
+import mmap, struct
+
+BOOK_MAGIC = b"OTHBOOK1"
+"""The first bytes of a book file."""
+
+BOOK_HEADER = struct.Struct("<8sI4x")
+"""The header of a book file: the magic bytes and the number of records."""
+
+BOOK_RECORD = struct.Struct("<QBBh")
+"""
+A record of a book file: the canonical key of a position, the best move (as the square index `row * 8 + col`
+in the canonical orientation), the search depth and the search score. The records are sorted by their key.
+"""
+
+SYMMETRIES = tuple(tuple(transform(index >> 3, index & 7) for index in range(64))
+                   for transform in (lambda row, col: row * 8 + col,
+                                     lambda row, col: row * 8 + 7 - col,
+                                     lambda row, col: (7 - row) * 8 + col,
+                                     lambda row, col: (7 - row) * 8 + 7 - col,
+                                     lambda row, col: col * 8 + row,
+                                     lambda row, col: col * 8 + 7 - row,
+                                     lambda row, col: (7 - col) * 8 + row,
+                                     lambda row, col: (7 - col) * 8 + 7 - row))
+"""The square index that each square index is mapped to by each of the `8` symmetries of the board (rotations and reflections)."""
+
+INVERSE_SYMMETRIES = tuple(tuple(symmetry.index(index) for index in range(64)) for symmetry in SYMMETRIES)
+"""The square index that each square index is mapped back to by the inverse of each symmetry."""
+
+def getCanonicalKey(black: int, white: int, player: int) -> tuple[int, int]:
+    """
+    Returns the canonical key of a position and the index of the symmetry that maps the position to its canonical form.
+    The key is the smallest Zobrist hash of the `8` symmetric positions, so all of them have the same key.
+    """
+
+    bestKey, bestSymmetry = -1, 0
+    for symmetryIndex, symmetry in enumerate(SYMMETRIES):
+        key = ZOBRIST_PLAYER_KEY if player == 2 else 0
+        for color, bits in ((1, black), (2, white)):
+            keys = ZOBRIST_KEYS[color]
+            while bits:
+                lowBit = bits & -bits
+                key ^= keys[symmetry[lowBit.bit_length() - 1]]
+                bits ^= lowBit
+
+        if bestKey < 0 or key < bestKey:
+            bestKey, bestSymmetry = key, symmetryIndex
+
+    return bestKey, bestSymmetry
+
+class OpeningBook:
+    """A read-only opening book file. The records are binary searched in the memory-mapped file, and nothing is loaded up front."""
+
+    def __init__(self, bookPath: str) -> None:
+        self.path = bookPath
+
+        with open(bookPath, "rb") as bookFile:
+            self.mmap = mmap.mmap(bookFile.fileno(), 0, access=mmap.ACCESS_READ)
+            """The memory-mapped book file."""
+
+        magic, self.count = BOOK_HEADER.unpack_from(self.mmap, 0)
+        if magic != BOOK_MAGIC or len(self.mmap) != BOOK_HEADER.size + self.count * BOOK_RECORD.size:
+            self.mmap.close()
+            raise ValueError(f"{bookPath!r} is not a valid opening book file.")
+
+        self.hits = 0
+        """The number of lookups that found their position in the book."""
+
+        self.misses = 0
+        """The number of lookups that did not find their position in the book."""
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        self.mmap.close()
+
+    def lookup(self, key: int) -> tuple[int, int, int] | None:
+        """Returns the `(move, depth, score)` record of the given canonical key, or `None` if it is not in the book."""
+
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            recordKey, move, depth, score = BOOK_RECORD.unpack_from(self.mmap, BOOK_HEADER.size + middle * BOOK_RECORD.size)
+            if recordKey < key:
+                low = middle + 1
+            elif recordKey > key:
+                high = middle
+            else:
+                return move, depth, score
+
+        return None
+
+    def getBookMove(self, gameBoard: AiGameBoard | AiBitGameBoard) -> tuple[int, int] | None:
+        """
+        Returns the book move of the given board (in its own orientation), or `None` if the position is not in the book.
+        The book only has 8x8 positions, so the other board sizes never have a book move.
+        """
+
+        entry = self.getBookEntry(gameBoard)
+        return entry[0] if entry is not None else None
+
+    def getBookEntry(self, gameBoard: AiGameBoard | AiBitGameBoard) -> tuple[tuple[int, int], int] | None:
+        """Returns the book move of the given board and the depth of the search that chose it, or `None`. See `getBookMove`."""
+
+        if gameBoard.row != 8:
+            return None
+
+        _, black, white, *_ = packGameBoard(gameBoard)
+        key, symmetryIndex = getCanonicalKey(black, white, gameBoard.player)
+
+        record = self.lookup(key)
+        if record is not None:
+            index = INVERSE_SYMMETRIES[symmetryIndex][record[0]]
+            pos = (index >> 3, index & 7)
+
+            # A move that is not possible can only come from a hash collision.
+            if pos in gameBoard.possibleMoves:
+                self.hits += 1
+                return pos, record[1]
+
+        self.misses += 1
+        return None
+
+def writeBook(bookPath: str, records: dict[int, tuple[int, int, int]]) -> None:
+    """Writes the `key -> (move, depth, score)` records to a new book file, sorted by their key."""
+
+    with open(bookPath, "wb") as bookFile:
+        bookFile.write(BOOK_HEADER.pack(BOOK_MAGIC, len(records)))
+        for key in sorted(records):
+            move, depth, score = records[key]
+            bookFile.write(BOOK_RECORD.pack(key, move, depth, max(-32768, min(32767, round(score)))))
+
+def searchBookPosition(packed: tuple[int, ...], depth: int) -> tuple[tuple[int, int], float]:
+    """Returns the best move and the score of a packed board, searched to the given depth. Runs in the builder processes."""
+
+    gameBoard = unpackGameBoard(packed)
+    table = TranspositionTable(1 << 16)
+    tree = GameBoardTree(GameBoardNode(gameBoard), depth, useAlphaBeta=True, transpositionTable=table, searchInPlace=True)
+    tree.expandTree()
+
+    bestMove = tree.getBestMove(gameBoard.player)
+    entry = table.lookup(tree.getTableKey(gameBoard, gameBoard.player))
+    return bestMove, entry[3] if entry is not None else 0.0
+
+def collectBookPositions(plies: int) -> list[AiGameBoard | AiBitGameBoard]:
+    """Returns a board of each canonical position that can be reached within `plies - 1` moves of the start, which have possible moves."""
+
+    boards, seen = [], set()
+    level = [newAiGameBoard()]
+    for _ in range(plies):
+        nextLevel = []
+        for gameBoard in level:
+            if not gameBoard.possibleMoves:
+                gameBoard = passTurn(gameBoard)
+                if not gameBoard.possibleMoves:
+                    continue
+
+            _, black, white, *_ = packGameBoard(gameBoard)
+            key, _ = getCanonicalKey(black, white, gameBoard.player)
+            if key in seen:
+                continue
+
+            seen.add(key)
+            boards.append(gameBoard)
+            nextLevel.extend(putDisk(gameBoard, pos) for pos in sorted(gameBoard.possibleMoves))
+
+        level = nextLevel
+
+    return boards
+
+def buildBook(bookPath: str, plies = 7, depth = 6, workers: int | None = None, verbose = False) -> int:
+    """
+    Searches every position of the first `plies` moves (up to symmetry) to the given depth in `workers` processes,
+    writes their best moves to a new book file, and returns the number of positions.
+    """
+
+    boards = collectBookPositions(plies)
+    records: dict[int, tuple[int, int, int]] = {}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(searchBookPosition, [packGameBoard(gameBoard) for gameBoard in boards], repeat(depth), chunksize=4)
+        for count, (gameBoard, (pos, score)) in enumerate(zip(boards, results), 1):
+            _, black, white, *_ = packGameBoard(gameBoard)
+            key, symmetryIndex = getCanonicalKey(black, white, gameBoard.player)
+            records[key] = (SYMMETRIES[symmetryIndex][pos[0] * 8 + pos[1]], depth, int(score))
+
+            if verbose and not count % 100:
+                print(f"{count}/{len(boards)} positions searched.")
+
+    writeBook(bookPath, records)
+    return len(records)
+
+@cache
+def newOpeningBook(bookPath: str | None = AI_OPENING_BOOK_PATH) -> OpeningBook | None:
+    """
+    Returns the opening book of the given file (relative to this module), or `None` if there is no such file.
+    The book is read-only, so the same one is shared by all the trees of the process. The books only have 8x8 positions.
+    """
+
+    if bookPath is None or ROW_COL != 8:
+        return None
+
+    bookPath = path.join(path.dirname(path.abspath(__file__)), bookPath)
+    return OpeningBook(bookPath) if path.exists(bookPath) else None
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    from time import perf_counter
+
+    parser = ArgumentParser(description="Builds an opening book by searching the first positions of the game.")
+    parser.add_argument("-o", "--output", default=AI_OPENING_BOOK_PATH, help="The book file to write.")
+    parser.add_argument("-p", "--plies", type=int, default=7, help="The number of moves from the start that are in the book.")
+    parser.add_argument("-d", "--depth", type=int, default=6, help="The search depth of each position.")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="The number of processes. Defaults to the number of CPUs.")
+    args = parser.parse_args()
+
+    startTime = perf_counter()
+    count = buildBook(path.join(path.dirname(path.abspath(__file__)), args.output), args.plies, args.depth, args.workers, verbose=True)
+    print(f"Wrote {count} positions to {args.output} in {perf_counter() - startTime:.1f} seconds.")
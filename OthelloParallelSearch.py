@@ -0,0 +1,231 @@
+"""This module is used to spread the AI search of a move over multiple processes."""
+
+from OthelloAiCore import GameBoardNode, GameBoardTree, newAiGameBoard, packGameBoard, unpackGameBoard, putDisk
+from OthelloTranspositionTable import TranspositionTable
+from configs import AI_TRANSPOSITION_TABLE_SIZE
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from math import inf, nextafter
+from os import cpu_count
+from time import perf_counter
+
+_workerTable: TranspositionTable | None = None
+"""The transposition table of a worker process. It is kept between the tasks that the process runs."""
+
+_workerEvaluators: tuple = (None, None)
+"""The `(evaluator, batchEvaluator)` that score the positions of a worker process. Set by `initWorker` when the process starts."""
+
+def initWorker(evaluator, batchEvaluator) -> None:
+    """Keeps the evaluators of the tree that started the worker process, so the workers score the positions the same way as the tree."""
+
+    global _workerEvaluators
+    _workerEvaluators = (evaluator, batchEvaluator)
+
+def searchPackedBoard(packed: tuple[int, ...], size: int, player: int, depth: int, alpha = -inf, beta = inf, evaluators: tuple | None = None) -> float:
+    """
+    Returns the alpha-beta score of a packed board of `size` rows and columns, which is the exact (minimax) score if it lies within `(alpha, beta)`.
+    Runs in the worker processes, with the evaluators given to `initWorker` unless `evaluators` is given.
+    """
+
+    global _workerTable
+    if _workerTable is None and AI_TRANSPOSITION_TABLE_SIZE:
+        _workerTable = TranspositionTable(AI_TRANSPOSITION_TABLE_SIZE)
+
+    evaluator, batchEvaluator = _workerEvaluators if evaluators is None else evaluators
+    gameBoard = unpackGameBoard(packed, size)
+    tree = GameBoardTree(GameBoardNode(gameBoard, evaluator), depth, useAlphaBeta=True, transpositionTable=_workerTable, searchInPlace=True,
+                         batchEvaluator=batchEvaluator, evaluator=evaluator)
+    return tree.alphaBetaInPlace(gameBoard, player, depth, alpha, beta)
+
+class ParallelGameBoardTree(GameBoardTree):
+    """
+    A game board tree that splits the search of the best move over a pool of processes.
+
+    With `splitDepth = 1`, the most promising root move is searched first in this process, and its score bounds
+    the searches of the other root moves, which are sent to the workers in the compact form of `packGameBoard`.
+    With a deeper split, the tree is expanded locally for `splitDepth` moves, every position at that depth is searched
+    by the workers, and their exact scores are merged with a minimax over the expanded moves.
+    Either way, the selected move is the same as the one of the serial `getBestMove`.
+
+    The other search options are the ones of `GameBoardTree`, and the workers score the positions with the evaluators of the tree.
+    """
+
+    def __init__(self, node: GameBoardNode, depth = 2, workers: int | None = None, splitDepth = 1,
+                 transpositionTable: TranspositionTable | None = None, searchInPlace = False, maxNodes: int | None = None,
+                 maxBytes: int | None = None, endgameSolver = None, openingBook = None, batchEvaluator = None, evaluator = None) -> None:
+        super(ParallelGameBoardTree, self).__init__(node, depth, useAlphaBeta=True, transpositionTable=transpositionTable,
+                                                    searchInPlace=searchInPlace, maxNodes=maxNodes, maxBytes=maxBytes,
+                                                    endgameSolver=endgameSolver, openingBook=openingBook,
+                                                    batchEvaluator=batchEvaluator, evaluator=evaluator)
+
+        self.workers = workers or cpu_count() or 1
+        """The number of worker processes."""
+
+        self.splitDepth = splitDepth
+        """The depth at which the tree is split into the tasks of the workers."""
+
+        self.pool: ProcessPoolExecutor | None = None
+        """The pool of worker processes. Started by the first search and kept until `close` is called."""
+
+        self.lastSearchStats: dict[str, float] = {}
+        """The number of tasks and the time of the last parallel search."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self) -> None:
+        """Stops the worker processes. The queued tasks of a search that is still running (see `cancelSearch`) are dropped."""
+
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def startPool(self) -> ProcessPoolExecutor:
+        """Starts the worker processes if they are not running yet."""
+
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=initWorker,
+                                            initargs=(self.evaluator, self.batchEvaluator))
+
+        return self.pool
+
+    def collectFrontier(self, node: GameBoardNode, depth: int, frontier: list[GameBoardNode]) -> None:
+        """Adds the nodes that are `depth` moves below the given node to `frontier`. Nodes without moves are skipped."""
+
+        if not depth:
+            frontier.append(node)
+            return
+
+        for child in self.expandNode(node).values():
+            self.collectFrontier(child, depth - 1, frontier)
+
+    def mergeScores(self, node: GameBoardNode, player: int, depth: int, scores: dict[int, float]) -> float:
+        """Returns the minimax score of the given node from the scores of the frontier nodes (by their `id`)."""
+
+        if not depth or not node.children:
+            return scores.get(id(node), node.score)
+
+        childScores = [self.mergeScores(child, player, depth - 1, scores) for child in node.children.values()]
+        return min(childScores) if node.gameBoard.player == player else max(childScores)
+
+    def getBestMoveAlphaBeta(self, player) -> tuple[int, int]:
+        """
+        Returns the best move for the current player, searched by the worker processes. `getBestMove` calls it once the opening book,
+        the endgame solver and the pondered searches had no move. The searches with a deadline (the iterations of `iterativeDeepening`)
+        run in this process, as they cannot be split ahead of time.
+        """
+
+        splitDepth = min(self.splitDepth, self.searchDepth - 1)
+        if self.deadline is not None or splitDepth < 1:
+            return super(ParallelGameBoardTree, self).getBestMoveAlphaBeta(player)
+
+        children = self.expandNode(self.root)
+        if not children:
+            return (-1, -1)
+
+        startTime = perf_counter()
+        if splitDepth == 1:
+            bestMove = self.searchRootSplit(player)
+        else:
+            bestMove = self.searchFrontierSplit(player, splitDepth)
+
+        self.lastSearchStats["seconds"] = perf_counter() - startTime
+        return bestMove
+
+    def searchRootSplit(self, player: int) -> tuple[int, int]:
+        """Searches the first root move in this process, then the other root moves in the workers with its score as a bound."""
+
+        children = self.root.children
+        minimizing = self.root.gameBoard.player == player
+        depth = self.searchDepth - 1
+
+        originalOrder = {pos: index for index, pos in enumerate(children)}
+        firstMove, *otherMoves = self.orderMoves(children, minimizing, self.root.bestMove)
+        size = self.root.gameBoard.row
+        firstScore = searchPackedBoard(packGameBoard(children[firstMove].gameBoard), size, player, depth,
+                                       evaluators=(self.evaluator, self.batchEvaluator))
+
+        # The moves that come before the first move win a tie, so their bound is widened by the smallest possible step,
+        # same as `GameBoardTree.getBestMoveAlphaBeta`. A score within its bound is exact.
+        bounds = {pos: (nextafter(firstScore, inf if minimizing else -inf) if originalOrder[pos] < originalOrder[firstMove] else firstScore)
+                  for pos in otherMoves}
+        futures = {pos: self.startPool().submit(searchPackedBoard, packGameBoard(children[pos].gameBoard), size, player, depth,
+                                                -inf if minimizing else bounds[pos], bounds[pos] if minimizing else inf)
+                   for pos in otherMoves}
+
+        candidates = {firstMove: firstScore}
+        for pos, future in futures.items():
+            score = future.result()
+            if (score < bounds[pos]) if minimizing else (score > bounds[pos]):
+                candidates[pos] = score
+
+        self.lastSearchStats = {"workers": self.workers, "tasks": len(futures)}
+
+        if minimizing:
+            bestMove = min(candidates, key = lambda pos: (candidates[pos], originalOrder[pos]))
+        else:
+            bestMove = max(candidates, key = lambda pos: (candidates[pos], -originalOrder[pos]))
+
+        self.root.bestMove = bestMove
+        return bestMove
+
+    def searchFrontierSplit(self, player: int, splitDepth: int) -> tuple[int, int]:
+        """Searches every position `splitDepth` moves below the root in the workers, and merges their exact scores."""
+
+        frontier: list[GameBoardNode] = []
+        self.collectFrontier(self.root, splitDepth, frontier)
+
+        packedBoards = [packGameBoard(node.gameBoard) for node in frontier]
+        results = self.startPool().map(searchPackedBoard, packedBoards, repeat(self.root.gameBoard.row), repeat(player), repeat(self.searchDepth - splitDepth))
+        scores = {id(node): score for node, score in zip(frontier, results)}
+
+        children = self.root.children
+        rootScores = {pos: self.mergeScores(child, player, splitDepth - 1, scores) for pos, child in children.items()}
+        self.lastSearchStats = {"workers": self.workers, "tasks": len(frontier)}
+
+        # Same selection (and tie breaking) as `GameBoardTree.getBestMove`.
+        if self.root.gameBoard.player == player:
+            return min(rootScores, key = rootScores.get) # type: ignore
+
+        return max(rootScores, key = rootScores.get) # type: ignore
+
+def measureSpeedup(gameBoard, depth: int, workers: int | None = None, splitDepth = 1) -> dict[str, object]:
+    """Searches the given board serially and in parallel, and returns the times, the speedup and the selected moves."""
+
+    startTime = perf_counter()
+    serialTree = GameBoardTree(GameBoardNode(gameBoard.shallowCopy()), depth, useAlphaBeta=True, searchInPlace=True)
+    serialMove = serialTree.getBestMove(gameBoard.player)
+    serialSeconds = perf_counter() - startTime
+
+    with ParallelGameBoardTree(GameBoardNode(gameBoard.shallowCopy()), depth, workers, splitDepth) as parallelTree:
+        # Starting the processes before the timer, as the pool is kept for the whole game.
+        parallelTree.startPool().submit(int).result()
+
+        startTime = perf_counter()
+        parallelMove = parallelTree.getBestMove(gameBoard.player)
+        parallelSeconds = perf_counter() - startTime
+
+        return {
+            "depth": depth,
+            "workers": parallelTree.workers,
+            "tasks": parallelTree.lastSearchStats.get("tasks", 0),
+            "serialSeconds": serialSeconds,
+            "parallelSeconds": parallelSeconds,
+            "speedup": serialSeconds / parallelSeconds if parallelSeconds else inf,
+            "serialMove": serialMove,
+            "parallelMove": parallelMove,
+        }
+
+if __name__ == "__main__":
+    from random import Random
+
+    # Playing a few random moves to get a midgame position.
+    random = Random(0)
+    gameBoard = newAiGameBoard()
+    for _ in range(20):
+        gameBoard = putDisk(gameBoard, random.choice(sorted(gameBoard.possibleMoves))) # type: ignore
+
+    print(measureSpeedup(gameBoard, 5))
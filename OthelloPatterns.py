@@ -0,0 +1,83 @@
+"""
+This module contains the board patterns of `OthelloEvaluator.PatternEvaluator`: lines of squares along the edges, the corners,
+the rows, the columns and the diagonals. The squares of a pattern are read as a base `3` number (`0` empty, `1` black, `2` white),
+which is the index of the configuration of the pattern in its weight table.
+"""
+
+PATTERN_TYPES = (
+    ("edge2x", tuple((0, col) for col in range(8)) + ((1, 1), (1, 6))),
+    ("corner3x3", tuple((row, col) for row in range(3) for col in range(3))),
+    ("line2", tuple((1, col) for col in range(8))),
+    ("line3", tuple((2, col) for col in range(8))),
+    ("line4", tuple((3, col) for col in range(8))),
+    ("diag8", tuple((index, index) for index in range(8))),
+    ("diag7", tuple((index, index + 1) for index in range(7))),
+    ("diag6", tuple((index, index + 2) for index in range(6))),
+    ("diag5", tuple((index, index + 3) for index in range(5))),
+    ("diag4", tuple((index, index + 4) for index in range(4))),
+)
+"""The name and the squares of each pattern type. The other instances of a type are the images of its squares by the board symmetries."""
+
+def getSymmetricSquares(row: int, col: int) -> tuple[tuple[int, int], ...]:
+    """Returns the images of the given square by the `8` symmetries of the board (rotations and reflections)."""
+
+    return ((row, col), (row, 7 - col), (7 - row, col), (7 - row, 7 - col),
+            (col, row), (col, 7 - row), (7 - col, row), (7 - col, 7 - row))
+
+def getPatternInstances() -> tuple[tuple[int, tuple[int, ...]], ...]:
+    """
+    Returns the `(type, squares)` pair of each instance of the pattern types, where the squares are bit indices `row * 8 + col`
+    in the order of the digits of the index. The images of a pattern with the same squares as an earlier one are dropped.
+    """
+
+    instances, seen = [], set()
+    for typeIndex, (_, squares) in enumerate(PATTERN_TYPES):
+        images = zip(*(getSymmetricSquares(row, col) for row, col in squares))
+        for image in images:
+            indices = tuple(row * 8 + col for row, col in image)
+            if frozenset(indices) not in seen:
+                seen.add(frozenset(indices))
+                instances.append((typeIndex, indices))
+
+    return tuple(instances)
+
+PATTERN_INSTANCES = getPatternInstances()
+"""The `(type, squares)` pair of each pattern instance. See `getPatternInstances`."""
+
+SQUARE_PATTERNS = tuple(tuple((instanceIndex, 3 ** digit) for instanceIndex, (_, squares) in enumerate(PATTERN_INSTANCES)
+                              for digit, square in enumerate(squares) if square == index)
+                        for index in range(64))
+"""The `(instance, power)` pairs of each square bit index: the instances that contain the square, and the value of its digit."""
+
+def getPatternIndices(black: int, white: int) -> list[int]:
+    """Returns the index of each pattern instance of the given bitboards, computed from scratch."""
+
+    indices = [0] * len(PATTERN_INSTANCES)
+    for color, bits in ((1, black), (2, white)):
+        while bits:
+            lowBit = bits & -bits
+            bits ^= lowBit
+            for instanceIndex, power in SQUARE_PATTERNS[lowBit.bit_length() - 1]:
+                indices[instanceIndex] += color * power
+
+    return indices
+
+def updatePatternIndices(indices: list[int], player: int, moveIndex: int, flips: int) -> list[int]:
+    """
+    Returns a copy of the given pattern indices after `player` placed a disk at the `moveIndex` square and flipped the `flips` bits.
+    Only the instances that contain one of the changed squares are updated.
+    """
+
+    indices = indices.copy()
+    for instanceIndex, power in SQUARE_PATTERNS[moveIndex]:
+        indices[instanceIndex] += player * power
+
+    # A flipped disk goes from the opponent digit to the player one: `-1` for black (`2 -> 1`) and `+1` for white (`1 -> 2`).
+    flipDelta = 2 * player - 3
+    while flips:
+        lowBit = flips & -flips
+        flips ^= lowBit
+        for instanceIndex, power in SQUARE_PATTERNS[lowBit.bit_length() - 1]:
+            indices[instanceIndex] += flipDelta * power
+
+    return indices
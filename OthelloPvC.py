@@ -1,76 +1,148 @@
-from OthelloGuiCore import GameIcons, displayGameboardHStyle, displayGameboardVStyle
-from OthelloAiCore import AiGameBoard, GameBoardNode, GameBoardTree
-from configs import WINDOW_SIZE, WINDOW_STYLE
+from OthelloGuiCore import GameIcons, GameBoardRenderer
+from OthelloAiCore import GameBoardNode, GameBoardTree, newAiGameBoard
+from OthelloAiWorker import AiWorker
+from OthelloParallelSearch import ParallelGameBoardTree
+from OthelloEndgame import newEndgameSolver
+from OthelloOpeningBook import newOpeningBook
+from OthelloBatchEval import newBatchEvaluator
+from OthelloEvaluator import newEvaluator
+from OthelloTranspositionTable import TranspositionTable
+from OthelloGameArchive import PLAYER_HUMAN, PLAYER_AI, recordGame
+from configs import WINDOW_SIZE, AI_USE_ALPHA_BETA, AI_TRANSPOSITION_TABLE_SIZE, AI_SEARCH_IN_PLACE, AI_PARALLEL_WORKERS, AI_SEARCH_STATS, \
+                    AI_TREE_MAX_NODES, AI_TREE_MAX_BYTES, AI_PONDERING, GUI_FRAME_RATE
 import pygame, sys
 
-def startAiMatch(mode=1, searchDepthBlack=3, searchDepthWhite=3, asPlugin=False):
-    """Starts a match between one manual and one AI player (`mode=1`) or two AI players (`mode=2`)."""
+def newTranspositionTable():
+    """Returns a new transposition table for the searches of a game, or `None` if it is disabled."""
     
-    gameBoard = AiGameBoard()
+    if AI_USE_ALPHA_BETA and AI_TRANSPOSITION_TABLE_SIZE:
+        return TranspositionTable(AI_TRANSPOSITION_TABLE_SIZE)
+
+def newGameBoardTree(gameBoard) -> GameBoardTree:
+    """Returns a new game tree of the given board, with the search options selected in `configs`."""
+    
+    node = GameBoardNode(gameBoard)
+    options = dict(searchInPlace=AI_SEARCH_IN_PLACE, maxNodes=AI_TREE_MAX_NODES, maxBytes=AI_TREE_MAX_BYTES,
+                   endgameSolver=newEndgameSolver(), openingBook=newOpeningBook(), batchEvaluator=newBatchEvaluator(), evaluator=newEvaluator())
+    if AI_PARALLEL_WORKERS:
+        # The parallel search is always an alpha-beta search.
+        table = TranspositionTable(AI_TRANSPOSITION_TABLE_SIZE) if AI_TRANSPOSITION_TABLE_SIZE else None
+        gameBoardTree = ParallelGameBoardTree(node, workers=AI_PARALLEL_WORKERS, transpositionTable=table, **options)
+    else:
+        gameBoardTree = GameBoardTree(node, useAlphaBeta=AI_USE_ALPHA_BETA, transpositionTable=newTranspositionTable(), **options)
+    
+    gameBoardTree.collectStats = AI_SEARCH_STATS
+    
+    gameBoardTree.expandTree()
+    return gameBoardTree
+
+def closeGameBoardTree(gameBoardTree: GameBoardTree) -> None:
+    """Stops the worker processes of the given tree, if it has any."""
+    
+    if isinstance(gameBoardTree, ParallelGameBoardTree):
+        gameBoardTree.close()
+
+def startAiMatch(mode=1, searchDepthBlack=3, searchDepthWhite=3, asPlugin=False, timeMs=None):
+    """
+    Starts a match between one manual and one AI player (`mode=1`) or two AI players (`mode=2`).
+    If `timeMs` is given, the AI deepens its search of each move until `timeMs` milliseconds have passed, instead of using the fixed depths.
+    """
+    
+    gameBoard = newAiGameBoard()
     icons = GameIcons()
     if not asPlugin:
         pygame.init()
     
     SCREEN_WIDTH, SCREEN_HEIGHT = WINDOW_SIZE
     
-    if WINDOW_STYLE == 'H':
-        displayGameboard = displayGameboardHStyle
-    else:
-        displayGameboard = displayGameboardVStyle
-    
     screen = pygame.display.set_mode([SCREEN_WIDTH, SCREEN_HEIGHT])
     pygame.display.set_caption('Othello-AiMatch')
+    renderer = GameBoardRenderer(screen, icons)
     
-    node = GameBoardNode(gameBoard)
-    gameBoardTree = GameBoardTree(node)
-    gameBoardTree.expandTree()
+    gameBoardTree = newGameBoardTree(gameBoard)
     
-    displayGameboard(screen, gameBoard, icons)
-    pygame.display.update()
+    # The searches run in a background thread, so the window keeps repainting and handling its events while the AI thinks.
+    aiWorker = AiWorker()
+    clock = pygame.time.Clock()
+    ponderedGameBoard = None
+    moves = [] # The moves of the match, recorded in the game archive when it ends.
     
-    pos = (-1, -1)
     while True:
+        pos = (-1, -1)
         for event in pygame.event.get():
             if event.type == pygame.KEYUP:
                 if event.key == pygame.K_ESCAPE:
+                    aiWorker.cancel()
                     pygame.quit()
                     sys.exit()
                 
                 elif event.key == pygame.K_SPACE:
+                    # The cancelled search stops at its next node, and its tree is dropped with its result.
+                    aiWorker.cancel()
+                    closeGameBoardTree(gameBoardTree)
                     if asPlugin:
                         return
                     
-                    gameBoard = AiGameBoard()
-                    node = GameBoardNode(gameBoard)
-                    gameBoardTree = GameBoardTree(node)
-                    gameBoardTree.expandTree()
+                    gameBoard = newAiGameBoard()
+                    gameBoardTree = newGameBoardTree(gameBoard)
+                    moves = []
             
             if event.type == pygame.QUIT:
+                aiWorker.cancel()
                 pygame.quit()
                 sys.exit()
             
+            if event.type == pygame.VIDEOEXPOSE:
+                renderer.invalidate()
+            
             if event.type == pygame.MOUSEBUTTONUP and gameBoard.player == 1 and mode == 1:
                 px, py = pygame.mouse.get_pos()
                 pos = (py - gameBoard.diagonalMargin) // gameBoard.squareLength, (px - gameBoard.diagonalMargin) // gameBoard.squareLength
                 break
         
-        if mode == 2 or gameBoard.player == 2:
-            # TODO: It appears that the black player is not playing optimally.
-            # I think it selects the moves that minimizes its values.
-            if gameBoard.player == 1:
-                gameBoardTree.searchDepth = searchDepthBlack
+        if (mode == 2 or gameBoard.player == 2) and gameBoard.possibleMoves:
+            if not aiWorker.busy:
+                # TODO: It appears that the black player is not playing optimally.
+                # I think it selects the moves that minimizes its values.
+                if gameBoard.player == 1:
+                    gameBoardTree.searchDepth = searchDepthBlack
+                else:
+                    gameBoardTree.searchDepth = searchDepthWhite
+                
+                aiWorker.start(gameBoardTree, gameBoard.player, timeMs)
+            
             else:
+                pos = aiWorker.poll() or (-1, -1)
+                if pos != (-1, -1) and gameBoardTree.searchStats is not None:
+                    print(f"Player {gameBoard.player} plays {pos}. {gameBoardTree.searchStats.summary()}")
+                    gameBoardTree.searchStats = None
+        
+        elif mode == 1 and AI_PONDERING and gameBoard.possibleMoves:
+            # The AI searches its replies on the player's time, once per position.
+            if not aiWorker.busy and ponderedGameBoard is not gameBoard:
                 gameBoardTree.searchDepth = searchDepthWhite
+                aiWorker.start(gameBoardTree, 2, timeMs, ponder=True)
+                ponderedGameBoard = gameBoard
             
-            pos = gameBoardTree.getBestMove(gameBoard.player)
+            elif aiWorker.pondering:
+                aiWorker.poll()
         
         if pos in gameBoard.possibleMoves:
-            gameBoardTree.root = gameBoardTree.root.children[pos]
-            gameBoard = gameBoardTree.root.gameBoard
-            gameBoardTree.expandTree()
+            # The pondering is stopped before the tree changes. The replies that it finished are kept by `advanceRoot`.
+            aiWorker.cancel(wait=True)
+            
+            # The tree is expanded below the new root by the worker, before its next search.
+            gameBoard = gameBoardTree.advanceRoot(pos).gameBoard
+            moves.append(pos)
+            if not gameBoard.possibleMoves:
+                # The players with a time budget have no fixed depth, which the archive stores as `0`.
+                depths = (0, 0) if timeMs is not None else (0 if mode == 1 else searchDepthBlack, searchDepthWhite)
+                recordGame(gameBoard, moves, PLAYER_HUMAN if mode == 1 else PLAYER_AI, PLAYER_AI, *depths)
         
-        displayGameboard(screen, gameBoard, icons)
-        pygame.display.update()
+        # Only the squares and texts that changed are redrawn, and the loop sleeps until the next frame.
+        status = f"Thinking... {aiWorker.thinkingSeconds:.1f}s" if aiWorker.busy and not aiWorker.pondering else None
+        renderer.update(gameBoard, status)
+        clock.tick(GUI_FRAME_RATE)
 
 if __name__ == "__main__":
     # startAiMatch("V")
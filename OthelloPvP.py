@@ -1,12 +1,16 @@
 """This module is used to start a PVP match of Othello."""
 
 from OthelloCore import GameBoard
-from OthelloGuiCore import GameIcons, displayGameboardHStyle, displayGameboardVStyle
-from configs import WINDOW_SIZE, WINDOW_STYLE
+from OthelloGameArchive import PLAYER_HUMAN, recordGame
+from OthelloGuiCore import GameIcons, GameBoardRenderer
+from configs import WINDOW_SIZE, GUI_FRAME_RATE
 import pygame, sys
 
-def putDisk(gameBoard: GameBoard, x: int, y: int):
-    """Maps the given coordinates to the corresponding position in the game board grid and places a disk at this position."""
+def putDisk(gameBoard: GameBoard, x: int, y: int) -> tuple[int, int] | None:
+    """
+    Maps the given coordinates to the corresponding position in the game board grid and places a disk at this position.
+    Returns the position, or `None` if no disk was placed.
+    """
     
     # Mapping the coordinates to the corresponding position in the game board grid.
     row, col = (y - gameBoard.diagonalMargin) // gameBoard.squareLength, (x - gameBoard.diagonalMargin) // gameBoard.squareLength
@@ -30,6 +34,8 @@ def putDisk(gameBoard: GameBoard, x: int, y: int):
     #     gameBoard.updateCount()
     #     if not gameBoard.possibleMoves:
     #         gameBoard.player = 0 # Game over.
+    
+    return row, col
 
 def startPvPMatch(asPlugin=False):
     """Start a match of Othello between two manual players."""
@@ -42,16 +48,11 @@ def startPvPMatch(asPlugin=False):
     
     SCREEN_WIDTH, SCREEN_HEIGHT = WINDOW_SIZE
     
-    if WINDOW_STYLE == 'H':
-        displayGameboard = displayGameboardHStyle
-    else:
-        displayGameboard = displayGameboardVStyle
-    
     screen = pygame.display.set_mode([SCREEN_WIDTH, SCREEN_HEIGHT])
     pygame.display.set_caption('Othello-PvpMatch')
-    
-    displayGameboard(screen, gameBoard, icons)
-    pygame.display.update()
+    renderer = GameBoardRenderer(screen, icons)
+    clock = pygame.time.Clock()
+    moves = [] # The moves of the match, recorded in the game archive when it ends.
     
     while True:
         for event in pygame.event.get():
@@ -61,7 +62,11 @@ def startPvPMatch(asPlugin=False):
             
             if event.type == pygame.MOUSEBUTTONUP:
                 px, py = pygame.mouse.get_pos()
-                putDisk(gameBoard, px, py)
+                pos = putDisk(gameBoard, px, py)
+                if pos is not None:
+                    moves.append(pos)
+                    if not gameBoard.possibleMoves:
+                        recordGame(gameBoard, moves, PLAYER_HUMAN, PLAYER_HUMAN)
             
             elif event.type == pygame.KEYUP:
                 if event.key == pygame.K_SPACE:
@@ -69,9 +74,14 @@ def startPvPMatch(asPlugin=False):
                         return
                     
                     gameBoard = GameBoard()
+                    moves = []
             
-            displayGameboard(screen, gameBoard, icons)
-            pygame.display.update()
+            elif event.type == pygame.VIDEOEXPOSE:
+                renderer.invalidate()
+        
+        # Only the squares and texts that changed are redrawn, and the loop sleeps until the next frame.
+        renderer.update(gameBoard)
+        clock.tick(GUI_FRAME_RATE)
 
 if __name__ == "__main__":
     startPvPMatch()
@@ -0,0 +1,169 @@
+"""This module contains the statistics that the AI game tree can record for each search of a move."""
+
+from sys import getsizeof
+
+class SearchStats:
+    """
+    The counters and timers of a single `GameBoardTree.getBestMove` call. Only recorded if the tree has `collectStats` set,
+    so a search without statistics only pays for a `None` check per node.
+    """
+
+    def __init__(self, searchDepth: int, timeMs: float | None = None) -> None:
+        self.searchDepth = searchDepth
+        """The depth limit of the search. With a time budget, see `completedDepth` instead."""
+
+        self.timeMs = timeMs
+        """The time budget of the search, or `None` for a fixed depth search."""
+
+        self.completedDepth = searchDepth
+        """The depth of the deepest search that was completed (the same as `searchDepth` for fixed depth searches)."""
+
+        self.nodesExpanded = 0
+        """The number of positions whose possible moves were generated."""
+
+        self.nodesCreated = 0
+        """The number of child positions that were generated, as nodes or as in-place moves."""
+
+        self.leavesEvaluated = 0
+        """The number of positions whose heuristic score was used as their search score."""
+
+        self.maxBranchingFactor = 0
+        """The largest number of possible moves of an expanded position."""
+
+        self.moveGenerationSeconds = 0.0
+        """The time spent in `putDisk`/`makeMove`/`undoMove`, including the incremental stability updates of the boards."""
+
+        self.evaluationSeconds = 0.0
+        """The time spent in computing the heuristic scores of the positions."""
+
+        self.totalSeconds = 0.0
+        """The time of the whole search."""
+
+        self.tableLookups = 0
+        """The number of transposition table lookups of the search."""
+
+        self.tableHits = 0
+        """The number of transposition table lookups that found the position."""
+
+        self.retainedNodes = 0
+        """The number of `GameBoardNode`s that are reachable from the root after the search."""
+
+        self.retainedBytes = 0
+        """An estimate (by `sys.getsizeof`) of the memory held by the retained nodes and their boards."""
+
+    @property
+    def traversalSeconds(self) -> float:
+        """The time of the search that was not spent in move generation or evaluation (the tree walk, ordering and the table)."""
+
+        return max(0.0, self.totalSeconds - self.moveGenerationSeconds - self.evaluationSeconds)
+
+    @property
+    def averageBranchingFactor(self) -> float:
+        """The average number of possible moves of the expanded positions."""
+
+        return self.nodesCreated / self.nodesExpanded if self.nodesExpanded else 0.0
+
+    @property
+    def nodesPerSecond(self) -> float:
+        """The number of child positions generated per second of the whole search."""
+
+        return self.nodesCreated / self.totalSeconds if self.totalSeconds else 0.0
+
+    def addExpansion(self, moveCount: int) -> None:
+        """Counts a position whose `moveCount` possible moves were generated."""
+
+        self.nodesExpanded += 1
+        self.nodesCreated += moveCount
+        if moveCount > self.maxBranchingFactor:
+            self.maxBranchingFactor = moveCount
+
+    def toDict(self) -> dict[str, int | float | None]:
+        """Returns all the statistics, including the computed ones, as a JSON serializable dictionary."""
+
+        return {**vars(self),
+                "traversalSeconds": self.traversalSeconds,
+                "averageBranchingFactor": self.averageBranchingFactor,
+                "nodesPerSecond": self.nodesPerSecond}
+
+    def summary(self) -> str:
+        """Returns a short human readable summary of the statistics."""
+
+        depth = f"depth {self.completedDepth}" + (f" ({self.timeMs:g} ms budget)" if self.timeMs is not None else "")
+        lines = [
+            f"Search {depth}: {self.nodesCreated} nodes ({self.nodesExpanded} expanded, {self.leavesEvaluated} leaves) "
+            f"in {self.totalSeconds * 1000:.1f} ms, {self.nodesPerSecond:,.0f} nodes/s",
+            f"  branching factor: {self.averageBranchingFactor:.1f} average, {self.maxBranchingFactor} max",
+            f"  time: {self.moveGenerationSeconds * 1000:.1f} ms move generation, {self.evaluationSeconds * 1000:.1f} ms evaluation, "
+            f"{self.traversalSeconds * 1000:.1f} ms traversal",
+            f"  retained tree: {self.retainedNodes} nodes, {self.retainedBytes / 1024:,.0f} KiB",
+        ]
+        if self.tableLookups:
+            lines.append(f"  transposition table: {self.tableHits}/{self.tableLookups} hits ({self.tableHits / self.tableLookups:.0%})")
+
+        return "\n".join(lines)
+
+    def __str__(self) -> str:
+        return self.summary()
+
+def getAttributeValues(value) -> list:
+    """
+    Returns the values of the instance attributes of the given object, whether they are stored in `__slots__` or in `__dict__`.
+    The `__dict__` is only read if the object has one, as reading it would create it.
+    """
+
+    values = []
+    for cls in type(value).__mro__:
+        for name in cls.__dict__.get("__slots__", ()):
+            if name != "__dict__" and hasattr(value, name):
+                values.append(getattr(value, name))
+
+    if type(value).__dictoffset__:
+        instanceDict = getattr(value, "__dict__", None)
+        if instanceDict is not None:
+            values.extend(instanceDict.values())
+
+    return values
+
+def getObjectSize(value) -> int:
+    """Returns the size of the given object including its `__dict__`, if it has one, but not the objects that it refers to."""
+
+    size = getsizeof(value)
+    if type(value).__dictoffset__:
+        instanceDict = getattr(value, "__dict__", None)
+        if instanceDict is not None:
+            size += getsizeof(instanceDict)
+
+    return size
+
+def measureTreeMemory(root, shared = ()) -> tuple[int, int]:
+    """
+    Returns the number of nodes below (and including) the given `GameBoardNode` and an estimate of their memory in bytes:
+    the nodes, their children dicts and their boards with the containers that the boards hold. Objects shared by
+    several nodes (like the cached tables of the boards) are only counted once, and the `shared` objects are not counted at all.
+    """
+
+    seen: set[int] = {id(value) for value in shared}
+
+    def sizeOf(value) -> int:
+        if id(value) in seen:
+            return 0
+
+        seen.add(id(value))
+        size = getsizeof(value)
+        if isinstance(value, (list, tuple, set, frozenset)):
+            size += sum(sizeOf(item) for item in value)
+        elif isinstance(value, dict):
+            size += sum(sizeOf(key) + sizeOf(item) for key, item in value.items())
+
+        return size
+
+    nodeCount = byteCount = 0
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        nodeCount += 1
+        byteCount += getObjectSize(node) + getsizeof(node.children)
+        byteCount += getObjectSize(node.gameBoard) + sum(sizeOf(value) for value in getAttributeValues(node.gameBoard))
+        stack.extend(node.children.values())
+
+    return nodeCount, byteCount
@@ -0,0 +1,181 @@
+"""
+This module is used to play batches of AI vs AI games without a game window, to compare the strength and speed of search settings.
+The results of each game are written as a JSON line. Run `python OthelloSelfPlay.py --help` for the command line options.
+"""
+
+from OthelloAiCore import GameBoardNode, GameBoardTree, newAiGameBoard, passTurn
+from OthelloTranspositionTable import TranspositionTable
+from OthelloEndgame import newEndgameSolver
+from OthelloOpeningBook import newOpeningBook
+from OthelloBatchEval import newBatchEvaluator
+from OthelloEvaluator import newEvaluator
+from OthelloGameArchive import ArchivedGame, GameArchiveWriter
+from configs import ROW_COL, AI_USE_ALPHA_BETA, AI_TRANSPOSITION_TABLE_SIZE, AI_SEARCH_IN_PLACE, AI_TREE_MAX_NODES, AI_TREE_MAX_BYTES
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+from time import perf_counter
+from typing import TextIO
+import json, sys
+
+def newPlayerTable() -> TranspositionTable | None:
+    """Returns a new transposition table for the searches of one player in a game, or `None` if it is disabled."""
+
+    if AI_USE_ALPHA_BETA and AI_TRANSPOSITION_TABLE_SIZE:
+        return TranspositionTable(AI_TRANSPOSITION_TABLE_SIZE)
+
+def playGame(gameIndex: int, depthA: int, depthB: int, aIsBlack = True, timeMs: float | None = None,
+             openingMoves = 0, seed: int | None = None, collectStats = False) -> dict:
+    """
+    Plays a single game between player `A` and player `B`, which search with the given depths (or `timeMs` milliseconds per move),
+    and returns its result. The first `openingMoves` moves are random (by `seed`), so the games of a batch are not all the same.
+    A player without possible moves passes, and the game ends when neither player can move.
+    If `collectStats` is set, the result also has the `SearchStats` of each searched move (`None` for the other moves).
+    """
+
+    random = Random(seed)
+    depths = {1: depthA, 2: depthB} if aIsBlack else {1: depthB, 2: depthA}
+    tables = {1: newPlayerTable(), 2: newPlayerTable()}
+
+    gameBoard = newAiGameBoard()
+    gameBoardTree = GameBoardTree(GameBoardNode(gameBoard), useAlphaBeta=AI_USE_ALPHA_BETA, searchInPlace=AI_SEARCH_IN_PLACE,
+                                  maxNodes=AI_TREE_MAX_NODES, maxBytes=AI_TREE_MAX_BYTES, endgameSolver=newEndgameSolver(),
+                                  openingBook=newOpeningBook(), batchEvaluator=newBatchEvaluator(), evaluator=newEvaluator())
+    gameBoardTree.collectStats = collectStats
+    gameBoardTree.expandTree()
+
+    moves: list[list[int] | None] = []
+    moveTimes: list[float] = []
+    searchStats: list[dict | None] = []
+    startTime = perf_counter()
+    while True:
+        if not gameBoard.possibleMoves:
+            gameBoard = passTurn(gameBoard)
+            if not gameBoard.possibleMoves:
+                break
+
+            # `None` marks a passed turn in the moves list.
+            moves.append(None)
+            moveTimes.append(0.0)
+            searchStats.append(None)
+            gameBoardTree.resetRoot(gameBoard)
+            gameBoardTree.expandTree()
+            continue
+
+        moveStart = perf_counter()
+        gameBoardTree.searchStats = None
+        if len(moves) < openingMoves:
+            pos = random.choice(sorted(gameBoard.possibleMoves))
+            gameBoardTree.activeStats = None # The random moves are not searched, so their expansions are not counted.
+        else:
+            gameBoardTree.searchDepth = depths[gameBoard.player]
+            gameBoardTree.transpositionTable = tables[gameBoard.player]
+            pos = gameBoardTree.getBestMove(gameBoard.player, timeMs)
+
+        gameBoard = gameBoardTree.advanceRoot(pos).gameBoard
+        gameBoardTree.expandTree()
+
+        moves.append(list(pos))
+        moveTimes.append(round((perf_counter() - moveStart) * 1000, 3))
+        searchStats.append(gameBoardTree.searchStats.toDict() if gameBoardTree.searchStats is not None else None)
+
+    blackCount, whiteCount = gameBoard.blackCount, gameBoard.whiteCount
+    winner = 1 if blackCount > whiteCount else 2 if whiteCount > blackCount else 0
+    players = {1: "A", 2: "B"} if aIsBlack else {1: "B", 2: "A"}
+
+    result = {
+        "game": gameIndex,
+        "black": players[1],
+        "white": players[2],
+        "depthBlack": depths[1],
+        "depthWhite": depths[2],
+        "timeMs": timeMs,
+        "winner": players.get(winner, "draw"),
+        "winnerColor": winner,
+        "blackCount": blackCount,
+        "whiteCount": whiteCount,
+        "moves": moves,
+        "moveTimesMs": moveTimes,
+        "seconds": round(perf_counter() - startTime, 3),
+    }
+    if collectStats:
+        result["searchStats"] = searchStats
+
+    return result
+
+def _playGameTask(args: tuple) -> dict:
+    """Unpacks the arguments of `playGame` for `ProcessPoolExecutor.map`."""
+
+    return playGame(*args)
+
+def runMatches(games: int, depthA = 3, depthB = 3, workers: int | None = None, timeMs: float | None = None,
+               openingMoves = 4, seed = 0, swapColors = True, output: TextIO | None = sys.stdout, collectStats = False,
+               archivePath: str | None = None) -> dict:
+    """
+    Plays `games` games between player `A` (`depthA`) and player `B` (`depthB`) in `workers` processes, and writes the result
+    of each game to `output` as a JSON line, in the order of the games. Player `A` plays black in the even games, and white in
+    the odd ones if `swapColors` is set. With `collectStats`, each result has the search statistics of its moves (see `playGame`).
+    With `archivePath`, the games are also appended to that game archive (see `OthelloGameArchive`). Returns the totals of the batch.
+    """
+
+    seeds = Random(seed)
+    tasks = [(gameIndex, depthA, depthB, not (swapColors and gameIndex % 2), timeMs, openingMoves, seeds.getrandbits(32), collectStats)
+             for gameIndex in range(games)]
+
+    summary = {"games": games, "depthA": depthA, "depthB": depthB, "timeMs": timeMs, "A": 0, "B": 0, "draw": 0,
+               "discDifferenceA": 0, "moves": 0, "searchSeconds": 0.0}
+    startTime = perf_counter()
+
+    archive = GameArchiveWriter(archivePath) if archivePath is not None else None
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(_playGameTask, tasks):
+            if output is not None:
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+
+            if archive is not None:
+                # The games with a time budget have no depth. See `OthelloGameArchive.PLAYER_AI`.
+                depthBlack, depthWhite = (result["depthBlack"], result["depthWhite"]) if timeMs is None else (0, 0)
+                archive.write(ArchivedGame(bytes(row * ROW_COL + col for row, col in filter(None, result["moves"])),
+                                           blackDepth=depthBlack, whiteDepth=depthWhite, winner=result["winnerColor"],
+                                           blackCount=result["blackCount"], whiteCount=result["whiteCount"]))
+
+            summary[result["winner"]] += 1
+            difference = result["blackCount"] - result["whiteCount"]
+            summary["discDifferenceA"] += difference if result["black"] == "A" else -difference
+            summary["moves"] += sum(move is not None for move in result["moves"])
+            summary["searchSeconds"] += sum(result["moveTimesMs"]) / 1000
+
+    if archive is not None:
+        archive.close()
+
+    summary["seconds"] = perf_counter() - startTime
+    summary["scoreA"] = (summary["A"] + summary["draw"] / 2) / games if games else 0.0
+    summary["msPerMove"] = summary["searchSeconds"] * 1000 / summary["moves"] if summary["moves"] else 0.0
+    return summary
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Plays AI vs AI Othello games without a game window and writes the results as JSON lines.")
+    parser.add_argument("-n", "--games", type=int, default=10, help="The number of games to play.")
+    parser.add_argument("-a", "--depth-a", type=int, default=3, help="The search depth of player A.")
+    parser.add_argument("-b", "--depth-b", type=int, default=3, help="The search depth of player B.")
+    parser.add_argument("-t", "--time-ms", type=float, default=None, help="Search each move for this many milliseconds instead of a fixed depth.")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="The number of processes. Defaults to the number of CPUs.")
+    parser.add_argument("--opening-moves", type=int, default=4, help="The number of random moves that start each game.")
+    parser.add_argument("--seed", type=int, default=0, help="The seed of the random opening moves.")
+    parser.add_argument("--no-swap", action="store_true", help="Player A always plays black.")
+    parser.add_argument("--stats", action="store_true", help="Add the search statistics of each move to the results.")
+    parser.add_argument("-o", "--output", default=None, help="The JSON lines file to write. Defaults to the standard output.")
+    parser.add_argument("--archive", default=None, help="Also append the games to this game archive (see OthelloGameArchive).")
+    args = parser.parse_args()
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        summary = runMatches(args.games, args.depth_a, args.depth_b, args.workers, args.time_ms,
+                             args.opening_moves, args.seed, not args.no_swap, output, args.stats, args.archive)
+    finally:
+        if args.output:
+            output.close()
+
+    print(json.dumps(summary), file=sys.stderr)
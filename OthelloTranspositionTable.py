@@ -0,0 +1,176 @@
+"""This module contains the Zobrist hashing and the transposition table used by the AI search to reuse the results of already searched positions."""
+
+from random import Random
+from configs import ROW_COL
+from functools import cache
+
+_random = Random(0x07E110)
+
+ZOBRIST_KEYS: tuple[tuple[int, ...], ...] = (
+    (0,) * ROW_COL * ROW_COL,
+    tuple(_random.getrandbits(64) for _ in range(ROW_COL * ROW_COL)),
+    tuple(_random.getrandbits(64) for _ in range(ROW_COL * ROW_COL)),
+)
+"""
+A random 64-bit key for each `(player, square)` pair. The square at `(row, col)` has the index `row * ROW_COL + col`.
+The first row is for empty squares and is all zeros so that `ZOBRIST_KEYS[value]` works for any square value.
+"""
+
+ZOBRIST_FLIP_KEYS = tuple(black ^ white for black, white in zip(ZOBRIST_KEYS[1], ZOBRIST_KEYS[2]))
+"""The keys that change the color of the disk at a square. A captured disk updates the hash with a single xor."""
+
+ZOBRIST_PLAYER_KEY = _random.getrandbits(64)
+"""Mixed into the hash when it is the white player's turn."""
+
+ZOBRIST_SEARCHER_KEY = _random.getrandbits(64)
+"""Mixed into the table keys when the white player is the searching player, as the search scores depend on it."""
+
+@cache
+def getZobristKeys(size: int) -> tuple[tuple[tuple[int, ...], ...], tuple[int, ...]]:
+    """
+    Returns the `(ZOBRIST_KEYS, ZOBRIST_FLIP_KEYS)` tables of a board of `size` rows and columns, where the square at `(row, col)`
+    has the index `row * size + col`. The tables of the `configs.ROW_COL` size are the module ones, so the stored hashes do not change.
+    """
+
+    if size == ROW_COL:
+        return ZOBRIST_KEYS, ZOBRIST_FLIP_KEYS
+
+    random = Random(0x07E110 + size)
+    keys = ((0,) * size * size, tuple(random.getrandbits(64) for _ in range(size * size)), tuple(random.getrandbits(64) for _ in range(size * size)))
+    return keys, tuple(black ^ white for black, white in zip(keys[1], keys[2]))
+
+def zobristHash(disks: list[list[int]], player: int) -> int:
+    """Computes the Zobrist hash of the given disks and player from scratch. Possible moves markers (`-1`) are ignored."""
+
+    size = len(disks)
+    keys = ZOBRIST_KEYS if size == ROW_COL else getZobristKeys(size)[0]
+
+    hashValue = ZOBRIST_PLAYER_KEY if player == 2 else 0
+    for row, disksRow in enumerate(disks):
+        for col, value in enumerate(disksRow):
+            if value > 0:
+                hashValue ^= keys[value][row * size + col]
+
+    return hashValue
+
+def zobristHashAfterMove(hashValue: int, player: int, pos: tuple[int, int], flipped: list[tuple[int, int]], size = ROW_COL) -> int:
+    """Returns the hash of the position of a `size` board after `player` places a disk at `pos` and captures the `flipped` disks."""
+
+    keys, flipKeys = (ZOBRIST_KEYS, ZOBRIST_FLIP_KEYS) if size == ROW_COL else getZobristKeys(size)
+
+    hashValue ^= ZOBRIST_PLAYER_KEY ^ keys[player][pos[0] * size + pos[1]]
+    for row, col in flipped:
+        hashValue ^= flipKeys[row * size + col]
+
+    return hashValue
+
+class TranspositionTable:
+    """
+    A fixed-size hash table of search results. Each position hash maps to a single slot, and when two positions
+    map to the same slot, the replacement policy decides which one is kept.
+    """
+
+    EXACT = 0
+    """The stored score is the exact score of the position."""
+
+    LOWER_BOUND = 1
+    """The search failed high, the exact score is `>=` the stored score."""
+
+    UPPER_BOUND = 2
+    """The search failed low, the exact score is `<=` the stored score."""
+
+    REPLACEMENT_POLICIES = ("depth", "always")
+    """
+    `"depth"`: Keeps the entry that was searched deeper, unless it was stored during a previous search.
+    `"always"`: The new entry always replaces the old one.
+    """
+
+    def __init__(self, size = 1 << 18, replacementPolicy = "depth") -> None:
+        if size <= 0 or size & (size - 1):
+            raise ValueError(f"The transposition table size must be a power of two, got {size}.")
+
+        if replacementPolicy not in self.REPLACEMENT_POLICIES:
+            raise ValueError(f"Unknown replacement policy {replacementPolicy!r}, expected one of {self.REPLACEMENT_POLICIES}.")
+
+        self.size = size
+        """The maximum number of entries that the table can hold."""
+
+        self.replacementPolicy = replacementPolicy
+
+        self.slots: list[tuple | None] = [None] * size
+        """Each slot is either empty or a `(key, depth, bound, score, bestMove, age)` tuple."""
+
+        self.age = 0
+        """Incremented with every new search so that the entries of old searches can be replaced first."""
+
+        self.hits = 0
+        """The number of lookups that found an entry for the position."""
+
+        self.misses = 0
+        """The number of lookups that did not find an entry for the position."""
+
+        self.stores = 0
+        """The number of entries written to the table."""
+
+        self.replacements = 0
+        """The number of stored entries that overwrote an entry of another position."""
+
+        self.rejections = 0
+        """The number of entries that were not stored because the replacement policy kept the old entry."""
+
+    def newSearch(self) -> None:
+        """Marks the start of a new search. The entries of the previous searches are kept but can be replaced."""
+
+        self.age += 1
+
+    def lookup(self, key: int) -> tuple | None:
+        """Returns the `(key, depth, bound, score, bestMove, age)` entry of the given position hash if it is in the table."""
+
+        entry = self.slots[key & (self.size - 1)]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, bound: int, score: float, bestMove: tuple[int, int] | None) -> None:
+        """Stores the search result of the given position hash, unless the replacement policy keeps the existing entry."""
+
+        index = key & (self.size - 1)
+        entry = self.slots[index]
+
+        if entry is not None and self.replacementPolicy == "depth" and entry[0] != key and entry[5] == self.age and entry[1] > depth:
+            self.rejections += 1
+            return
+
+        if entry is not None and entry[0] != key:
+            self.replacements += 1
+
+        # Keeping the best move of the old entry of the same position if the new search did not find one.
+        if bestMove is None and entry is not None and entry[0] == key:
+            bestMove = entry[4]
+
+        self.slots[index] = (key, depth, bound, score, bestMove, self.age)
+        self.stores += 1
+
+    def clear(self) -> None:
+        """Removes all the entries and resets the counters."""
+
+        self.slots = [None] * self.size
+        self.age = self.hits = self.misses = self.stores = self.replacements = self.rejections = 0
+
+    def getStats(self) -> dict[str, int | float]:
+        """Returns the table counters."""
+
+        lookups = self.hits + self.misses
+        return {
+            "size": self.size,
+            "used": self.size - self.slots.count(None),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+            "stores": self.stores,
+            "replacements": self.replacements,
+            "rejections": self.rejections,
+        }
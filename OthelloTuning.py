@@ -0,0 +1,270 @@
+"""
+This module is the offline pipeline that fits the weights of `OthelloEvaluator.PatternEvaluator`:
+`generate` plays headless self-play games and streams their positions to disk in chunks, and `fit` runs a least-squares
+gradient descent over the memory-mapped position files, so millions of positions never have to be in memory at once.
+Run `python OthelloTuning.py generate --help` and `python OthelloTuning.py fit --help` for the command line options.
+
+A data folder holds three flat files with one row per position, in the same order:
+`indices.u16` (the `uint16` index of each pattern instance), `discs.u8` (the number of disks) and `labels.f32` (the `float32` label
+from the point of view of black: the final disk difference, or the score of a search).
+The search labels need fitted weights (from a `fit` of result labels, for example), as the scores of the evaluator must be
+in disk units like the exact endgame scores that label the last positions.
+"""
+
+from OthelloAiCore import AiGameBoard, AiBitGameBoard, newAiGameBoard, packGameBoard, passTurn, putDisk
+from OthelloPatterns import PATTERN_TYPES, PATTERN_INSTANCES, getPatternIndices
+from OthelloEvaluator import PatternEvaluator
+from OthelloEndgame import EndgameSolver
+from OthelloSelfPlay import playGame
+from configs import AI_ENDGAME_EXACT_EMPTIES
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
+from math import inf
+from os import path
+from random import Random
+from time import perf_counter
+import os, sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DATA_FILES = {"indices": "indices.u16", "discs": "discs.u8", "labels": "labels.f32"}
+"""The file name of each column of a data folder."""
+
+@cache
+def loadLabelEvaluator(weightsPath: str) -> PatternEvaluator:
+    """Returns the evaluator of the search labels, loaded once per process."""
+
+    return PatternEvaluator.load(weightsPath)
+
+def searchScore(gameBoard: AiGameBoard | AiBitGameBoard, evaluator: PatternEvaluator, depth: int, alpha = -inf, beta = inf) -> float:
+    """Returns the negamax score of the player to move of the given board, searched in place to the given depth with the evaluator."""
+
+    moves = gameBoard.possibleMoves
+    if not depth or not moves:
+        if not moves and not passTurn(gameBoard).possibleMoves:
+            # The game is over, so the score is the final disk difference.
+            difference = gameBoard.blackCount - gameBoard.whiteCount
+            return difference if gameBoard.player == 1 else -difference
+
+        if not moves:
+            return -searchScore(passTurn(gameBoard), evaluator, depth, -beta, -alpha)
+
+        return evaluator.evaluate(gameBoard)
+
+    value = -inf
+    for pos in sorted(moves):
+        record = gameBoard.makeMove(pos)
+        score = -searchScore(gameBoard, evaluator, depth - 1, -beta, -alpha)
+        gameBoard.undoMove(record)
+
+        value = max(value, score)
+        alpha = max(alpha, value)
+        if alpha >= beta:
+            break
+
+    return value
+
+def generateGamePositions(gameIndex: int, depth: int, openingMoves: int, seed: int, label: str,
+                          labelDepth: int, weightsPath: str | None) -> tuple[bytes, bytes, bytes]:
+    """
+    Plays a self-play game (see `OthelloSelfPlay.playGame`) and returns the rows of its positions, as the bytes of the three data files.
+    With the `"result"` label, each position is labelled with the final disk difference of the game. With `"search"`, it is labelled
+    with the exact final score when the endgame solver can reach it, or with a `labelDepth` search of the pattern evaluator
+    of `weightsPath` otherwise.
+    """
+
+    result = playGame(gameIndex, depth, depth, openingMoves=openingMoves, seed=seed)
+    finalDifference = result["blackCount"] - result["whiteCount"]
+
+    indices, discs, labels = array("H"), array("B"), array("f")
+    solver = EndgameSolver(AI_ENDGAME_EXACT_EMPTIES, 0) if label == "search" else None
+    evaluator = loadLabelEvaluator(weightsPath) if label == "search" else None
+
+    gameBoard = newAiGameBoard()
+    for move in result["moves"]:
+        if move is None:
+            gameBoard = passTurn(gameBoard)
+            continue
+
+        _, black, white, *_ = packGameBoard(gameBoard)
+        indices.extend(getPatternIndices(black, white))
+        discs.append((black | white).bit_count())
+
+        if label == "search":
+            own, opp = (black, white) if gameBoard.player == 1 else (white, black)
+            if 64 - discs[-1] <= AI_ENDGAME_EXACT_EMPTIES:
+                _, score = solver.solveRoot(own, opp)
+            else:
+                score = searchScore(gameBoard.shallowCopy(), evaluator, labelDepth)
+
+            labels.append(score if gameBoard.player == 1 else -score)
+        else:
+            labels.append(finalDifference)
+
+        gameBoard = putDisk(gameBoard, tuple(move))
+
+    return indices.tobytes(), discs.tobytes(), labels.tobytes()
+
+def _generateGameTask(args: tuple) -> tuple[bytes, bytes, bytes]:
+    """Unpacks the arguments of `generateGamePositions` for `ProcessPoolExecutor.map`."""
+
+    return generateGamePositions(*args)
+
+def generatePositions(dataPath: str, games: int, depth = 2, openingMoves = 8, seed = 0, label = "result", labelDepth = 2,
+                      weightsPath: str | None = None, workers: int | None = None, chunkPositions = 1 << 16, verbose = False) -> int:
+    """
+    Plays `games` self-play games in `workers` processes and appends their positions to the data files of `dataPath`.
+    The rows are buffered and written every `chunkPositions` positions. Returns the number of positions written.
+    The `"search"` label needs the fitted weights of `weightsPath`: the square values of `PatternEvaluator.fromSquareWeights`
+    are not in disk units (a corner is worth 100), so they would not be on the same scale as the exact endgame labels.
+    """
+
+    if label == "search" and (weightsPath is None or not path.exists(weightsPath)):
+        raise ValueError(f"The search labels need a fitted weights file, and {weightsPath!r} does not exist.")
+
+    os.makedirs(dataPath, exist_ok=True)
+    seeds = Random(seed)
+    tasks = [(gameIndex, depth, openingMoves, seeds.getrandbits(32), label, labelDepth, weightsPath) for gameIndex in range(games)]
+
+    files = {name: open(path.join(dataPath, fileName), "ab") for name, fileName in DATA_FILES.items()}
+    chunks: list[tuple[bytes, bytes, bytes]] = []
+    bufferedPositions = writtenPositions = 0
+    startTime = perf_counter()
+
+    def writeChunks() -> None:
+        for column, name in enumerate(("indices", "discs", "labels")):
+            files[name].write(b"".join(chunk[column] for chunk in chunks))
+            files[name].flush()
+
+        chunks.clear()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for gameCount, chunk in enumerate(pool.map(_generateGameTask, tasks, chunksize=4), 1):
+                chunks.append(chunk)
+                bufferedPositions += len(chunk[1])
+                if bufferedPositions >= chunkPositions:
+                    writeChunks()
+                    writtenPositions += bufferedPositions
+                    bufferedPositions = 0
+
+                    if verbose:
+                        print(f"{gameCount}/{games} games, {writtenPositions} positions, {perf_counter() - startTime:.1f} seconds.")
+
+        writeChunks()
+        writtenPositions += bufferedPositions
+
+    finally:
+        for dataFile in files.values():
+            dataFile.close()
+
+    return writtenPositions
+
+def openPositions(dataPath: str) -> tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """Returns the memory-mapped `(indices, discs, labels)` arrays of a data folder. Nothing is read until the arrays are used."""
+
+    if np is None:
+        raise ImportError("Fitting the weights needs NumPy.")
+
+    labels = np.memmap(path.join(dataPath, DATA_FILES["labels"]), dtype=np.float32, mode="r")
+    discs = np.memmap(path.join(dataPath, DATA_FILES["discs"]), dtype=np.uint8, mode="r")
+    indices = np.memmap(path.join(dataPath, DATA_FILES["indices"]), dtype=np.uint16, mode="r").reshape(-1, len(PATTERN_INSTANCES))
+    if not len(labels) == len(discs) == len(indices):
+        raise ValueError(f"The data files of {dataPath!r} do not have the same number of positions.")
+
+    return indices, discs, labels
+
+def fitWeights(dataPath: str, stages = 4, epochs = 10, learningRate = 0.5, batchPositions = 1 << 16,
+               initial: PatternEvaluator | None = None, verbose = False) -> PatternEvaluator:
+    """
+    Fits the pattern weights to the labels of a data folder by minimizing the squared error of the evaluator scores, and returns them.
+    Each epoch walks the memory-mapped files in batches of `batchPositions`. The gradient of a batch is summed per weight
+    with `np.bincount`, and each weight takes a step of `learningRate` times its average error in the batch,
+    so the rare pattern configurations learn as fast as the common ones.
+    """
+
+    indices, discs, labels = openPositions(dataPath)
+
+    # The weights of all the stages and types are kept in a single flat array: the flat index of a pattern instance is
+    # the offset of its stage, plus the offset of its type table, plus its pattern index.
+    typeSizes = [3 ** len(squares) for _, squares in PATTERN_TYPES]
+    typeOffsets = np.cumsum([0] + typeSizes[:-1])
+    instanceOffsets = np.array([typeOffsets[typeIndex] for typeIndex, _ in PATTERN_INSTANCES], dtype=np.int64)
+    stageSize = sum(typeSizes)
+
+    if initial is not None and initial.stages == stages:
+        weights = np.concatenate([np.frombuffer(table, dtype=np.float32) for tables in initial.weights for table in tables]).astype(np.float64)
+    else:
+        weights = np.zeros(stages * stageSize, dtype=np.float64)
+
+    for epoch in range(epochs):
+        squaredError = 0.0
+        startTime = perf_counter()
+        for start in range(0, len(labels), batchPositions):
+            batchIndices = indices[start:start + batchPositions].astype(np.int64)
+            batchStages = (discs[start:start + batchPositions].astype(np.int64) - 4) * stages // 61
+
+            flat = batchIndices + instanceOffsets + (batchStages * stageSize)[:, None]
+            errors = labels[start:start + batchPositions] - weights[flat].sum(axis=1)
+            squaredError += float(errors @ errors)
+
+            flat = flat.ravel()
+            gradient = np.bincount(flat, weights=np.repeat(errors, len(PATTERN_INSTANCES)), minlength=len(weights))
+            counts = np.bincount(flat, minlength=len(weights))
+            weights += learningRate * gradient / np.maximum(counts, 1) / len(PATTERN_INSTANCES)
+
+        if verbose:
+            rootMeanSquare = (squaredError / len(labels)) ** 0.5 if len(labels) else 0.0
+            print(f"Epoch {epoch + 1}/{epochs}: RMS error {rootMeanSquare:.3f} before the epoch, {perf_counter() - startTime:.1f} seconds.")
+
+    tables = np.split(weights.astype(np.float32), np.cumsum([size for _ in range(stages) for size in typeSizes])[:-1])
+    return PatternEvaluator([[array("f", tables[stage * len(typeSizes) + typeIndex].tobytes()) for typeIndex in range(len(typeSizes))]
+                             for stage in range(stages)])
+
+if __name__ == "__main__":
+    from argparse import ArgumentParser
+    from configs import AI_PATTERN_WEIGHTS_PATH
+
+    defaultWeights = path.join(path.dirname(path.abspath(__file__)), AI_PATTERN_WEIGHTS_PATH)
+
+    parser = ArgumentParser(description="Generates self-play positions and fits the weights of the pattern evaluator.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="Play self-play games and append their positions to a data folder.")
+    generate.add_argument("data", help="The data folder.")
+    generate.add_argument("-n", "--games", type=int, default=100, help="The number of games to play.")
+    generate.add_argument("-d", "--depth", type=int, default=2, help="The search depth of the players.")
+    generate.add_argument("--opening-moves", type=int, default=8, help="The number of random moves that start each game.")
+    generate.add_argument("--seed", type=int, default=0, help="The seed of the random opening moves.")
+    generate.add_argument("--label", choices=("result", "search"), default="result", help="Label the positions with the game result or with a search.")
+    generate.add_argument("--label-depth", type=int, default=2, help="The depth of the search labels.")
+    generate.add_argument("--weights", default=defaultWeights, help="The fitted weights of the evaluator of the search labels.")
+    generate.add_argument("-w", "--workers", type=int, default=None, help="The number of processes. Defaults to the number of CPUs.")
+    generate.add_argument("--chunk", type=int, default=1 << 16, help="The number of positions buffered before each write.")
+
+    fit = commands.add_parser("fit", help="Fit the weights to the positions of a data folder.")
+    fit.add_argument("data", help="The data folder.")
+    fit.add_argument("-o", "--output", default=defaultWeights, help="The weights file to write.")
+    fit.add_argument("-s", "--stages", type=int, default=4, help="The number of game stages.")
+    fit.add_argument("-e", "--epochs", type=int, default=10, help="The number of passes over the positions.")
+    fit.add_argument("--learning-rate", type=float, default=0.5, help="The step size of the weights.")
+    fit.add_argument("--batch", type=int, default=1 << 16, help="The number of positions of each gradient step.")
+    fit.add_argument("--resume", action="store_true", help="Start from the weights of the output file instead of zeros.")
+
+    args = parser.parse_args()
+    startTime = perf_counter()
+
+    if args.command == "generate":
+        count = generatePositions(args.data, args.games, args.depth, args.opening_moves, args.seed, args.label,
+                                  args.label_depth, args.weights, args.workers, args.chunk, verbose=True)
+        print(f"Wrote {count} positions to {args.data} in {perf_counter() - startTime:.1f} seconds.")
+
+    else:
+        initial = PatternEvaluator.load(args.output) if args.resume and path.exists(args.output) else None
+        evaluator = fitWeights(args.data, args.stages, args.epochs, args.learning_rate, args.batch, initial, verbose=True)
+        evaluator.save(args.output)
+        print(f"Wrote the weights to {args.output} in {perf_counter() - startTime:.1f} seconds.", file=sys.stderr)
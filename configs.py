@@ -10,7 +10,73 @@ SQUARE_LENGTH   = 60
 """The length of a square cell in the gameboard."""
 
 ROW_COL         = 8
-"""The number of rows and columns in the gameboard."""
+"""
+The number of rows and columns in the gameboard, an even number of at least `4`. The opening book, the endgame solver
+and the pattern and batch evaluators only support the 8x8 board, so they are disabled for the other sizes.
+"""
+
+AI_BOARD_BACKEND = "bitboard"
+"""The board representation used by the AI search. `"bitboard"` (faster) or `"list"` (the original 2D array)."""
+
+AI_STABILITY_EDGE_TABLE = True
+"""Skip the stability checks of the axes that are always stable for the squares on the edges and corners of the board."""
+
+AI_VERIFY_STABILITY = False
+"""Check every incremental stability update of the AI boards against a full recompute. Slow, used for debugging."""
+
+AI_USE_ALPHA_BETA = True
+"""Use the alpha-beta search instead of the plain minimax search. Both select the same moves, but alpha-beta visits far fewer nodes."""
+
+AI_TRANSPOSITION_TABLE_SIZE = 1 << 18
+"""The number of entries of the transposition table that is shared by the alpha-beta searches of a game. Must be a power of two, `0` disables it."""
+
+AI_SEARCH_IN_PLACE = False
+"""Make the alpha-beta search walk a single board with `makeMove`/`undoMove` instead of allocating a board for every visited position."""
+
+AI_PARALLEL_WORKERS = 0
+"""The number of processes that share the AI search of a move (see `OthelloParallelSearch`). `0` searches in the game process."""
+
+AI_ENDGAME_EXACT_EMPTIES = 12
+"""The number of empty squares at which the AI searches the exact final score instead of the heuristic (see `OthelloEndgame`). `0` disables it."""
+
+AI_ENDGAME_WLD_EMPTIES = 14
+"""The number of empty squares at which the AI searches whether the game is won, lost or drawn. `0` disables it."""
+
+AI_ENDGAME_TIME_MS = 5000
+"""The time budget of an endgame solve in milliseconds. The heuristic search is used if it runs out. `None` means no limit."""
+
+AI_ENDGAME_TABLE_SIZE = 1 << 16
+"""The maximum number of positions in the hash table of the endgame solver."""
+
+AI_EVALUATOR = "stability"
+"""The heuristic score of the AI positions. `"stability"` (the stable disks) or `"pattern"` (the pattern tables of `OthelloEvaluator`)."""
+
+AI_PATTERN_WEIGHTS_PATH = "OthelloPatternWeights.bin"
+"""The weights file of the pattern evaluator, relative to the game folder. Without it, the weights are set from the classic square values."""
+
+AI_BATCH_EVALUATION = False
+"""Score the AI positions in NumPy batches with the features of `OthelloBatchEval` instead of the stability heuristic. Needs NumPy."""
+
+AI_OPENING_BOOK_PATH = "OthelloOpeningBook.bin"
+"""The opening book file of the AI (see `OthelloOpeningBook`), relative to the game folder. `None` disables it."""
+
+AI_TREE_MAX_NODES = 100_000
+"""The number of game tree nodes that the AI keeps between its searches. The least useful subtrees are dropped above it. `None` keeps all of them."""
+
+AI_TREE_MAX_BYTES = None
+"""Same as `AI_TREE_MAX_NODES`, but in (estimated) bytes of the nodes and their boards. `None` disables it."""
+
+AI_SEARCH_STATS = False
+"""Record the statistics of each AI search (see `OthelloSearchStats`) and print their summary after each AI move."""
+
+AI_PONDERING = True
+"""In player vs AI matches, search the AI replies to the possible moves of the player while the player is thinking (see `GameBoardTree.ponder`)."""
+
+GAME_ARCHIVE_PATH = None
+"""
+The game archive (see `OthelloGameArchive`) that the finished matches of the game windows are appended to, relative to the game folder.
+For example `"games.oga"`. `None` does not record the matches.
+"""
 
 HSTYLE_WINDOW_WIDTH  = DIAGONAL_MARGIN * 2 + SQUARE_LENGTH * ROW_COL + (ICON_SIZE) * 4
 HSTYLE_WINDOW_HEIGHT = DIAGONAL_MARGIN * 2 + SQUARE_LENGTH * ROW_COL + (ICON_SIZE)
@@ -27,3 +93,6 @@ WINDOW_SIZE = WINDOW_STYLE_OPTIONS[WINDOW_STYLE]
 
 # Change this to change the game window color style. Available options are (1, 1), (1, 2), (2, 1).
 COLOR_STYLE = (1, 2) # [First number -> 1: Dark, 2: Light] | [Second number -> differnet colors].
+
+GUI_FRAME_RATE = 30
+"""The maximum number of frames per second of the game windows. The loops sleep between the frames, and only the changed areas are repainted."""
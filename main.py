@@ -1,6 +1,6 @@
 from OthelloPvP import startPvPMatch
 from OthelloPvC import startAiMatch
-from configs import WINDOW_SIZE
+from configs import WINDOW_SIZE, GUI_FRAME_RATE
 import pygame
 import ctypes
 from os import path, chdir
@@ -101,6 +101,9 @@ def StartGame():
     beginBgCell   = pygame.Rect(xTablePos, (yTablePos + rowSize * 6 + RowPadding * 5), tableWidth, rowSize)
     beginTextCell = beginText.get_rect(left=(xTablePos + tableWidth // 2 - 10), top=(yTablePos + rowSize * 6 + RowPadding * 5 + 10))
 
+    # Limits the frame rate of the menu, which is redrawn on every frame.
+    clock = pygame.time.Clock()
+    
     terminate = False
     while not terminate:
         # Define done variable for the game loop
@@ -238,6 +241,7 @@ def StartGame():
             
             # Update the display
             pygame.display.flip()
+            clock.tick(GUI_FRAME_RATE)
         
         # Starting the game.
         if not terminate: